@@ -1,3 +1,5 @@
 from .backtester import Backtester
+from .optimizer import ParameterSweep
+from .replay import ExecutionReplay
 
-__all__ = ['Backtester']
+__all__ = ['Backtester', 'ParameterSweep', 'ExecutionReplay']
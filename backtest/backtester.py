@@ -0,0 +1,276 @@
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from execution.sizing import atr_position_size
+
+# Vectorized replay of the smart_money signals and ATR sizing. All symbols
+# live in one set of arrays sorted by (symbol, timestamp); windows never
+# cross a symbol boundary because rows too close to the start of their
+# symbol are masked, so there is no per-symbol or per-row Python loop.
+
+DEFAULT_PARAMS = {
+    "fast": 10,
+    "slow": 100,
+    "volume_window": 20,
+    "threshold": 2,
+    "window": 20,
+    "atr_period": 14,
+}
+
+
+class MarketArrays:
+    """OHLCV columns of a multi-symbol frame as numpy arrays, sorted by symbol then time."""
+
+    COLUMNS = ("timestamps", "symbols", "open", "high", "low", "close", "volume")
+
+    def __init__(self, data):
+        data = data.sort_values(["symbol", "timestamp"], kind="stable")
+        self.timestamps = pd.to_datetime(data["timestamp"]).to_numpy()
+        self.symbols = data["symbol"].to_numpy()
+        for column in ("open", "high", "low", "close", "volume"):
+            setattr(self, column, data[column].to_numpy(dtype=np.float64))
+        self._index()
+
+    def _index(self):
+        codes, self.symbol_names = pd.factorize(self.symbols, sort=True)
+        self.codes = codes
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        counts = np.diff(np.r_[starts, len(codes)])
+        self.group_start = np.repeat(starts, counts)
+        self.position = np.arange(len(codes)) - self.group_start  # row number within its symbol
+        self.is_last = np.r_[codes[1:] != codes[:-1], True][:len(codes)]
+        # distinct timestamps, and which one each row falls on
+        self.times, self.time_slot = np.unique(self.timestamps, return_inverse=True)
+
+    def __len__(self):
+        return len(self.close)
+
+    def between(self, start=None, end=None):
+        """Rows with start <= timestamp < end, without re-sorting."""
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.timestamps >= np.datetime64(pd.Timestamp(start))
+        if end is not None:
+            mask &= self.timestamps < np.datetime64(pd.Timestamp(end))
+        subset = object.__new__(MarketArrays)
+        for column in self.COLUMNS:
+            setattr(subset, column, getattr(self, column)[mask])
+        subset._index()
+        return subset
+
+
+def _rolling(values, window, position, reducer):
+    """Rolling reduction over each symbol's rows, NaN until the window is full."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = reducer(sliding_window_view(values, window), axis=1)
+    out[position < window - 1] = np.nan
+    return out
+
+
+def group_cumsum(arrays, values):
+    """Cumulative sum restarting at each symbol."""
+    sums = np.cumsum(values)
+    return sums - (sums[arrays.group_start] - values[arrays.group_start])
+
+
+def rolling_mean(arrays, values, window):
+    """Rolling mean from running sums, O(n) whatever the window."""
+    # centre each symbol on its first value to keep the running sums small
+    base = values[arrays.group_start]
+    sums = np.r_[0.0, np.cumsum(values - base)]
+    out = np.full(len(values), np.nan)
+    end = np.arange(window, len(values) + 1)
+    out[window - 1:] = (sums[end] - sums[end - window]) / window
+    out += base
+    out[arrays.position < window - 1] = np.nan
+    return out
+
+
+def compute_indicators(arrays, fast=10, slow=100, volume_window=20, threshold=2, window=20,
+                       atr_period=14, cache=None):
+    """
+    Indicator columns for every row, same definitions as signals.pipeline.
+
+    :param cache: optional dict reused across calls, so e.g. an SMA window
+        shared by several parameter sets is only computed once
+    """
+    cache = {} if cache is None else cache
+
+    def cached(key, compute):
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    return cached(
+        ("signals", fast, slow, volume_window, threshold, window, atr_period),
+        lambda: _signals(arrays, cached, fast, slow, volume_window, threshold, window, atr_period),
+    )
+
+
+def _signals(arrays, cached, fast, slow, volume_window, threshold, window, atr_period):
+    close = arrays.close
+    sma_fast = cached(("sma", fast), lambda: rolling_mean(arrays, close, fast))
+    sma_slow = cached(("sma", slow), lambda: rolling_mean(arrays, close, slow))
+    volume_avg = cached(("volume_avg", volume_window), lambda: rolling_mean(arrays, arrays.volume, volume_window))
+    rolling_min = cached(("min", window), lambda: _rolling(close, window, arrays.position, np.min))
+    rolling_max = cached(("max", window), lambda: _rolling(close, window, arrays.position, np.max))
+    atr = cached(("atr", atr_period), lambda: _atr(arrays, atr_period))
+
+    with np.errstate(invalid="ignore"):
+        phase = np.sign(sma_fast - sma_slow)  # 1 markup, -1 markdown, 0/NaN neutral
+        spike = arrays.volume > threshold * volume_avg
+        limit_price = np.where(
+            close < sma_fast, rolling_min, np.where(close > sma_slow, rolling_max, sma_fast)
+        )
+    signal = np.where(spike & (phase == 1), 1, np.where(spike & (phase == -1), -1, 0)).astype(np.int8)
+
+    return {"signal": signal, "limit_price": limit_price, "atr": atr}
+
+
+def _atr(arrays, period):
+    prev_close = np.r_[np.nan, arrays.close[:-1]]
+    prev_close[arrays.position == 0] = np.nan
+    with np.errstate(invalid="ignore"):
+        true_range = np.fmax(
+            arrays.high - arrays.low,
+            np.fmax(np.abs(arrays.high - prev_close), np.abs(arrays.low - prev_close)),
+        )
+    atr = _rolling(true_range, period, arrays.position, np.mean)
+    # min_periods=1: the first rows of each symbol average what they have
+    head = arrays.position < period - 1
+    expanding = group_cumsum(arrays, true_range)
+    atr[head] = expanding[head] / (arrays.position[head] + 1)
+    return atr
+
+
+class Backtester:
+    """
+    Replays stored OHLCV through the smart_money signals and the ATR sizing
+    of TradingSystem.get_size.
+
+    A signal on bar t is sized at bar t (size / limit price, like the live
+    loop) and filled at the open of bar t + 1 with slippage and fees. Long
+    only by default: sells never take a position below zero.
+    """
+
+    def __init__(self, total_capital=3000, portfolio_size=10, risk_target=0.25, min_size=30,
+                 fee_rate=0.006, slippage=0.0005, allow_short=False):
+        self.total_capital = total_capital
+        self.portfolio_size = portfolio_size
+        self.risk_target = risk_target
+        self.min_size = min_size
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.allow_short = allow_short
+
+    def run(self, data, cache=None, start=None, **params):
+        """
+        :param data: DataFrame of candles (load_data layout) or MarketArrays
+        :param cache: dict of indicator arrays to share between runs on the same data
+        :param start: signals before this timestamp are ignored, the bars
+            before it only warm up the indicators
+        :param params: indicator parameters, see DEFAULT_PARAMS
+        :return: BacktestResult
+        """
+        began = time.perf_counter()
+        arrays = data if isinstance(data, MarketArrays) else MarketArrays(data)
+        params = {**DEFAULT_PARAMS, **params}
+        if not len(arrays):
+            return BacktestResult.empty(params, time.perf_counter() - began)
+        indicators = compute_indicators(arrays, cache=cache, **params)
+
+        size = atr_position_size(
+            indicators["atr"], self.total_capital, self.portfolio_size, self.risk_target, self.min_size
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            quantity = np.where(indicators["signal"] != 0, size / indicators["limit_price"], 0.0)
+        quantity = np.nan_to_num(quantity, nan=0.0, posinf=0.0, neginf=0.0)
+        # no next bar to fill on
+        quantity[arrays.is_last] = 0.0
+        if start is not None:
+            quantity[arrays.timestamps < np.datetime64(pd.Timestamp(start))] = 0.0
+        order = indicators["signal"] * quantity
+
+        # target position after each fill, per symbol
+        cumulative = group_cumsum(arrays, order)
+        if self.allow_short:
+            position = cumulative
+        else:
+            # running position floored at zero: subtract the lowest point reached so far
+            floor = pd.Series(np.minimum(cumulative, 0.0)).groupby(arrays.codes).cummin().to_numpy()
+            position = cumulative - floor
+        previous = np.r_[0.0, position[:-1]]
+        previous[arrays.position == 0] = 0.0
+        filled = position - previous  # executed at the next bar's open
+
+        # shift orders onto the bar they execute on
+        executed = np.r_[0.0, filled[:-1]]
+        executed[arrays.position == 0] = 0.0
+        held = np.r_[0.0, position[:-1]]
+        held[arrays.position == 0] = 0.0
+
+        fill_price = arrays.open * (1 + self.slippage * np.sign(executed))
+        notional = np.abs(executed) * fill_price
+        fees = notional * self.fee_rate
+        cash = group_cumsum(arrays, -executed * fill_price - fees)
+        equity = cash + held * arrays.close
+
+        trades_mask = executed != 0
+        trades = pd.DataFrame(
+            {
+                "timestamp": arrays.timestamps[trades_mask],
+                "symbol": arrays.symbols[trades_mask],
+                "side": np.where(executed[trades_mask] > 0, "buy", "sell"),
+                "quantity": np.abs(executed[trades_mask]),
+                "price": fill_price[trades_mask],
+                "fee": fees[trades_mask],
+            }
+        )
+        # portfolio equity: sum the per-symbol changes by timestamp, so a
+        # symbol without a candle at some time keeps its last value
+        change = np.diff(equity, prepend=0.0)
+        change[arrays.position == 0] = equity[arrays.position == 0]
+        by_time = np.bincount(arrays.time_slot, weights=change, minlength=len(arrays.times))
+        equity_curve = pd.Series(np.cumsum(by_time), index=arrays.times)
+        elapsed = time.perf_counter() - began
+
+        last = arrays.is_last
+        summary = {
+            "bars": len(arrays),
+            "symbols": len(arrays.symbol_names),
+            "trades": int(trades_mask.sum()),
+            "pnl": float(equity[last].sum()),
+            "fees": float(fees.sum()),
+            "turnover": float(notional.sum()),
+            "max_drawdown": float((equity_curve.cummax() - equity_curve).max()) if len(equity_curve) else 0.0,
+            "elapsed": elapsed,
+            "bars_per_second": len(arrays) / elapsed if elapsed > 0 else float("inf"),
+        }
+        return BacktestResult(trades, equity_curve, summary, params)
+
+
+class BacktestResult:
+    TRADE_COLUMNS = ("timestamp", "symbol", "side", "quantity", "price", "fee")
+
+    def __init__(self, trades, equity, summary, params):
+        self.trades = trades
+        self.equity = equity
+        self.summary = summary
+        self.params = params
+
+    @classmethod
+    def empty(cls, params, elapsed=0.0):
+        """Result of a run without any bars."""
+        summary = {
+            "bars": 0, "symbols": 0, "trades": 0, "pnl": 0.0, "fees": 0.0, "turnover": 0.0,
+            "max_drawdown": 0.0, "elapsed": elapsed, "bars_per_second": 0.0,
+        }
+        trades = pd.DataFrame(columns=list(cls.TRADE_COLUMNS))
+        return cls(trades, pd.Series(dtype=np.float64), summary, params)
+
+    def __repr__(self):
+        return f"BacktestResult({self.summary})"
@@ -0,0 +1,282 @@
+import contextlib
+import copy
+import csv
+import itertools
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .backtester import DEFAULT_PARAMS, Backtester, MarketArrays
+
+# Parameter sweeps over the vectorized Backtester. Each worker holds the
+# market arrays once and an LRU cache of indicator arrays; combos are
+# ordered so that the ones sharing windows land in the same chunk, e.g. a
+# 10k grid over 6 parameters only computes each SMA/ATR window once per
+# worker. Only the summary metrics come back, one row per combo.
+
+SIZING_PARAMS = ("risk_target", "portfolio_size")
+WINDOW_PARAMS = ("fast", "slow", "volume_window", "window", "atr_period")
+METRICS = ("pnl", "trades", "fees", "turnover", "max_drawdown")
+
+
+def parameter_grid(space):
+    """Every combination of a {name: [values]} space, as a list of dicts."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_parameters(space, n, seed=0):
+    """
+    n distinct combinations drawn at random from a {name: [values]} space,
+    without building the full grid.
+    """
+    names = list(space)
+    sizes = [len(space[name]) for name in names]
+    total = int(np.prod(sizes))
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(total, size=min(n, total), replace=False)
+
+    combos = []
+    for pick in picks:
+        combo = {}
+        for name, size in zip(reversed(names), reversed(sizes)):
+            pick, index = divmod(int(pick), size)
+            combo[name] = space[name][index]
+        combos.append({name: combo[name] for name in names})
+    return combos
+
+
+def walk_forward_splits(start, end, train, test, step=None):
+    """
+    (train_start, train_end, test_start, test_end) windows rolling forward
+    over [start, end): train on one window, evaluate on the one after it.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    train, test = pd.Timedelta(train), pd.Timedelta(test)
+    step = pd.Timedelta(step) if step is not None else test
+
+    splits = []
+    train_start = start
+    while train_start + train + test <= end:
+        train_end = train_start + train
+        splits.append((train_start, train_end, train_end, train_end + test))
+        train_start += step
+    return splits
+
+
+def _nbytes(value):
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    return getattr(value, "nbytes", 0)
+
+
+class IndicatorCache(OrderedDict):
+    """Indicator arrays by key, dropping the least recently used past max_bytes."""
+
+    def __init__(self, max_bytes=1 << 30):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self:
+            self.nbytes -= _nbytes(super().__getitem__(key))
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        self.nbytes += _nbytes(value)
+        while self.nbytes > self.max_bytes and len(self) > 1:
+            _, evicted = self.popitem(last=False)
+            self.nbytes -= _nbytes(evicted)
+
+
+_worker = {}
+
+
+def _init_worker(arrays, backtester, cache_bytes):
+    _worker["arrays"] = arrays
+    _worker["backtester"] = backtester
+    _worker["cache_bytes"] = cache_bytes
+    _worker["windows"] = {}
+
+
+def _window(key):
+    """Market arrays and indicator cache for one (data_start, end) window."""
+    windows = _worker["windows"]
+    if key not in windows:
+        # a sweep works through its windows in order, keep only the current one
+        windows.clear()
+        arrays = _worker["arrays"]
+        if key != (None, None):
+            arrays = arrays.between(*key)
+        windows[key] = (arrays, IndicatorCache(_worker["cache_bytes"]))
+    return windows[key]
+
+
+def _evaluate(task):
+    """Run one chunk of combos, returns [(index, metrics)]."""
+    window, start, combos = task
+    arrays, cache = _window(window)
+    results = []
+    for index, params in combos:
+        backtester = copy.copy(_worker["backtester"])
+        signal_params = {}
+        for name, value in params.items():
+            if name in SIZING_PARAMS:
+                setattr(backtester, name, value)
+            else:
+                signal_params[name] = value
+        summary = backtester.run(arrays, cache=cache, start=start, **signal_params).summary
+        results.append((index, tuple(summary[metric] for metric in METRICS)))
+    return results
+
+
+class ParameterSweep:
+    """
+    Evaluates parameter combos for the smart_money signals (fast, slow,
+    volume_window, threshold, window, atr_period) and the ATR sizing
+    (risk_target, portfolio_size) on a process pool.
+    """
+
+    def __init__(self, data, backtester=None, max_workers=None, executor="process",
+                 chunk_size=16, cache_bytes=1 << 30):
+        """
+        :param data: DataFrame of candles (load_data layout) or MarketArrays
+        :param backtester: Backtester holding the fixed settings (capital, fees, ...)
+        :param executor: "process" or None to run in the calling process
+        :param chunk_size: combos per pool task
+        :param cache_bytes: indicator cache size of the whole sweep, split evenly between the workers
+        """
+        if executor not in ("process", None):
+            raise ValueError(f"Unknown executor: {executor}")
+        self.arrays = data if isinstance(data, MarketArrays) else MarketArrays(data)
+        self.backtester = backtester or Backtester()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.cache_bytes = cache_bytes
+        first = self.arrays.timestamps[self.arrays.codes == 0]
+        self.bar = pd.Timedelta(np.median(np.diff(first))) if len(first) > 1 else pd.Timedelta(0)
+
+    def warmup(self, combos):
+        """History needed before a window so its indicators match a run on all the data."""
+        longest = max(
+            max(combo.get(name, DEFAULT_PARAMS[name]) for name in WINDOW_PARAMS) for combo in combos
+        )
+        return self.bar * (longest + 1)
+
+    def _tasks(self, jobs):
+        # combos sharing windows next to each other, so chunks reuse indicators
+        def key(item):
+            params = {**DEFAULT_PARAMS, **item[1]}
+            return tuple(params[name] for name in WINDOW_PARAMS + ("threshold",))
+
+        offset = 0
+        for window, start, combos in jobs:
+            ordered = sorted(enumerate(combos, offset), key=key)
+            for i in range(0, len(ordered), self.chunk_size):
+                yield window, start, ordered[i:i + self.chunk_size]
+            offset += len(combos)
+
+    def _run(self, jobs, results_path=None):
+        """
+        :param jobs: list of ((data_start, end), start, combos)
+        :return: metrics array, one row per combo of every job in order
+        """
+        metrics = np.full((sum(len(job[2]) for job in jobs), len(METRICS)), np.nan)
+        writer = None
+        with open(results_path, "w", newline="") if results_path else contextlib.nullcontext() as file:
+            if file is not None:
+                writer = csv.writer(file)
+                writer.writerow(("index",) + METRICS)
+            for results in self._map(self._tasks(jobs)):
+                for index, values in results:
+                    metrics[index] = values
+                    if writer is not None:
+                        writer.writerow((index,) + values)
+        return metrics
+
+    def _map(self, tasks):
+        if self.executor is None:
+            _init_worker(self.arrays, self.backtester, self.cache_bytes)
+            for task in tasks:
+                yield _evaluate(task)
+            return
+        initargs = (self.arrays, self.backtester, self.cache_bytes // self.max_workers)
+        with ProcessPoolExecutor(self.max_workers, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_evaluate, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def run(self, combos, start=None, end=None, results_path=None):
+        """
+        Backtest every combo on [start, end).
+
+        :param combos: list of parameter dicts, see parameter_grid / random_parameters
+        :param results_path: optional csv written as chunks complete
+        :return: DataFrame, one row per combo: its parameters then METRICS
+        """
+        window = (None, None)
+        if start is not None or end is not None:
+            data_start = pd.Timestamp(start) - self.warmup(combos) if start is not None else None
+            window = (data_start, end)
+        metrics = self._run([(window, start, combos)], results_path)
+        return _results_frame(combos, metrics)
+
+    def walk_forward(self, combos, train, test, step=None, start=None, end=None, metric="pnl"):
+        """
+        Pick the best combo on each training window by `metric` and
+        evaluate it on the test window that follows.
+
+        :param train: training window length, e.g. "30D"
+        :param test: test window length, also the step by default
+        :return: DataFrame, one row per fold: the windows, the chosen
+            parameters, the in-sample metric and the out-of-sample METRICS
+        """
+        timestamps = self.arrays.timestamps
+        start = pd.Timestamp(start) if start is not None else pd.Timestamp(timestamps.min())
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp(timestamps.max()) + self.bar
+        splits = walk_forward_splits(start, end, train, test, step)
+        if not splits:
+            return pd.DataFrame()
+
+        warmup = self.warmup(combos)
+        column = METRICS.index(metric)
+        training = self._run([((s - warmup, e), s, combos) for s, e, _, _ in splits])
+        training = training.reshape(len(splits), len(combos), len(METRICS))
+
+        best = [combos[int(np.nanargmax(fold[:, column]))] for fold in training]
+        tested = self._run(
+            [((test_start - warmup, test_end), test_start, [params])
+             for (_, _, test_start, test_end), params in zip(splits, best)]
+        )
+        rows = []
+        for fold, ((train_start, train_end, test_start, test_end), params) in enumerate(zip(splits, best)):
+            rows.append(
+                {
+                    "fold": fold,
+                    "train_start": train_start,
+                    "train_end": train_end,
+                    "test_start": test_start,
+                    "test_end": test_end,
+                    **params,
+                    f"train_{metric}": float(np.nanmax(training[fold, :, column])),
+                    **dict(zip(METRICS, tested[fold])),
+                }
+            )
+        return pd.DataFrame(rows)
+
+
+def _results_frame(combos, metrics):
+    results = pd.DataFrame(combos)
+    for i, metric in enumerate(METRICS):
+        results[metric] = metrics[:, i]
+    results["trades"] = results["trades"].astype(np.int64)
+    return results
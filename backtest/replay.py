@@ -0,0 +1,172 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from broker.simulated import MatchingEngine, SimulatedBroker
+from execution.execution import ExecutionAlgo
+
+# Event-driven replay of recorded top-of-book and trade streams for
+# ExecutionAlgo. The algo sleeps on a SimulatedClock, and sleeping feeds the
+# recorded events up to the new time into the matching engine, so a
+# 10 minute total_time_limit takes milliseconds.
+
+EVENT_COLUMNS = [
+    "timestamp", "symbol", "best_bid", "best_bid_size", "best_offer", "best_offer_size", "price", "size",
+]
+
+
+def to_seconds(timestamps):
+    """Epoch seconds (what time.time() returns) from datetimes or numbers."""
+    timestamps = pd.Series(timestamps)
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        return timestamps.astype("datetime64[ns]").to_numpy().astype(np.int64) / 1e9
+    return timestamps.to_numpy(dtype=float)
+
+
+class SimulatedClock:
+    """time() and sleep() like the time module, without waiting."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.replay = None  # MarketReplay fed up to the time on every sleep
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.advance(self.now + seconds)
+
+    def advance(self, until):
+        if self.replay is not None:
+            self.replay.advance(until)
+        self.now = max(self.now, until)
+
+
+class MarketReplay:
+    """
+    Recorded events of one symbol, fed to a MatchingEngine in time order.
+
+    Quote rows carry best_bid, best_bid_size, best_offer and best_offer_size,
+    trade rows price and size; the other fields are NaN.
+    """
+
+    def __init__(self, symbol, events, engine):
+        events = events.sort_values("timestamp", kind="stable")
+        self.symbol = symbol
+        self.engine = engine
+        self.times = to_seconds(events["timestamp"])
+        quotes = events[["best_bid", "best_bid_size", "best_offer", "best_offer_size"]].to_numpy(dtype=float)
+        trades = events[["price", "size"]].to_numpy(dtype=float)
+        self.is_quote = ~np.isnan(quotes[:, 0]) | ~np.isnan(quotes[:, 2])
+        self.is_trade = ~np.isnan(trades[:, 0])
+        # python lists: the event loop reads one row at a time
+        self.quotes = np.where(np.isnan(quotes), None, quotes).tolist()
+        self.trades = trades.tolist()
+        self.time_list = self.times.tolist()
+        self.quote_rows = np.flatnonzero(self.is_quote)
+        self.cursor = 0
+
+    def seek(self, timestamp):
+        """Restore the book as of `timestamp`, the next advance starts after it."""
+        self.cursor = int(np.searchsorted(self.times, timestamp, side="right"))
+        last = np.searchsorted(self.quote_rows, self.cursor) - 1
+        if last >= 0:
+            row = self.quote_rows[last]
+            self.engine.on_quote(self.symbol, self.time_list[row], *self.quotes[row])
+        return self.cursor
+
+    def advance(self, until):
+        engine, symbol = self.engine, self.symbol
+        times, is_quote, is_trade = self.time_list, self.is_quote, self.is_trade
+        i, end = self.cursor, len(times)
+        while i < end and times[i] <= until:
+            if is_quote[i]:
+                engine.on_quote(symbol, times[i], *self.quotes[i])
+            if is_trade[i]:
+                engine.on_trade(symbol, times[i], *self.trades[i])
+            i += 1
+        self.cursor = i
+
+
+class ExecutionReplay:
+    """
+    Runs ExecutionAlgo on historical orders against recorded market data and
+    measures execution quality: fill rate, slippage against the arrival mid
+    and time to fill. Every order starts from a fresh engine at its arrival
+    time, so orders are independent of each other.
+    """
+
+    def __init__(self, events, maker_fee=0.004, taker_fee=0.006, **algo_params):
+        """
+        :param events: DataFrame with EVENT_COLUMNS
+        :param algo_params: ExecutionAlgo attributes to override, e.g. passive_time_limit
+        """
+        self.clock = SimulatedClock()
+        self.engine = MatchingEngine(maker_fee=maker_fee, taker_fee=taker_fee)
+        self.broker = SimulatedBroker(self.clock, self.engine)
+        self.algo_params = algo_params
+        self.replays = {
+            symbol: MarketReplay(symbol, frame, self.engine) for symbol, frame in events.groupby("symbol")
+        }
+
+    def execute(self, timestamp, symbol, trade):
+        """Work one signed trade from `timestamp`, return its execution report."""
+        replay = self.replays[symbol]
+        self.engine.reset()
+        arrival = to_seconds([timestamp])[0]
+        self.clock.now = arrival
+        self.clock.replay = replay
+        replay.seek(arrival)
+
+        book = self.broker.get_orderbook_data(symbol)
+        mid = (book["best_bid"] + book["best_offer"]) / 2 if book else np.nan
+
+        algo = ExecutionAlgo(self.broker, symbol, clock=self.clock)
+        for name, value in self.algo_params.items():
+            setattr(algo, name, value)
+        algo.execute_trade(trade)
+
+        fills = self.engine.fills
+        filled = sum(order["filled"] for order in fills)
+        cost = sum(order["cost"] for order in fills)
+        average = cost / filled if filled else np.nan
+        sign = 1 if trade > 0 else -1
+        return {
+            "timestamp": timestamp,
+            "symbol": symbol,
+            "trade": trade,
+            "arrival_mid": mid,
+            "filled": sign * filled,
+            "average_price": average,
+            "fees": sum(order["fee"]["cost"] for order in fills),
+            # positive is worse than the arrival mid
+            "slippage_bps": sign * (average - mid) / mid * 1e4,
+            "time_to_fill": fills[-1]["lastTradeTimestamp"] - arrival if fills else np.nan,
+            "orders_placed": len(self.engine.orders),
+            "maker_fills": sum(order["liquidity"] == "maker" for order in fills),
+        }
+
+    def run(self, orders):
+        """
+        :param orders: DataFrame with timestamp, symbol and signed trade columns
+        :return: (reports DataFrame, summary dict)
+        """
+        start = time.perf_counter()
+        reports = [
+            self.execute(timestamp, symbol, trade)
+            for timestamp, symbol, trade in orders[["timestamp", "symbol", "trade"]].itertuples(index=False)
+        ]
+        elapsed = time.perf_counter() - start
+
+        reports = pd.DataFrame(reports)
+        placed = int(reports["orders_placed"].sum()) if len(reports) else 0
+        summary = {
+            "orders": len(reports),
+            "fill_rate": float((reports["filled"] != 0).mean()) if len(reports) else np.nan,
+            "mean_slippage_bps": float(reports["slippage_bps"].mean()) if len(reports) else np.nan,
+            "elapsed": elapsed,
+            "executions_per_second": len(reports) / elapsed if elapsed > 0 else float("inf"),
+            "orders_per_second": placed / elapsed if elapsed > 0 else float("inf"),
+        }
+        return reports, summary
@@ -0,0 +1,28 @@
+# python -m benchmarks.bench_backtest
+import argparse
+import time
+
+from backtest import Backtester
+from .common import synthetic_ohlcv
+
+
+def main(n_symbols, days):
+    bars_per_symbol = days * 288  # 5m bars
+    symbols = tuple(f"C{i}/USD" for i in range(n_symbols))
+    start = time.perf_counter()
+    data = synthetic_ohlcv(n_symbols * bars_per_symbol, symbols=symbols)
+    print(f"{n_symbols} symbols x {days} days of 5m bars = {len(data):,} bars "
+          f"(generated in {time.perf_counter() - start:.1f}s)")
+
+    result = Backtester().run(data)
+    summary = result.summary
+    print(f"{summary['elapsed']:.2f}s, {summary['bars_per_second']:,.0f} bars/s, "
+          f"{summary['trades']:,} trades, pnl {summary['pnl']:,.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="vectorized backtester throughput")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+    main(args.symbols, args.days)
@@ -0,0 +1,54 @@
+# python -m benchmarks.bench_feed
+import argparse
+import asyncio
+import tempfile
+import time
+
+from data import market_data_feed
+from data.market_data_feed import MarketDataFeed
+from .fakes import FakeExchange
+
+FIVE_MIN = 5 * 60_000
+
+
+async def _poll(feed):
+    start = time.perf_counter()
+    await feed.update_market_data()
+    return time.perf_counter() - start
+
+
+def main(symbol_counts, latency, max_in_flight, rate_limit):
+    print(f"fake exchange latency {latency * 1e3:.0f}ms, {max_in_flight} in flight, {rate_limit} req/s")
+    print(f"{'symbols':>8} {'cold poll (s)':>14} {'warm poll (s)':>14} {'requests':>9}")
+    for n_symbols in symbol_counts:
+        now = 1_719_273_600_000 + 12 * FIVE_MIN + 1
+        exchange = FakeExchange(now, latency=latency)
+        market_data_feed.now_ms = lambda: exchange.now_ms  # feed runs on the fake clock
+        with tempfile.TemporaryDirectory() as data_dir:
+            feed = MarketDataFeed(
+                "key", "secret", data_dir, persist=False, exchange_factory=lambda: exchange,
+                max_in_flight=max_in_flight, rate_limit=rate_limit,
+            )
+            feed.add_subscription([f"C{i}/USD" for i in range(n_symbols)])
+            for symbol in feed.symbols:
+                feed.high_water_marks.update(symbol, now - 13 * FIVE_MIN)
+
+            async def run():
+                cold = await _poll(feed)  # includes client creation and load_markets
+                exchange.now_ms += FIVE_MIN
+                warm = await _poll(feed)
+                await feed.exchange.close()
+                return cold, warm
+
+            cold, warm = asyncio.run(run())
+            print(f"{n_symbols:>8} {cold:>14.3f} {warm:>14.3f} {sum(exchange.calls.values()):>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="symbol count vs poll latency")
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--rate-limit", type=float, default=10)
+    args = parser.parse_args()
+    main(args.symbols, args.latency, args.max_in_flight, args.rate_limit)
@@ -0,0 +1,39 @@
+# python -m benchmarks.bench_incremental
+import argparse
+import time
+import warnings
+
+from signals.incremental import IncrementalSignalEngine
+from signals.pipeline import run_pipeline
+from .common import synthetic_ohlcv
+
+
+def main(n_symbols, bars_per_day):
+    warnings.simplefilter("ignore")
+    symbols = tuple(f"C{i}/USD" for i in range(n_symbols))
+    data = synthetic_ohlcv(n_symbols * bars_per_day, symbols=symbols)
+    timestamps = sorted(data["timestamp"].unique())
+    engine = IncrementalSignalEngine()
+
+    checkpoints = {bars_per_day // 8, bars_per_day // 4, bars_per_day // 2, bars_per_day}
+    print(f"{n_symbols} symbols, per-cycle latency through the day")
+    print(f"{'bar':>6} {'batch (ms)':>11} {'incremental (ms)':>17}")
+    for i, timestamp in enumerate(timestamps, start=1):
+        new_bars = data[data["timestamp"] == timestamp]
+        start = time.perf_counter()
+        engine.update(new_bars)
+        incremental = time.perf_counter() - start
+
+        if i in checkpoints:
+            start = time.perf_counter()
+            run_pipeline(data[data["timestamp"] <= timestamp], executor=None)
+            batch = time.perf_counter() - start
+            print(f"{i:>6} {batch * 1e3:>11.1f} {incremental * 1e3:>17.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="batch vs incremental indicator cycle")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--bars", type=int, default=288)
+    args = parser.parse_args()
+    main(args.symbols, args.bars)
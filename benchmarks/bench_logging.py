@@ -0,0 +1,42 @@
+# python -m benchmarks.bench_logging
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.common import synthetic_ohlcv
+from utils.logger import flush_logs, setup_logger
+
+
+def main(n_calls):
+    frame = synthetic_ohlcv(1000)
+    directory = tempfile.mkdtemp()
+
+    # what setup_logger did before: a FileHandler written from the caller
+    direct = logging.getLogger("bench_direct")
+    direct.propagate = False
+    handler = logging.FileHandler(os.path.join(directory, "direct.log"))
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    direct.addHandler(handler)
+    queued = setup_logger("bench_queued", os.path.join(directory, "queued.log"))
+
+    print(f"{n_calls:,} calls each, caller-side time")
+    for name, call in (
+        ("file, f-string", lambda i: direct.info(f"cycle {i}: {frame}")),
+        ("queue, lazy", lambda i: queued.info("cycle %d: %s", i, frame)),
+        ("queue, short", lambda i: queued.info("order %d filled", i)),
+    ):
+        start = time.perf_counter()
+        for i in range(n_calls):
+            call(i)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>16}: {elapsed / n_calls * 1e6:8.1f} us/call")
+        flush_logs()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="caller-side cost of a log call")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.calls)
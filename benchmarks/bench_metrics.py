@@ -0,0 +1,44 @@
+# python -m benchmarks.bench_metrics
+import argparse
+import time
+
+from utils.metrics import Metrics
+
+
+def main(n_calls):
+    metrics = Metrics()
+
+    @metrics.timed("decorated")
+    def noop():
+        pass
+
+    def timer():
+        with metrics.timer("span"):
+            pass
+
+    def count():
+        metrics.count("counter")
+
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        pass
+    baseline = time.perf_counter() - start
+
+    print(f"{n_calls:,} calls each")
+    for name, call in (("timer", timer), ("timed", noop), ("count", count)):
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            call()
+        elapsed = time.perf_counter() - start - baseline
+        print(f"{name:>8}: {elapsed / n_calls * 1e9:.0f} ns/call")
+
+    start = time.perf_counter()
+    metrics.snapshot()
+    print(f"snapshot: {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="overhead of the in-process metrics")
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    args = parser.parse_args()
+    main(args.calls)
@@ -0,0 +1,38 @@
+# python -m benchmarks.bench_netting
+import argparse
+
+import numpy as np
+
+from execution.netting import net_signals, reduction_ratio
+from signals.incremental import IncrementalSignalEngine
+from .common import synthetic_ohlcv
+
+
+def main(n_symbols, bars_per_cycle):
+    """A day of 5m bars fed to the signal engine `bars_per_cycle` bars at a time."""
+    symbols = tuple(f"C{i}/USD" for i in range(n_symbols))
+    data = synthetic_ohlcv(n_symbols * 288, symbols=symbols)
+    timestamps = np.sort(data["timestamp"].unique())
+    engine = IncrementalSignalEngine()
+    positions = {}
+
+    n_signals = n_orders = 0
+    for end in range(bars_per_cycle, len(timestamps) + bars_per_cycle, bars_per_cycle):
+        cutoff = timestamps[min(end, len(timestamps)) - 1]
+        signals = engine.update(data[data["timestamp"] <= cutoff])
+        orders = net_signals(signals, np.full(len(signals), 1.0), positions)
+        for order in orders.itertuples(index=False):
+            positions[order.symbol] = order.target
+        n_signals += len(signals)
+        n_orders += len(orders)
+    print(f"{n_symbols} symbols, {bars_per_cycle} bars per cycle: {n_signals} signals -> "
+          f"{n_orders} orders, reduction {reduction_ratio(n_signals, n_orders):.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="orders saved by netting signals per cycle")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--bars", type=int, nargs="+", default=[1, 12, 288])
+    args = parser.parse_args()
+    for bars in args.bars:
+        main(args.symbols, bars)
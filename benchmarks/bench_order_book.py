@@ -0,0 +1,37 @@
+# python -m benchmarks.bench_order_book
+import argparse
+import time
+
+from execution.order_manager import OrderManager
+
+
+def main(cycles, orders_per_cycle, report_every):
+    """A long session: every cycle places orders, sends them and fills most of them."""
+    order_manager = OrderManager(broker=None)
+    print(f"{orders_per_cycle} orders per cycle")
+    print(f"{'cycle':>8} {'orders seen':>12} {'live':>6} {'us/cycle':>9}")
+    elapsed = 0.0
+    for cycle in range(1, cycles + 1):
+        start = time.perf_counter()
+        # orders left open last cycle get cancelled
+        for order in order_manager.get_orders(status="open"):
+            order_manager.transition(order, "canceled")
+        for i in range(orders_per_cycle):
+            order_manager.place_order(f"C{i % 50}/USD", 1.0, "buy" if i % 2 else "sell")
+        for n, order in enumerate(order_manager.process_orders()):
+            result = {"id": f"{cycle}-{n}", "status": "open" if n % 10 == 0 else "closed"}
+            order_manager.apply_exchange_order(order, result)
+        elapsed += time.perf_counter() - start
+        if cycle % report_every == 0:
+            print(f"{cycle:>8} {cycle * orders_per_cycle:>12,} {len(order_manager):>6} "
+                  f"{elapsed / report_every * 1e6:>9.0f}")
+            elapsed = 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="order book cost per cycle over a long session")
+    parser.add_argument("--cycles", type=int, default=20_000)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--report-every", type=int, default=4000)
+    args = parser.parse_args()
+    main(args.cycles, args.orders, args.report_every)
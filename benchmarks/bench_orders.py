@@ -0,0 +1,35 @@
+# python -m benchmarks.bench_orders
+import argparse
+import asyncio
+import time
+
+from execution.order_manager import OrderManager
+from .fakes import FakeAsyncBroker
+
+
+async def _flush(n_orders, latency, max_concurrency):
+    broker = FakeAsyncBroker(latency=latency)
+    order_manager = OrderManager(broker)
+    for i in range(n_orders):
+        order_manager.place_order(f"C{i}/USD", 1.0, "buy")
+    start = time.perf_counter()
+    await order_manager.submit_orders(max_concurrency=max_concurrency)
+    return time.perf_counter() - start
+
+
+def main(order_counts, latency, max_concurrency):
+    print(f"broker round trip {latency * 1e3:.0f}ms")
+    print(f"{'orders':>7} {'serial (s)':>11} {f'concurrent x{max_concurrency} (s)':>20}")
+    for n_orders in order_counts:
+        serial = asyncio.run(_flush(n_orders, latency, 1))
+        concurrent = asyncio.run(_flush(n_orders, latency, max_concurrency))
+        print(f"{n_orders:>7} {serial:>11.3f} {concurrent:>20.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="time to flush a batch of orders")
+    parser.add_argument("--orders", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    args = parser.parse_args()
+    main(args.orders, args.latency, args.max_concurrency)
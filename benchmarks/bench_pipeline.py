@@ -0,0 +1,29 @@
+# python -m benchmarks.bench_pipeline
+import argparse
+import os
+
+from signals.pipeline import run_pipeline
+from .common import synthetic_ohlcv, timeit
+
+
+def main(n_symbols, bars_per_symbol, workers):
+    symbols = tuple(f"C{i}/USD" for i in range(n_symbols))
+    data = synthetic_ohlcv(n_symbols * bars_per_symbol, symbols=symbols)
+    print(f"{n_symbols} symbols x {bars_per_symbol} bars, {os.cpu_count()} cores")
+
+    print(f"{'executor':>10} {'workers':>8} {'seconds':>9}")
+    serial = timeit(run_pipeline, data, executor=None)
+    print(f"{'serial':>10} {1:>8} {serial:>9.3f}")
+    for executor in ("thread", "process"):
+        for n in workers:
+            elapsed = timeit(run_pipeline, data, max_workers=n, executor=executor)
+            print(f"{executor:>10} {n:>8} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="per-symbol indicator pipeline benchmark")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--bars", type=int, default=288)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    main(args.symbols, args.bars, args.workers)
@@ -0,0 +1,60 @@
+# python -m benchmarks.bench_reconcile
+import argparse
+import asyncio
+import time
+
+from .fakes import FakeAsyncBroker
+
+# Picking up fills of resting orders: a get_order_status call per live order
+# (concurrency 8) against OrderReconciler's fetch_open_orders +
+# fetch_my_trades per poll, on a FakeAsyncBroker with per-call latency.
+
+
+def prepare(n_orders, fill_ratio, latency):
+    from execution.order_manager import OrderManager
+    from execution.reconcile import OrderReconciler
+
+    broker = FakeAsyncBroker()
+    order_manager = OrderManager(broker)
+    for i in range(n_orders):
+        order_manager.place_order(f"C{i % 100}/USD", 1.0, "buy", price=100.0)
+    asyncio.run(order_manager.submit_orders(order_type="limit", max_concurrency=64))
+    reconciler = OrderReconciler(order_manager, broker, trade_limit=n_orders)
+    for order in order_manager.get_orders()[:int(n_orders * fill_ratio)]:
+        broker.fill(order.exchange_id, 0.5)
+    broker.latency = latency
+    broker.calls.clear()
+    return broker, order_manager, reconciler
+
+
+async def poll_each(order_manager, broker, max_concurrency=8):
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def poll(order):
+        async with semaphore:
+            order_manager.apply_exchange_order(order, await broker.get_order_status(order.exchange_id))
+
+    await asyncio.gather(*(poll(order) for order in order_manager.get_orders()))
+
+
+def main(n_orders, fill_ratio, latency):
+    print(f"{n_orders} resting orders, {fill_ratio:.0%} partly filled, {latency * 1000:.0f}ms per call")
+    for name in ("get_order_status per order", "OrderReconciler"):
+        broker, order_manager, reconciler = prepare(n_orders, fill_ratio, latency)
+        start = time.perf_counter()
+        if name == "OrderReconciler":
+            asyncio.run(reconciler.reconcile())
+        else:
+            asyncio.run(poll_each(order_manager, broker))
+        seconds = time.perf_counter() - start
+        position = sum(order_manager.get_positions().values())
+        print(f"{name:>28}: {seconds * 1000:8.1f}ms {sum(broker.calls.values()):>6} calls, position {position:g}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--fill-ratio", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+    main(args.orders, args.fill_ratio, args.latency)
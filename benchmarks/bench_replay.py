@@ -0,0 +1,69 @@
+# python -m benchmarks.bench_replay
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtest.replay import ExecutionReplay
+from broker.simulated import MatchingEngine
+from .common import synthetic_market_events
+
+
+def bench_engine(n_orders):
+    """Raw matching engine: resting limit orders filled by a drifting quote."""
+    rng = np.random.default_rng(1)
+    engine = MatchingEngine()
+    engine.on_quote("BTC/USD", 0, 99.9, 1.0, 100.1, 1.0)
+    prices = (100 + rng.normal(0, 1, n_orders)).tolist()
+    start = time.perf_counter()
+    for i, price in enumerate(prices):
+        side = "buy" if price < 100 else "sell"
+        order = engine.submit(i, "BTC/USD", "limit", 1.0, side, price)
+        if i % 4 == 0:
+            engine.cancel(order["id"])
+        if i % 16 == 0:
+            mid = 100 + rng.normal(0, 1)
+            engine.on_quote("BTC/USD", i, mid - 0.1, 1.0, mid + 0.1, 1.0)
+    elapsed = time.perf_counter() - start
+    print(f"engine: {n_orders:,} orders, {len(engine.fills):,} fills, {n_orders / elapsed:,.0f} orders/s")
+
+
+def main(n_events, n_orders, n_symbols):
+    symbols = tuple(f"C{i}/USD" for i in range(n_symbols))
+    events = synthetic_market_events(n_events, symbols=symbols)
+    rng = np.random.default_rng(0)
+    timestamps = events["timestamp"].unique()
+    orders = pd.DataFrame(
+        {
+            # leave room for the 10 minute time limit at the end
+            "timestamp": rng.choice(timestamps[: -700], n_orders),
+            "symbol": rng.choice(symbols, n_orders),
+            "trade": rng.choice([-1, 1], n_orders) * rng.uniform(0.1, 2, n_orders),
+        }
+    )
+    bench_engine(200_000)
+    print(f"{len(events):,} events, {n_orders:,} orders on {n_symbols} symbols")
+
+    patient = {
+        "is_adverse_price_move": lambda trade, bookdata: False,
+        "is_further_adverse_price_move": lambda trade, bookdata: False,
+    }
+    print(f"{'algo':>8} {'fill rate':>10} {'slip bps':>9} {'fill s':>7} {'exec/s':>8} {'orders/s':>9}")
+    for name, params in (("default", {}), ("passive", patient)):
+        replay = ExecutionReplay(events, **params)
+        reports, summary = replay.run(orders)
+        print(
+            f"{name:>8} {summary['fill_rate']:>10.2f} {summary['mean_slippage_bps']:>9.2f} "
+            f"{reports['time_to_fill'].median():>7.0f} {summary['executions_per_second']:>8,.0f} "
+            f"{summary['orders_per_second']:>9,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="execution replay throughput and quality")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--symbols", type=int, default=4)
+    args = parser.parse_args()
+    main(args.events, args.orders, args.symbols)
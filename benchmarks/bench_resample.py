@@ -0,0 +1,44 @@
+# python -m benchmarks.bench_resample
+import argparse
+import time
+
+from benchmarks.common import synthetic_ohlcv
+from data.resample import TimeframeResampler, resample_ohlcv
+
+TIMEFRAMES = ("15m", "1h", "4h", "1d")
+
+
+def main(n_symbols, history, n_cycles):
+    symbols = [f"C{i}/USD" for i in range(n_symbols)]
+    data = synthetic_ohlcv(n_symbols * (history + n_cycles), symbols=symbols)
+    times = data["timestamp"].drop_duplicates().sort_values().tolist()
+    warm, cycles = data[data["timestamp"] < times[history]], times[history:]
+    print(f"{n_symbols} symbols, {history} bars of history, {n_cycles} new 5m bars")
+
+    # every cycle: resample the retained history to every timeframe
+    start = time.perf_counter()
+    for timestamp in cycles:
+        window = data[(data["timestamp"] <= timestamp) & (data["timestamp"] > timestamp - (times[history] - times[0]))]
+        for timeframe in TIMEFRAMES:
+            resample_ohlcv(window, timeframe)
+    full = (time.perf_counter() - start) / n_cycles
+
+    resampler = TimeframeResampler(timeframes=TIMEFRAMES)
+    resampler.append(warm)
+    new_bars = [data[data["timestamp"] == timestamp] for timestamp in cycles]
+    start = time.perf_counter()
+    for bars in new_bars:
+        resampler.append(bars)
+    incremental = (time.perf_counter() - start) / n_cycles
+
+    print(f"  full resample: {full * 1e3:8.2f} ms/cycle")
+    print(f"    incremental: {incremental * 1e3:8.2f} ms/cycle ({full / incremental:.0f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="multi-timeframe bars: full resample vs incremental")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--history", type=int, default=2016)
+    parser.add_argument("--cycles", type=int, default=50)
+    args = parser.parse_args()
+    main(args.symbols, args.history, args.cycles)
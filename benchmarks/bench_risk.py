@@ -0,0 +1,37 @@
+# python -m benchmarks.bench_risk
+import argparse
+import time
+
+import numpy as np
+
+from execution.risk import RiskEngine
+
+
+def main(n_symbols, n_events):
+    rng = np.random.default_rng(0)
+    symbols = [f"C{i}/USD" for i in range(n_symbols)]
+    picks = [symbols[i] for i in rng.integers(n_symbols, size=n_events)]
+    prices = rng.uniform(90, 110, n_events).tolist()
+    quantities = rng.normal(0, 1, n_events).tolist()
+    risk = RiskEngine(max_loss=None, max_symbol_exposure=1e4, max_gross_exposure=1e6,
+                      max_orders_per_minute=10**9)
+
+    print(f"{n_symbols} symbols, {n_events:,} calls each")
+    for name, call in (
+        ("on_fill", lambda s, q, p: risk.on_fill(s, q, p)),
+        ("on_mark", lambda s, q, p: risk.on_mark(s, p)),
+        ("check_order", lambda s, q, p: risk.check_order(s, abs(q), "buy" if q > 0 else "sell", p)),
+    ):
+        start = time.perf_counter()
+        for symbol, quantity, price in zip(picks, quantities, prices):
+            call(symbol, quantity, price)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>12}: {elapsed / n_events * 1e6:.2f} us/call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="risk engine cost per call")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--events", type=int, default=500_000)
+    args = parser.parse_args()
+    main(args.symbols, args.events)
@@ -0,0 +1,62 @@
+# python -m benchmarks.bench_runtime
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.bar_events import BarQueue
+
+
+def _bars():
+    return pd.DataFrame({"timestamp": [pd.Timestamp.now()], "symbol": ["BTC/USD"]})
+
+
+async def producer(queue, closes, n_bars, interval):
+    for _ in range(n_bars):
+        await asyncio.sleep(interval * random.uniform(0.9, 1.1))
+        closes.append(time.monotonic())
+        queue.publish(_bars())
+    queue.close()
+
+
+async def event_driven(n_bars, interval, cycle):
+    queue, closes, latencies = BarQueue(), [], []
+    task = asyncio.create_task(producer(queue, closes, n_bars, interval))
+    while (event := await queue.get()) is not None:
+        await asyncio.sleep(cycle)  # signals + orders
+        latencies.append(time.monotonic() - event.published_at)
+    await task
+    return latencies
+
+
+async def timer_driven(n_bars, interval, cycle):
+    # the old loop: a cycle every interval, whenever the bar happened to land
+    queue, closes, latencies = BarQueue(), [], []
+    task = asyncio.create_task(producer(queue, closes, n_bars, interval))
+    while not task.done():
+        await asyncio.sleep(interval)
+        if queue.pending is not None:
+            event = await queue.get()
+            await asyncio.sleep(cycle)
+            latencies.append(time.monotonic() - event.published_at)
+    return latencies
+
+
+def main(n_bars, interval, cycle):
+    print(f"{n_bars} bars every ~{interval * 1000:.0f}ms, {cycle * 1000:.0f}ms cycle")
+    for name, run in (("timer", timer_driven), ("bar queue", event_driven)):
+        latencies = np.array(asyncio.run(run(n_bars, interval, cycle))) * 1000
+        print(f"{name:>10}: bar close to order p50 {np.median(latencies):7.1f}ms, "
+              f"p99 {np.percentile(latencies, 99):7.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bar close to order latency, timer vs bar events")
+    parser.add_argument("--bars", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.1)
+    parser.add_argument("--cycle", type=float, default=0.005)
+    args = parser.parse_args()
+    main(args.bars, args.interval, args.cycle)
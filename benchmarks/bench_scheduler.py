@@ -0,0 +1,57 @@
+# python -m benchmarks.bench_scheduler
+import argparse
+import asyncio
+import time
+
+from execution.scheduler import ExecutionScheduler
+from .fakes import FakeAsyncBroker
+
+
+async def _run(n_orders, n_symbols, latency, tick, fill_after):
+    broker = FakeAsyncBroker(latency=latency, fill_after=fill_after)
+    # a locked book keeps orders passive until they fill
+    broker.bookdata["best_offer"] = broker.bookdata["best_bid"]
+    scheduler = ExecutionScheduler(broker, tick=tick, max_concurrency=64)
+    for i in range(n_symbols):
+        algo = scheduler.get_algo(f"C{i}/USD")
+        algo.passive_time_limit = 20 * tick
+        algo.total_time_limit = 40 * tick
+    runner = asyncio.create_task(scheduler.run())
+    start = time.perf_counter()
+    tasks = [
+        scheduler.submit(f"C{i % n_symbols}/USD", 1.0 if i % 2 else -1.0) for i in range(n_orders)
+    ]
+    await asyncio.gather(*(task.done for task in tasks))
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+    await runner
+    return elapsed, scheduler.metrics(), broker.calls
+
+
+def main(order_counts, n_symbols, latency, tick, fill_after):
+    print(f"{n_symbols} symbols, broker latency {latency * 1e3:.0f}ms, tick {tick}s, fills after {fill_after}s")
+    print(
+        f"{'orders':>7} {'wall (s)':>9} {'orders/s':>9} {'latency p50/p99 (ms)':>21} "
+        f"{'fill p50/p99 (ms)':>18} {'book calls':>11}"
+    )
+    for n_orders in order_counts:
+        elapsed, metrics, calls = asyncio.run(_run(n_orders, n_symbols, latency, tick, fill_after))
+        latency_ms = metrics["order_latency"]
+        fill_ms = metrics["fill_time"]
+        print(
+            f"{n_orders:>7} {elapsed:>9.3f} {n_orders / elapsed:>9.0f} "
+            f"{latency_ms['p50'] * 1e3:>10.1f}/{latency_ms['p99'] * 1e3:<10.1f} "
+            f"{fill_ms['p50'] * 1e3:>8.1f}/{fill_ms['p99'] * 1e3:<9.1f} "
+            f"{calls['get_orderbook_data']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="concurrent execution throughput")
+    parser.add_argument("--orders", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--tick", type=float, default=0.05)
+    parser.add_argument("--fill-after", type=float, default=0.1)
+    args = parser.parse_args()
+    main(args.orders, args.symbols, args.latency, args.tick, args.fill_after)
@@ -0,0 +1,58 @@
+# python -m benchmarks.bench_signals
+import argparse
+import warnings
+
+import pandas as pd
+
+from signals.smart_money import (
+    identify_market_phases,
+    detect_volume_spikes,
+    determine_limit_price,
+    generate_signals,
+)
+from .common import synthetic_ohlcv, timeit
+
+# the row-by-row loop is quadratic, don't run it past this size
+LEGACY_MAX_ROWS = 20_000
+
+
+def legacy_generate_signals(data):
+    """The original iterrows implementation, kept as the reference output."""
+    data = identify_market_phases(data)
+    data = detect_volume_spikes(data)
+    data = data.reset_index()
+
+    signals = []
+
+    for i, row in data.iterrows():
+        if row["phase"] == "markup" and row["volume_spike"] == 1:
+            limit_price = determine_limit_price(data[: i + 1])
+            signals.append((row["timestamp"], row["symbol"], "buy", limit_price))
+        elif data["phase"].iloc[i] == "markdown" and data["volume_spike"].iloc[i] == 1:
+            limit_price = determine_limit_price(data[: i + 1])
+            signals.append((row["timestamp"], row["symbol"], "sell", limit_price))
+
+    signals_df = pd.DataFrame(signals, columns=["timestamp", "symbol", "signal", "price"])
+
+    return data, signals_df
+
+
+def main(sizes):
+    warnings.simplefilter("ignore")
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n_rows in sizes:
+        data = synthetic_ohlcv(n_rows)
+        fast = timeit(lambda: generate_signals(data.copy()))
+        if n_rows <= LEGACY_MAX_ROWS:
+            slow = timeit(lambda: legacy_generate_signals(data.copy()), repeat=1)
+            print(f"{n_rows:>10} {slow:>12.3f} {fast:>15.4f} {slow / fast:>8.0f}x")
+        else:
+            print(f"{n_rows:>10} {'-':>12} {fast:>15.4f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="generate_signals benchmark")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    main(parser.parse_args().sizes)
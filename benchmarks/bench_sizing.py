@@ -0,0 +1,40 @@
+# python -m benchmarks.bench_sizing
+import argparse
+import time
+
+from benchmarks.common import synthetic_ohlcv
+from execution.sizing import atr_position_size
+from signals.incremental import IncrementalSignalEngine
+
+
+def main(n_symbols, n_lookups):
+    symbols = [f"C{i}/USD" for i in range(n_symbols)]
+    engine = IncrementalSignalEngine()
+    engine.update(synthetic_ohlcv(200 * n_symbols, symbols=symbols))
+    picks = [symbols[i % n_symbols] for i in range(n_lookups)]
+
+    def frame_lookup():
+        # the previous cycle: snapshot frame, then .loc per symbol
+        atr = engine.snapshot()[["timestamp", "atr"]]
+        for symbol in picks:
+            atr_position_size(atr.loc[symbol]["atr"], 3000, 10, 0.25)
+
+    def table_lookup():
+        latest = engine.latest
+        for symbol in picks:
+            atr_position_size(latest.get(symbol, "atr"), 3000, 10, 0.25)
+
+    print(f"{n_symbols} symbols, {n_lookups:,} sized signals")
+    for name, run in (("frame .loc", frame_lookup), ("latest table", table_lookup)):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>13}: {elapsed * 1e3:8.2f} ms, {elapsed / n_lookups * 1e6:6.2f} us/lookup")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="per-signal ATR lookup and sizing")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args()
+    main(args.symbols, args.lookups)
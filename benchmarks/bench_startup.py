@@ -0,0 +1,96 @@
+# python -m benchmarks.bench_startup
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Time to first trading cycle in a fresh interpreter: imports, then either a
+# cold rebuild (load the stored history, replay it through the indicators)
+# or a warm restore from the state snapshot, then one cycle on a new bar.
+
+CHILD = """
+import sys, time
+began = float(sys.argv[1])
+mode, directory, eager, start, end = sys.argv[2], sys.argv[3], sys.argv[4] == "1", sys.argv[5], sys.argv[6]
+if eager:
+    import ccxt.async_support  # what importing the broker and feed cost before
+import broker, data, execution
+from data.candle_store import CandleStore
+from data.storage import NpyStorage
+from execution.order_manager import OrderManager
+from execution.risk import RiskEngine
+from signals.incremental import IncrementalSignalEngine
+from utils.snapshot import read_snapshot
+imported = time.time()
+
+store, engine = CandleStore(retention=2016), IncrementalSignalEngine()
+order_manager, risk = OrderManager(broker=None), RiskEngine()
+if mode == "cold":
+    history = NpyStorage(directory).load(start=start, end=end)
+    store.append(history)
+    engine.update(store.to_frame())
+else:
+    state = read_snapshot(directory + "/state.snapshot")
+    store.set_state(state["candles"])
+    engine.set_state(state["engine"])
+    order_manager.set_state(state["orders"])
+    risk.set_state(state["risk"])
+ready = time.time()
+
+import pandas as pd
+bar = store.to_frame().groupby("symbol").tail(1)
+bar = bar.assign(timestamp=bar["timestamp"] + pd.Timedelta(minutes=5))
+store.append(bar)
+engine.update(store.to_frame(since=engine.last_timestamps()))
+done = time.time()
+print(imported - began, ready - imported, done - began, "ccxt" in sys.modules)
+"""
+
+
+def prepare(directory, n_symbols, n_bars):
+    from benchmarks.common import synthetic_ohlcv
+    from data.candle_store import CandleStore
+    from data.storage import NpyStorage
+    from execution.order_manager import OrderManager
+    from execution.risk import RiskEngine
+    from signals.incremental import IncrementalSignalEngine
+    from utils.snapshot import write_snapshot
+
+    data = synthetic_ohlcv(n_symbols * n_bars, symbols=[f"C{i}/USD" for i in range(n_symbols)])
+    NpyStorage(directory).write(data, "ohlcv")
+    store, engine = CandleStore(retention=2016), IncrementalSignalEngine()
+    store.append(data)
+    engine.update(data)
+    state = {"candles": store.get_state(), "engine": engine.get_state(),
+             "orders": OrderManager(broker=None).get_state(), "risk": RiskEngine().get_state()}
+    size = write_snapshot(os.path.join(directory, "state.snapshot"), state)
+    return size, str(data["timestamp"].min()), str(data["timestamp"].max())
+
+
+def main(n_symbols, n_bars, repeat):
+    directory = tempfile.mkdtemp()
+    size, start, end = prepare(directory, n_symbols, n_bars)
+    print(f"{n_symbols} symbols x {n_bars} bars, snapshot {size / 1e6:.1f} MB")
+    for name, mode, eager in (("cold, eager ccxt", "cold", "1"), ("warm, lazy ccxt", "warm", "0")):
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", CHILD, str(time.time()), mode, directory, eager, start, end],
+                capture_output=True, text=True, check=True,
+            ).stdout.split()
+            runs.append(output)
+        best = min(runs, key=lambda run: float(run[2]))
+        imports, state, total, ccxt = float(best[0]), float(best[1]), float(best[2]), best[3]
+        print(f"{name:>17}: imports {imports:.2f}s, state {state:.3f}s, "
+              f"first cycle after {total:.2f}s (ccxt loaded: {ccxt})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="process start to first trading cycle")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--bars", type=int, default=2016)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.symbols, args.bars, args.repeat)
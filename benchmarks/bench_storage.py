@@ -0,0 +1,53 @@
+# python -m benchmarks.bench_storage
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from data.storage import CsvStorage, NpyStorage
+from .common import synthetic_ohlcv
+
+BARS_PER_DAY = 288
+
+
+def _write_days(storage, data, days):
+    # one write per day, as the feed would have made them
+    start = time.perf_counter()
+    for day, frame in data.groupby(data["timestamp"].dt.normalize()):
+        storage.write(frame)
+    return time.perf_counter() - start
+
+
+def main(n_symbols, days):
+    symbols = tuple(f"C{i}/USD" for i in range(n_symbols))
+    data = synthetic_ohlcv(n_symbols * days * BARS_PER_DAY, symbols=symbols)
+    first = data["timestamp"].min().normalize()
+    one_day = (first, first + pd.Timedelta(hours=23, minutes=55))
+    query = (first + pd.Timedelta(days=days // 2 - 1), first + pd.Timedelta(days=days // 2 + 2))
+    print(f"{n_symbols} symbols x {days} days ({len(data)} rows)")
+    print(f"{'backend':>8} {'write rows/s':>13} {'cold day load (s)':>18} {'3-day query (s)':>16}")
+
+    for name, storage_cls in (("csv", CsvStorage), ("npy", NpyStorage)):
+        with tempfile.TemporaryDirectory() as data_dir:
+            storage = storage_cls(data_dir)
+            write = _write_days(storage, data, days)
+
+            start = time.perf_counter()
+            storage.load(start=one_day[0], end=one_day[1])
+            load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            storage.load([symbols[0]], *query)
+            multi_day = time.perf_counter() - start
+
+            print(f"{name:>8} {len(data) / write:>13,.0f} {load:>18.3f} {multi_day:>16.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="csv vs columnar storage benchmark")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+    main(args.symbols, args.days)
@@ -0,0 +1,95 @@
+# python -m benchmarks.bench_supervisor
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from .common import synthetic_days
+from .fakes import FakeAsyncBroker
+
+# The sharded runtime on synthetic candles: the supervisor process holds the
+# shared candle store and the broker gateway (a FakeAsyncBroker), the workers
+# run one TradingSystem per shard. Times the warm-up on the stored history
+# (including process start) and then each bar close until every worker has
+# finished its cycle, for a growing number of shards.
+
+
+def _cycles(directory, name):
+    try:
+        with open(os.path.join(directory, f"{name}.metrics.json")) as file:
+            return json.load(file)["timers"]["cycle"]["count"]
+    except (OSError, KeyError, ValueError):
+        return 0
+
+
+async def _wait_cycles(directory, names, count):
+    while any(_cycles(directory, name) < count for name in names):
+        await asyncio.sleep(0.002)
+
+
+def run(data, shards, n_bars):
+    from runtime import SharedCandleStore, Supervisor, plan_workers
+
+    symbols = sorted(data["symbol"].unique())
+    timestamps = data["timestamp"].drop_duplicates().sort_values()
+    bars = [data[data["timestamp"] == timestamp] for timestamp in timestamps.iloc[-n_bars:]]
+    store = SharedCandleStore(symbols)
+    store.append(data[data["timestamp"] < timestamps.iloc[-n_bars]])
+    directory = tempfile.mkdtemp()
+    broker = FakeAsyncBroker()
+    supervisor = Supervisor(
+        plan_workers(symbols, {"s": {"max_loss": float("inf")}}, shards), store, {"default": broker},
+        directory=directory, check_interval=0.1,
+    )
+    names = list(supervisor.workers)
+
+    async def main():
+        running = asyncio.create_task(supervisor.run())
+        start = time.perf_counter()
+        await _wait_cycles(directory, names, 1)
+        warm_up = time.perf_counter() - start
+        latencies = []
+        for i, bar in enumerate(bars, 2):
+            start = time.perf_counter()
+            store.append(bar)
+            supervisor.publish(bar)
+            await _wait_cycles(directory, names, i)
+            latencies.append(time.perf_counter() - start)
+        supervisor.stop()
+        await running
+        return warm_up, latencies
+
+    try:
+        warm_up, latencies = asyncio.run(main())
+    finally:
+        store.close()
+        store.unlink()
+    return warm_up, np.array(latencies), broker.calls["place_order"]
+
+
+def main(n_symbols, days, n_bars, max_shards):
+    data = synthetic_days(n_symbols, days)
+    history_rows = len(data) - n_symbols * n_bars
+    print(f"{n_symbols} symbols x {days} days, {os.cpu_count()} cores")
+    print(f"{'shards':>6} {'warm-up':>9} {'history rows/s':>15} {'bar p50':>9} {'bar rows/s':>11} {'orders':>7}")
+    shards = 1
+    while shards <= max_shards:
+        warm_up, latencies, orders = run(data, shards, n_bars)
+        print(f"{shards:>6} {warm_up:>8.2f}s {history_rows / warm_up:>15,.0f} "
+              f"{np.median(latencies) * 1000:>7.1f}ms {n_symbols * len(latencies) / latencies.sum():>11,.0f} "
+              f"{orders:>7}")
+        shards *= 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=64)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--bars", type=int, default=20)
+    parser.add_argument("--max-shards", type=int, default=4)
+    args = parser.parse_args()
+    main(args.symbols, args.days, args.bars, args.max_shards)
@@ -0,0 +1,44 @@
+# python -m benchmarks.bench_sweep
+import argparse
+import os
+import time
+
+from backtest import ParameterSweep
+from backtest.optimizer import random_parameters
+from .common import synthetic_ohlcv
+
+SPACE = {
+    "fast": [5, 8, 10, 12, 15, 20],
+    "slow": [50, 75, 100, 150, 200],
+    "volume_window": [10, 20, 30],
+    "threshold": [1.5, 2, 2.5, 3],
+    "window": [10, 20, 40],
+    "atr_period": [7, 14, 21],
+    "risk_target": [0.1, 0.25, 0.5],
+    "portfolio_size": [5, 10, 20],
+}
+
+
+def main(n_symbols, days, n_combos, workers):
+    symbols = tuple(f"C{i}/USD" for i in range(n_symbols))
+    data = synthetic_ohlcv(n_symbols * days * 288, symbols=symbols)
+    combos = random_parameters(SPACE, n_combos)
+    sweep = ParameterSweep(data, max_workers=workers)
+    print(f"{len(data):,} bars, {len(combos):,} combos, {sweep.max_workers} workers ({os.cpu_count()} cores)")
+
+    start = time.perf_counter()
+    results = sweep.run(combos)
+    elapsed = time.perf_counter() - start
+    print(f"sweep: {elapsed:.1f}s, {len(combos) / elapsed:,.1f} combos/s, "
+          f"results table {results.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+    print(results.nlargest(3, "pnl").to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="parameter sweep throughput")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--combos", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    main(args.symbols, args.days, args.combos, args.workers)
@@ -0,0 +1,227 @@
+import asyncio
+import bisect
+import time
+from collections import Counter
+
+import ccxt.async_support as ccxt
+import numpy as np
+
+from broker.base import Broker
+from data.ingestion import TIMEFRAME_MS
+
+
+class FakeExchange:
+    """
+    Local stand-in for ccxt.async_support.coinbase. Serves deterministic
+    synthetic candles up to `now_ms` and counts the calls it receives.
+    """
+
+    def __init__(self, now_ms, latency=0.0, max_limit=300, missing=(), rate_limited=0):
+        self.now_ms = now_ms
+        self.latency = latency
+        self.max_limit = max_limit
+        self.missing = set(missing)  # candle timestamps the exchange has no data for
+        self.rate_limited = rate_limited  # number of requests to answer with a 429
+        self.calls = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed = False
+
+    async def _request(self, name):
+        self.calls[name] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if self.rate_limited > 0:
+            self.rate_limited -= 1
+            raise ccxt.RateLimitExceeded("429 Too Many Requests")
+
+    def candle(self, symbol, timestamp):
+        rng = np.random.default_rng([timestamp // 60_000, sum(map(ord, symbol))])
+        open_, close = rng.uniform(99, 101, 2)
+        return [
+            timestamp, open_, max(open_, close) + 0.1, min(open_, close) - 0.1, close,
+            rng.uniform(1, 10),
+        ]
+
+    async def load_markets(self, reload=False):
+        await self._request("load_markets")
+        return {}
+
+    async def fetch_ohlcv(self, symbol, timeframe="5m", since=None, limit=None):
+        await self._request("fetch_ohlcv")
+        timeframe_ms = TIMEFRAME_MS[timeframe]
+        limit = min(limit or self.max_limit, self.max_limit)
+        start = -(-since // timeframe_ms) * timeframe_ms  # round up to the bar grid
+        # includes the still-forming bar, like the real endpoint
+        stop = min(self.now_ms, start + limit * timeframe_ms - 1)
+        return [
+            self.candle(symbol, timestamp)
+            for timestamp in range(start, stop + 1, timeframe_ms)
+            if timestamp not in self.missing
+        ]
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeAsyncBroker:
+    """
+    In-memory AsyncBroker: every call takes `latency` seconds and is recorded.
+    Limit orders fill `fill_after` seconds after they are placed (never by
+    default), or when the test calls fill(); fills made with fill() are
+    listed by fetch_my_trades.
+    """
+
+    def __init__(self, latency=0.0, bookdata=None, fill_after=None):
+        self.latency = latency
+        self.fill_after = fill_after
+        self.bookdata = bookdata or {
+            "best_bid": 100.0,
+            "best_bid_size": 1.0,
+            "best_offer": 100.1,
+            "best_offer_size": 1.0,
+        }
+        self.orders = {}
+        self.trades = []
+        self.cancelled = []
+        self.calls = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _call(self, name):
+        self.calls[name] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+    async def get_orderbook_data(self, symbol):
+        await self._call("get_orderbook_data")
+        return dict(self.bookdata)
+
+    async def place_order(self, symbol, order_type, amount, side, price=None):
+        await self._call("place_order")
+        order_id = str(len(self.orders) + 1)
+        status = "closed" if order_type == "market" else "open"
+        self.orders[order_id] = {
+            "id": order_id, "symbol": symbol, "type": order_type, "amount": amount,
+            "side": side, "price": price, "status": status,
+            "filled": amount if status == "closed" else 0.0,
+            "timestamp": asyncio.get_running_loop().time(),
+        }
+        return dict(self.orders[order_id])
+
+    def fill(self, order_id, amount=None, price=None, timestamp=None):
+        """
+        Fill part of an open order (the rest of it by default) and record the trade.
+
+        :param timestamp: epoch ms of the trade, now by default
+        """
+        order = self.orders[order_id]
+        amount = order["amount"] - order["filled"] if amount is None else amount
+        order["filled"] += amount
+        if order["filled"] >= order["amount"]:
+            order["status"] = "closed"
+        self.trades.append({
+            "id": str(len(self.trades) + 1), "order": order_id, "symbol": order["symbol"],
+            "side": order["side"], "amount": amount,
+            "price": price or order["price"] or self.bookdata["best_offer"],
+            "timestamp": int(time.time() * 1000) if timestamp is None else timestamp,
+        })
+
+    async def fetch_open_orders(self, symbol=None):
+        await self._call("fetch_open_orders")
+        return [
+            dict(order) for order in self.orders.values()
+            if order["status"] == "open" and symbol in (None, order["symbol"])
+        ]
+
+    async def fetch_my_trades(self, symbol=None, since=None, limit=None):
+        await self._call("fetch_my_trades")
+        start = 0 if since is None else bisect.bisect_left(self.trades, since, key=lambda trade: trade["timestamp"])
+        trades = [dict(trade) for trade in self.trades[start:] if symbol in (None, trade["symbol"])]
+        return trades[:limit]
+
+    async def cancel_order(self, order_id):
+        await self._call("cancel_order")
+        self.cancelled.append(order_id)
+        self.orders[order_id]["status"] = "canceled"
+        return dict(self.orders[order_id])
+
+    async def get_order_status(self, order_id):
+        await self._call("get_order_status")
+        order = self.orders[order_id]
+        if (
+            order["status"] == "open"
+            and self.fill_after is not None
+            and asyncio.get_running_loop().time() - order["timestamp"] >= self.fill_after
+        ):
+            order["status"] = "closed"
+            order["filled"] = order["amount"]
+        return dict(order)
+
+    async def close(self):
+        pass
+
+
+class FakeBroker(Broker):
+    """
+    In-memory sync Broker. Market orders fill at once, limit orders
+    `fill_after` seconds of `clock` time after they are placed (never when
+    None); pass a SimulatedClock to run ExecutionAlgo.execute_trade without
+    waiting.
+    """
+
+    def __init__(self, clock=time, bookdata=None, fill_after=0.0, balance=10_000.0):
+        super().__init__("key", "secret")
+        self.clock = clock
+        self.fill_after = fill_after
+        self.balance = balance
+        self.bookdata = bookdata or {
+            "best_bid": 100.0,
+            "best_bid_size": 1.0,
+            "best_offer": 100.1,
+            "best_offer_size": 1.0,
+        }
+        self.orders = {}
+        self.calls = Counter()
+
+    def get_account_balance(self):
+        self.calls["get_account_balance"] += 1
+        return {"USD": {"free": self.balance, "total": self.balance}}
+
+    def get_orderbook_data(self, symbol):
+        self.calls["get_orderbook_data"] += 1
+        return dict(self.bookdata)
+
+    def place_order(self, symbol, order_type, amount, side, price=None):
+        self.calls["place_order"] += 1
+        order_id = str(len(self.orders) + 1)
+        self.orders[order_id] = {
+            "id": order_id, "symbol": symbol, "type": order_type, "amount": amount,
+            "side": side, "price": price, "status": "closed" if order_type == "market" else "open",
+            "timestamp": self.clock.time(),
+        }
+        return dict(self.orders[order_id])
+
+    def cancel_order(self, order_id):
+        self.calls["cancel_order"] += 1
+        self.orders[order_id]["status"] = "canceled"
+        return dict(self.orders[order_id])
+
+    def get_order_status(self, order_id):
+        self.calls["get_order_status"] += 1
+        order = self.orders[order_id]
+        if (
+            order["status"] == "open"
+            and self.fill_after is not None
+            and self.clock.time() - order["timestamp"] >= self.fill_after
+        ):
+            order["status"] = "closed"
+        return dict(order)
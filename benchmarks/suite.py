@@ -0,0 +1,185 @@
+# python -m benchmarks.suite [--update-baseline]
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from .common import synthetic_days
+from .fakes import FakeAsyncBroker, FakeBroker
+
+# Offline throughput of the data -> signal -> order path on synthetic candles
+# and in-memory brokers, checked against benchmarks/baseline.json. A case
+# regresses when its rate drops more than `tolerance` below the baseline.
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _best(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_load_data(data, directory, repeat):
+    from data.storage import get_storage
+    from signals.smart_money import load_data
+
+    start, end = str(data["timestamp"].min()), str(data["timestamp"].max())
+    results = {}
+    for backend in ("csv", "npy"):
+        backend_dir = os.path.join(directory, backend)
+        storage = get_storage(backend, backend_dir)
+        os.makedirs(backend_dir, exist_ok=True)
+        storage.write(data, "ohlcv")
+        seconds = _best(lambda: load_data(backend_dir, start=start, end=end, backend=backend), repeat)
+        results[f"load_data[{backend}]"] = (seconds, len(data), "rows")
+    return results
+
+
+def bench_indicators(data, repeat):
+    from signals.pipeline import partition_by_symbol
+    from signals.smart_money import calculate_atr, generate_signals
+
+    partitions = partition_by_symbol(data)
+
+    def run(func):
+        for partition in partitions:
+            func(partition.copy())
+
+    return {
+        "generate_signals": (_best(lambda: run(generate_signals), repeat), len(data), "rows"),
+        "calculate_atr": (_best(lambda: run(calculate_atr), repeat), len(data), "rows"),
+    }
+
+
+def bench_trading_cycle(data, n_cycles, directory):
+    from data.candle_store import CandleStore
+    from execution.order_manager import OrderManager
+    from execution.risk import RiskEngine
+    from main import TradingSystem
+
+    timestamps = data["timestamp"].drop_duplicates().sort_values()
+    cutoff = timestamps.iloc[-n_cycles - 1]
+    bars = [frame for _, frame in data[data["timestamp"] > cutoff].groupby("timestamp")]
+    symbols = list(data["symbol"].unique())
+
+    broker = FakeAsyncBroker()
+    store = CandleStore(retention=2016)
+    store.append(data[data["timestamp"] <= cutoff])
+    system = TradingSystem(
+        broker, OrderManager(broker), None, symbols, candle_store=store,
+        risk_engine=RiskEngine(max_loss=None),
+        # keep the log out of the working directory, no metrics or snapshot files
+        log_file=os.path.join(directory, "trading_system.log"), metrics_file="", state_file="",
+    )
+
+    async def run():
+        await system.generate_and_execute_signals()  # warm up on the history
+        placed = broker.calls["place_order"]
+        seconds = 0.0
+        for frame in bars:
+            store.append(frame)  # the feed's work, not timed
+            start = time.perf_counter()
+            await system.generate_and_execute_signals()
+            seconds += time.perf_counter() - start
+        return seconds, broker.calls["place_order"] - placed
+
+    seconds, orders = asyncio.run(run())
+    return {
+        "generate_and_execute_signals": (seconds, sum(len(frame) for frame in bars), "rows"),
+        "generate_and_execute_signals[orders]": (seconds, orders, "orders"),
+    }
+
+
+def bench_execute_trade(n_trades, repeat):
+    from backtest.replay import SimulatedClock
+    from execution.execution import ExecutionAlgo
+
+    def run():
+        clock = SimulatedClock()
+        broker = FakeBroker(clock=clock)
+        algo = ExecutionAlgo(broker, "BTC/USD", clock=clock)
+        for i in range(n_trades):
+            algo.execute_trade(0.01 if i % 2 else -0.01)
+
+    return {"execute_trade": (_best(run, repeat), n_trades, "orders")}
+
+
+def run_suite(n_symbols=20, days=7, n_cycles=50, n_trades=500, repeat=3):
+    """
+    :return: case -> {"seconds", "count", "unit", "rate"}, rate is count per second
+    """
+    from utils.logger import flush_logs
+
+    data = synthetic_days(n_symbols, days)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        results.update(bench_load_data(data, directory, repeat))
+        results.update(bench_indicators(data, repeat))
+        results.update(bench_trading_cycle(data, n_cycles, directory))
+        results.update(bench_execute_trade(n_trades, repeat))
+        flush_logs()  # the writer thread may still be writing to the directory
+    return {
+        case: {"seconds": seconds, "count": count, "unit": unit, "rate": count / seconds}
+        for case, (seconds, count, unit) in results.items()
+    }
+
+
+def find_regressions(results, baseline, tolerance=0.3):
+    """Cases whose rate fell more than `tolerance` (a fraction) below the baseline rate."""
+    regressions = {}
+    for case, expected in baseline.get("cases", {}).items():
+        result = results.get(case)
+        if result is not None and result["rate"] < expected["rate"] * (1 - tolerance):
+            regressions[case] = (result["rate"], expected["rate"])
+    return regressions
+
+
+def main(args):
+    params = {"symbols": args.symbols, "days": args.days, "cycles": args.cycles, "trades": args.trades}
+    results = run_suite(args.symbols, args.days, args.cycles, args.trades, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get("params") != params:
+            print(f"baseline was recorded with {baseline.get('params')}, rates may not compare")
+
+    print(f"{args.symbols} symbols x {args.days} days")
+    print(f"{'case':>38} {'seconds':>9} {'rate':>14} {'baseline':>14}")
+    for case, result in results.items():
+        expected = baseline.get("cases", {}).get(case)
+        reference = f"{expected['rate']:>10,.0f}" if expected else f"{'-':>10}"
+        print(f"{case:>38} {result['seconds']:>9.3f} {result['rate']:>10,.0f} {result['unit'] + '/s':<9}"
+              f"{reference}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump({"params": params, "cases": results}, file, indent=1)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for case, (rate, expected) in regressions.items():
+        print(f"REGRESSION {case}: {rate:,.0f}/s, baseline {expected:,.0f}/s")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="offline throughput suite with a regression check")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--cycles", type=int, default=50)
+    parser.add_argument("--trades", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown, 0.3 = 30%%")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    sys.exit(main(parser.parse_args()))
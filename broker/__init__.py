@@ -1,4 +1,6 @@
 from .coinbase import CoinbaseBroker
-from .base import Broker
+from .async_coinbase import AsyncCoinbaseBroker
+from .base import Broker, AsyncBroker
+from .simulated import SimulatedBroker
 
-__all__ = ["CoinbaseBroker", "Broker"]
+__all__ = ["CoinbaseBroker", "AsyncCoinbaseBroker", "Broker", "AsyncBroker", "SimulatedBroker"]
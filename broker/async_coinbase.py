@@ -0,0 +1,60 @@
+from .base import AsyncBroker
+from .coinbase import top_of_book
+
+
+class AsyncCoinbaseBroker(AsyncBroker):
+    """CoinbaseBroker on ccxt.async_support: one client and connection pool, calls awaited."""
+
+    def __init__(self, api_key, api_secret, market_data=None):
+        super().__init__(api_key, api_secret)
+        self._client = None
+        # optional StreamingMarketData, serves the top of book from memory
+        self.market_data = market_data
+
+    @property
+    def client(self):
+        # importing ccxt loads every exchange it supports, so only on the first request
+        if self._client is None:
+            import ccxt.async_support as ccxt
+
+            self._client = ccxt.coinbase(
+                {
+                    "apiKey": self.api_key,
+                    "secret": self.api_secret,
+                }
+            )
+        return self._client
+
+    async def get_account_balance(self):
+        return await self.client.fetch_balance()
+
+    async def get_orderbook_data(self, symbol):
+        if self.market_data is not None:
+            bookdata = self.market_data.get_orderbook_data(symbol)
+            if bookdata is not None:
+                return bookdata
+        order_book = await self.client.fetch_order_book(symbol)
+        return top_of_book(order_book)
+
+    async def place_order(self, symbol, order_type, amount, side, price=None):
+        if order_type == "limit":
+            order = await self.client.create_limit_order(symbol, side, amount, price)
+        else:
+            order = await self.client.create_market_order(symbol, side, amount)
+        return order
+
+    async def cancel_order(self, order_id):
+        return await self.client.cancel_order(order_id)
+
+    async def get_order_status(self, order_id):
+        return await self.client.fetch_order(order_id)
+
+    async def fetch_open_orders(self, symbol=None):
+        return await self.client.fetch_open_orders(symbol)
+
+    async def fetch_my_trades(self, symbol=None, since=None, limit=None):
+        return await self.client.fetch_my_trades(symbol, since, limit)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
@@ -18,3 +18,39 @@ class Broker:
 
     def get_order_status(self, order_id):
         raise NotImplementedError
+
+    def fetch_open_orders(self, symbol=None):
+        """Every open order of the account (of one symbol if given), in one call."""
+        raise NotImplementedError
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None):
+        """The account's fills from `since` (epoch ms, inclusive), oldest first, in one call."""
+        raise NotImplementedError
+
+
+class AsyncBroker(Broker):
+    """Same interface as Broker, every call is a coroutine so it never blocks the event loop."""
+
+    async def get_account_balance(self):
+        raise NotImplementedError
+
+    async def get_orderbook_data(self, symbol):
+        raise NotImplementedError
+
+    async def place_order(self, symbol, order_type, amount, side, price=None):
+        raise NotImplementedError
+
+    async def cancel_order(self, order_id):
+        raise NotImplementedError
+
+    async def get_order_status(self, order_id):
+        raise NotImplementedError
+
+    async def fetch_open_orders(self, symbol=None):
+        raise NotImplementedError
+
+    async def fetch_my_trades(self, symbol=None, since=None, limit=None):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
@@ -1,16 +1,43 @@
 from .base import Broker
-import ccxt
+
+
+def top_of_book(order_book):
+    return {
+        "best_bid": (
+            order_book["bids"][0][0] if len(order_book["bids"]) > 0 else None
+        ),
+        "best_bid_size": (
+            order_book["bids"][0][1] if len(order_book["bids"]) > 0 else None
+        ),
+        "best_offer": (
+            order_book["asks"][0][0] if len(order_book["asks"]) > 0 else None
+        ),
+        "best_offer_size": (
+            order_book["asks"][0][1] if len(order_book["asks"]) > 0 else None
+        ),
+    }
 
 
 class CoinbaseBroker(Broker):
-    def __init__(self, api_key, api_secret):
+    def __init__(self, api_key, api_secret, market_data=None):
         super().__init__(api_key, api_secret)
-        self.client = ccxt.coinbase(
-            {
-                "apiKey": api_key,
-                "secret": api_secret,
-            }
-        )
+        # optional StreamingMarketData, serves the top of book from memory
+        self.market_data = market_data
+        self._client = None
+
+    @property
+    def client(self):
+        # importing ccxt loads every exchange it supports, so only on the first request
+        if self._client is None:
+            import ccxt
+
+            self._client = ccxt.coinbase(
+                {
+                    "apiKey": self.api_key,
+                    "secret": self.api_secret,
+                }
+            )
+        return self._client
 
     def get_account_balance(self):
         return self.client.fetch_balance()
@@ -19,21 +46,13 @@ class CoinbaseBroker(Broker):
         """ 
         Get orderbook data for one symbol at a time
         """
+        if self.market_data is not None:
+            bookdata = self.market_data.get_orderbook_data(symbol)
+            if bookdata is not None:
+                return bookdata
+        # no stream, or its book snapshot has not arrived yet
         order_book = self.client.fetch_order_book(symbol)
-        return {
-            "best_bid": (
-                order_book["bids"][0][0] if len(order_book["bids"]) > 0 else None
-            ),
-            "best_bid_size": (
-                order_book["bids"][0][1] if len(order_book["bids"]) > 0 else None
-            ),
-            "best_offer": (
-                order_book["asks"][0][0] if len(order_book["asks"]) > 0 else None
-            ),
-            "best_offer_size": (
-                order_book["asks"][0][1] if len(order_book["asks"]) > 0 else None
-            ),
-        }
+        return top_of_book(order_book)
 
     def place_order(self, symbol, order_type, amount, side, price=None):
         if order_type == "limit":
@@ -47,3 +66,9 @@ class CoinbaseBroker(Broker):
 
     def get_order_status(self, order_id):
         return self.client.fetch_order(order_id)
+
+    def fetch_open_orders(self, symbol=None):
+        return self.client.fetch_open_orders(symbol)
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None):
+        return self.client.fetch_my_trades(symbol, since, limit)
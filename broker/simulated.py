@@ -0,0 +1,154 @@
+import heapq
+import itertools
+
+from .base import Broker
+
+
+class MatchingEngine:
+    """
+    In-process limit order matching against a replayed market: top-of-book
+    quotes and trade prints per symbol.
+
+    Market orders and marketable limit orders take the touch at once.
+    Resting limit orders fill at their limit price as soon as the opposite
+    quote reaches it or a trade prints through it. Orders fill in full;
+    queue position and market impact are not modelled.
+    """
+
+    def __init__(self, maker_fee=0.004, taker_fee=0.006):
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.ids = itertools.count(1)
+        self.reset()
+
+    def reset(self):
+        self.books = {}
+        self.orders = {}
+        # resting orders per symbol: (-price, seq, id) for bids, (price, seq, id) for asks
+        self.bids = {}
+        self.asks = {}
+        self.fills = []
+        self.open_count = 0
+
+    def top(self, symbol):
+        return self.books.get(symbol)
+
+    def on_quote(self, symbol, timestamp, best_bid, best_bid_size, best_offer, best_offer_size):
+        self.books[symbol] = {
+            "best_bid": best_bid,
+            "best_bid_size": best_bid_size,
+            "best_offer": best_offer,
+            "best_offer_size": best_offer_size,
+        }
+        if self.open_count:
+            self._match(symbol, timestamp, best_offer, best_bid)
+
+    def on_trade(self, symbol, timestamp, price, size):
+        if self.open_count:
+            self._match(symbol, timestamp, price, price)
+
+    def _match(self, symbol, timestamp, sell_price, buy_price):
+        """Fill resting bids at or above sell_price and asks at or below buy_price."""
+        bids = self.bids.get(symbol)
+        while bids and sell_price is not None and -bids[0][0] >= sell_price:
+            self._fill_resting(heapq.heappop(bids)[2], timestamp)
+        asks = self.asks.get(symbol)
+        while asks and buy_price is not None and asks[0][0] <= buy_price:
+            self._fill_resting(heapq.heappop(asks)[2], timestamp)
+
+    def _fill_resting(self, order_id, timestamp):
+        order = self.orders[order_id]
+        if order["status"] == "open":  # cancelled orders are left in the heap
+            self.open_count -= 1
+            self._fill(order, order["price"], timestamp, self.maker_fee, "maker")
+
+    def _fill(self, order, price, timestamp, fee_rate, liquidity):
+        order["status"] = "closed"
+        order["filled"] = order["amount"]
+        order["remaining"] = 0.0
+        order["average"] = price
+        order["cost"] = price * order["amount"]
+        order["fee"] = {"cost": order["cost"] * fee_rate, "rate": fee_rate}
+        order["lastTradeTimestamp"] = timestamp
+        order["liquidity"] = liquidity
+        self.fills.append(order)
+
+    def submit(self, timestamp, symbol, order_type, amount, side, price=None):
+        order = {
+            "id": str(next(self.ids)),
+            "symbol": symbol,
+            "type": order_type,
+            "side": side,
+            "amount": amount,
+            "price": price,
+            "status": "open",
+            "filled": 0.0,
+            "remaining": amount,
+            "average": None,
+            "cost": 0.0,
+            "fee": None,
+            "timestamp": timestamp,
+            "lastTradeTimestamp": None,
+        }
+        self.orders[order["id"]] = order
+
+        book = self.books.get(symbol)
+        touch = None
+        if book is not None:
+            touch = book["best_offer"] if side == "buy" else book["best_bid"]
+        if order_type == "market":
+            if touch is None:
+                order["status"] = "rejected"
+            else:
+                self._fill(order, touch, timestamp, self.taker_fee, "taker")
+        elif touch is not None and (price >= touch if side == "buy" else price <= touch):
+            # crosses the spread: takes liquidity at the touch
+            self._fill(order, touch, timestamp, self.taker_fee, "taker")
+        else:
+            resting = self.bids if side == "buy" else self.asks
+            key = -price if side == "buy" else price
+            heapq.heappush(resting.setdefault(symbol, []), (key, int(order["id"]), order["id"]))
+            self.open_count += 1
+        return order
+
+    def cancel(self, order_id):
+        order = self.orders[order_id]
+        if order["status"] == "open":
+            order["status"] = "canceled"
+            self.open_count -= 1
+        return order
+
+
+class SimulatedBroker(Broker):
+    """
+    Broker backed by a MatchingEngine and a simulated clock (anything with a
+    time() method, e.g. backtest.replay.SimulatedClock), so ExecutionAlgo can
+    be run against recorded market data.
+    """
+
+    def __init__(self, clock, engine=None):
+        super().__init__(None, None)
+        self.clock = clock
+        self.engine = engine or MatchingEngine()
+
+    def get_account_balance(self):
+        balance = {}
+        for order in self.engine.fills:
+            base, quote = order["symbol"].split("/")
+            sign = 1 if order["side"] == "buy" else -1
+            balance[base] = balance.get(base, 0.0) + sign * order["filled"]
+            balance[quote] = balance.get(quote, 0.0) - sign * order["cost"] - order["fee"]["cost"]
+        return balance
+
+    def get_orderbook_data(self, symbol):
+        return self.engine.top(symbol)
+
+    # copies: the engine keeps updating its own order dicts as the replay runs
+    def place_order(self, symbol, order_type, amount, side, price=None):
+        return dict(self.engine.submit(self.clock.time(), symbol, order_type, amount, side, price))
+
+    def cancel_order(self, order_id):
+        return dict(self.engine.cancel(order_id))
+
+    def get_order_status(self, order_id):
+        return dict(self.engine.orders[order_id])
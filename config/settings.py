@@ -3,4 +3,45 @@ import os
 
 API_KEY = 'YOUR_API_KEY'
 API_SECRET = 'YOUR_API_SECRET'
-DATA_DIR = os.getenv("DATA_DIR", "data")
\ No newline at end of file
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+# Bars kept per symbol in the in-memory candle store (2016 = 7 days of 5m bars)
+CANDLE_RETENTION_BARS = int(os.getenv("CANDLE_RETENTION_BARS", 2016))
+
+# On-disk market data format: "csv" (one file per day) or "npy" (columnar partitions)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "csv")
+
+# "rest" polls OHLCV every interval, "stream" uses the websocket feed (order book + trade candles)
+MARKET_DATA_MODE = os.getenv("MARKET_DATA_MODE", "rest")
+# Candles the signals run on; anything above the 5m feed is resampled from it in memory
+SIGNAL_TIMEFRAME = os.getenv("SIGNAL_TIMEFRAME", "5m")
+# Pre-trade risk limits as multiples of total capital (empty disables), and orders allowed per minute
+MAX_SYMBOL_EXPOSURE = float(os.getenv("MAX_SYMBOL_EXPOSURE", 1.0) or "inf")
+MAX_GROSS_EXPOSURE = float(os.getenv("MAX_GROSS_EXPOSURE", 3.0) or "inf")
+MAX_ORDERS_PER_MINUTE = int(os.getenv("MAX_ORDERS_PER_MINUTE", 60))
+
+# Seconds between polls of the account's open orders and fills (0 disables)
+RECONCILE_INTERVAL = float(os.getenv("RECONCILE_INTERVAL", 5))
+
+# Timers/counters snapshot written after every cycle (empty disables)
+METRICS_FILE = os.getenv("METRICS_FILE", "metrics.json")
+
+# Set to a path to run the sampling profiler and write collapsed stacks there on exit
+PROFILE_FILE = os.getenv("PROFILE_FILE", "")
+
+# Log file, rotated at LOG_MAX_BYTES; LOG_FORMAT "text" or "json" (one object per line)
+LOG_FILE = os.getenv("LOG_FILE", "trading_system.log")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 50 << 20))
+
+# Engine state snapshot, written after every cycle and loaded on start (empty disables)
+STATE_FILE = os.getenv("STATE_FILE", "trading_state.snapshot")
+
+# Sharded runtime (python -m runtime): symbols traded, strategies (name -> TradingSystem kwargs,
+# each runs over every shard) and worker processes per strategy, 0 spreads the cores over the strategies
+SYMBOLS = os.getenv("SYMBOLS", "BTC/USD,ETH/USD").split(",")
+STRATEGIES = {"default": {"risk_target": 0.25, "portfolio_size": 10}}
+SHARDS = int(os.getenv("SHARDS", 0))
+# Worker logs, metrics and snapshots; workers silent for HEARTBEAT_TIMEOUT seconds are restarted
+WORKER_DIR = os.getenv("WORKER_DIR", "workers")
+HEARTBEAT_TIMEOUT = float(os.getenv("HEARTBEAT_TIMEOUT", 30))
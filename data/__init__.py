@@ -1,3 +1,18 @@
 from .market_data_feed import MarketDataFeed
+from .candle_store import CandleStore
+from .storage import CsvStorage, NpyStorage, get_storage
+from .streaming import StreamingMarketData
+from .bar_events import BarQueue
+from .resample import TimeframeResampler, resample_ohlcv
 
-__all__ = ["MarketDataFeed"]
+__all__ = [
+    "MarketDataFeed",
+    "CandleStore",
+    "CsvStorage",
+    "NpyStorage",
+    "get_storage",
+    "StreamingMarketData",
+    "BarQueue",
+    "TimeframeResampler",
+    "resample_ohlcv",
+]
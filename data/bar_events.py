@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from utils.metrics import metrics
+
+from .ingestion import TIMEFRAME_MS
+
+
+class BarEvent:
+    """New closed bars are in the candle store for `symbols`."""
+
+    __slots__ = ("symbols", "close_time_ms", "published_at")
+
+    def __init__(self, symbols, close_time_ms, published_at):
+        self.symbols = symbols
+        self.close_time_ms = close_time_ms  # end of the newest bar, epoch ms
+        self.published_at = published_at  # time.monotonic() when it was queued
+
+    def latency(self, now_ms=None):
+        """Seconds since the newest bar closed."""
+        now_ms = now_ms if now_ms is not None else time.time() * 1000
+        return (now_ms - self.close_time_ms) / 1000
+
+
+class BarQueue:
+    """
+    Hands bar-close events from a market data feed to the trading cycle.
+
+    The bars themselves stay in the candle store and the consumer reads
+    everything it has not seen yet, so a pending event can absorb newer
+    ones: when the consumer is still busy the queue holds at most one event
+    (symbols merged, oldest publish time kept) instead of growing, and the
+    producer never waits. Merged events are counted as "bars.coalesced".
+
+    publish(data) has the on_candles signature of MarketDataFeed and
+    StreamingMarketData.
+    """
+
+    def __init__(self, timeframe="5m"):
+        self.timeframe_ms = TIMEFRAME_MS[timeframe]
+        self.pending = None
+        self.closed = False
+        self.ready = asyncio.Event()
+
+    def publish(self, data):
+        if self.closed or data.empty:
+            return
+        close_time_ms = data["timestamp"].max().value // 1_000_000 + self.timeframe_ms
+        self.notify(set(data["symbol"].unique()), close_time_ms)
+
+    def notify(self, symbols, close_time_ms, published_at=None):
+        """
+        Queue an event for bars described without their data, e.g. relayed
+        from the process that stored them.
+
+        :param published_at: time.monotonic() when the bars were stored, now by default
+        """
+        if self.closed:
+            return
+        if self.pending is None:
+            published_at = time.monotonic() if published_at is None else published_at
+            self.pending = BarEvent(set(symbols), close_time_ms, published_at)
+        else:
+            self.pending.symbols.update(symbols)
+            self.pending.close_time_ms = max(self.pending.close_time_ms, close_time_ms)
+            metrics.count("bars.coalesced")
+        self.ready.set()
+
+    async def get(self):
+        """Next event, or None once the queue is closed."""
+        while self.pending is None:
+            if self.closed:
+                return None
+            self.ready.clear()
+            await self.ready.wait()
+        event, self.pending = self.pending, None
+        return event
+
+    def close(self):
+        """Wake the consumer, get() returns None once the pending event is taken."""
+        self.closed = True
+        self.ready.set()
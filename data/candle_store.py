@@ -0,0 +1,186 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ("open", "high", "low", "close", "volume")
+COLUMNS = ["timestamp", *FIELDS, "symbol"]
+
+
+class SymbolCandles:
+    """Columnar candle arrays for one symbol, oldest first, at most `retention` bars."""
+
+    def __init__(self, symbol, retention):
+        self.symbol = symbol
+        self.retention = retention
+        self.capacity = 0
+        self.start = 0
+        self.end = 0
+        self.timestamps = np.empty(0, dtype="datetime64[ns]")
+        self.values = np.empty((0, len(FIELDS)), dtype=np.float64)
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def first_timestamp(self):
+        if self.end == self.start:
+            return None
+        return pd.Timestamp(self.timestamps[self.start])
+
+    @property
+    def last_timestamp(self):
+        if self.end == self.start:
+            return None
+        return pd.Timestamp(self.timestamps[self.end - 1])
+
+    def _reserve(self, n):
+        if self.end + n <= self.capacity:
+            return
+        keep = min(len(self), self.retention)
+        if keep + n <= self.capacity:
+            # enough room once evicted bars are dropped: compact in place
+            timestamps, values = self.timestamps, self.values
+        else:
+            capacity = max(2 * (keep + n), 64)
+            timestamps = np.empty(capacity, dtype="datetime64[ns]")
+            values = np.empty((capacity, len(FIELDS)), dtype=np.float64)
+            self.capacity = capacity
+        timestamps[:keep] = self.timestamps[self.end - keep:self.end].copy()
+        values[:keep] = self.values[self.end - keep:self.end].copy()
+        self.timestamps, self.values = timestamps, values
+        self.start, self.end = 0, keep
+
+    def append(self, timestamps, values):
+        """Append candles sorted by time; bars not newer than the last one are dropped."""
+        last = self.timestamps[self.end - 1] if self.end > self.start else None
+        if last is not None:
+            newer = timestamps > last
+            timestamps, values = timestamps[newer], values[newer]
+        n = len(timestamps)
+        if n == 0:
+            return 0
+
+        self._reserve(n)
+        self.timestamps[self.end:self.end + n] = timestamps
+        self.values[self.end:self.end + n] = values
+        self.end += n
+        # evict the oldest bars beyond the retention window
+        self.start = max(self.start, self.end - self.retention)
+        return n
+
+    def to_frame(self, since=None):
+        start = self.start
+        if since is not None:
+            start += np.searchsorted(
+                self.timestamps[self.start:self.end], np.datetime64(since, "ns"), side="right"
+            )
+        frame = pd.DataFrame(self.values[start:self.end], columns=list(FIELDS))
+        frame.insert(0, "timestamp", self.timestamps[start:self.end])
+        frame["symbol"] = self.symbol
+        return frame
+
+
+class CandleStore:
+    """
+    In-process OHLCV store shared by the MarketDataFeed (writer) and the
+    signal layer (reader), replacing the csv reread every cycle.
+
+    :param retention: number of bars kept per symbol, older bars are evicted
+    """
+
+    def __init__(self, retention=2016):
+        self.retention = retention
+        self.candles = {}
+        self.lock = threading.Lock()
+
+    def symbols(self):
+        return list(self.candles)
+
+    def first_timestamp(self, symbol):
+        candles = self.candles.get(symbol)
+        return None if candles is None else candles.first_timestamp
+
+    def last_timestamp(self, symbol):
+        candles = self.candles.get(symbol)
+        return None if candles is None else candles.last_timestamp
+
+    def append(self, data):
+        """
+        Append a DataFrame of candles (the load_data/fetch_ohlcv layout).
+
+        :return: number of new bars stored
+        """
+        if data.empty:
+            return 0
+        data = data.assign(timestamp=pd.to_datetime(data["timestamp"]))
+        stored = 0
+        with self.lock:
+            for symbol, frame in data.groupby("symbol", sort=False):
+                frame = frame.sort_values("timestamp", kind="stable")
+                frame = frame.drop_duplicates("timestamp", keep="last")
+                candles = self.candles.get(symbol)
+                if candles is None:
+                    candles = self.candles[symbol] = SymbolCandles(symbol, self.retention)
+                stored += candles.append(
+                    frame["timestamp"].to_numpy(dtype="datetime64[ns]"),
+                    frame[list(FIELDS)].to_numpy(dtype=np.float64),
+                )
+        return stored
+
+    def append_arrays(self, symbol, timestamps, values):
+        """
+        Append one symbol's candles already in array form, sorted by time.
+
+        :param timestamps: datetime64[ns] (or int64 ns) open times
+        :param values: (n, 5) float64 OHLCV
+        :return: number of new bars stored
+        """
+        with self.lock:
+            candles = self.candles.get(symbol)
+            if candles is None:
+                candles = self.candles[symbol] = SymbolCandles(symbol, self.retention)
+            return candles.append(np.asarray(timestamps).astype("datetime64[ns]"), values)
+
+    def get_state(self):
+        """Retained candles per symbol as (timestamps, values) arrays."""
+        with self.lock:
+            return {
+                symbol: (candles.timestamps[candles.start:candles.end], candles.values[candles.start:candles.end])
+                for symbol, candles in self.candles.items()
+            }
+
+    def set_state(self, state):
+        with self.lock:
+            self.candles = {}
+            for symbol, (timestamps, values) in state.items():
+                candles = self.candles[symbol] = SymbolCandles(symbol, self.retention)
+                # the arrays are used as they are until the next append outgrows them
+                candles.timestamps, candles.values = timestamps, values
+                candles.capacity = candles.end = len(timestamps)
+                candles.start = max(0, candles.end - self.retention)
+
+    def get(self, symbol, since=None):
+        """Candles of one symbol newer than `since` (all retained bars by default)."""
+        with self.lock:
+            candles = self.candles.get(symbol)
+            if candles is None:
+                return pd.DataFrame(columns=COLUMNS)
+            return candles.to_frame(since)
+
+    def to_frame(self, symbols=None, since=None):
+        """
+        Candles of several symbols in one frame, like load_data returns.
+
+        :param since: a timestamp, or a dict of symbol -> timestamp
+        """
+        symbols = self.symbols() if symbols is None else symbols
+        frames = []
+        for symbol in symbols:
+            symbol_since = since.get(symbol) if isinstance(since, dict) else since
+            frame = self.get(symbol, symbol_since)
+            if not frame.empty:
+                frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,104 @@
+import asyncio
+import random
+import time
+
+from utils.metrics import metrics
+
+
+class TokenBucket:
+    """Allows `rate` requests per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ExchangeSession:
+    """
+    Long-lived async exchange client shared by every poll: one ccxt client,
+    one connection pool and one load_markets for the life of the process.
+    Requests go through a token bucket and an in-flight cap, and are retried
+    with exponential backoff on rate-limit (429) and network/timeout errors.
+
+    Use as `async with session as exchange:`; leaving the block keeps the
+    client open, call close() on shutdown.
+    """
+
+    def __init__(self, api_key, api_secret, exchange_factory=None, max_in_flight=8,
+                 rate=10, burst=10, max_retries=4, backoff=0.5):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.exchange_factory = exchange_factory or self._coinbase
+        self.exchange = None
+        self.markets = None
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.open_lock = asyncio.Lock()
+
+    def _coinbase(self):
+        import ccxt.async_support as ccxt
+
+        return ccxt.coinbase(
+            {
+                "apiKey": self.api_key,
+                "secret": self.api_secret,
+                # pacing is done by the session, not by ccxt's per-call throttle
+                "enableRateLimit": False,
+            }
+        )
+
+    async def open(self):
+        async with self.open_lock:
+            if self.exchange is None:
+                self.exchange = self.exchange_factory()
+            if self.markets is None:
+                self.markets = await self.request("load_markets")
+        return self
+
+    async def request(self, method, *args, **kwargs):
+        # imported here so the module loads without ccxt, see _coinbase
+        import ccxt.async_support as ccxt
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            async with self.in_flight:
+                try:
+                    with metrics.timer(f"exchange.{method}"):
+                        return await getattr(self.exchange, method)(*args, **kwargs)
+                except (ccxt.RateLimitExceeded, ccxt.RequestTimeout, ccxt.NetworkError):
+                    if attempt == self.max_retries:
+                        raise
+            # jittered exponential backoff, outside the in-flight slot
+            await asyncio.sleep(self.backoff * 2 ** attempt * (0.5 + random.random() / 2))
+
+    async def fetch_ohlcv(self, symbol, timeframe="5m", since=None, limit=None):
+        return await self.request("fetch_ohlcv", symbol, timeframe, since=since, limit=limit)
+
+    async def close(self):
+        if self.exchange is not None:
+            await self.exchange.close()
+            self.exchange = None
+            self.markets = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
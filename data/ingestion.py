@@ -0,0 +1,95 @@
+import json
+import os
+import time
+
+import numpy as np
+
+TIMEFRAME_MS = {
+    "1m": 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "1h": 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+class HighWaterMarks:
+    """
+    Timestamp (ms) of the last stored candle per symbol, persisted as json
+    so a restart resumes where the previous run stopped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.marks = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.marks = {symbol: int(ts) for symbol, ts in json.load(f).items()}
+
+    def get(self, symbol):
+        return self.marks.get(symbol)
+
+    def update(self, symbol, timestamp):
+        if timestamp > self.marks.get(symbol, -1):
+            self.marks[symbol] = int(timestamp)
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.marks, f)
+        os.replace(tmp_path, self.path)
+
+
+def clean_bars(ohlcv, high_water_mark, timeframe_ms, now):
+    """
+    Sorted, unique, closed candles newer than the high-water mark.
+
+    :param ohlcv: list of [timestamp_ms, open, high, low, close, volume]
+    :param now: current time in ms, the still-forming candle is dropped
+    """
+    if not ohlcv:
+        return []
+    bars = {}
+    for bar in ohlcv:
+        timestamp = int(bar[0])
+        if high_water_mark is not None and timestamp <= high_water_mark:
+            continue
+        if timestamp + timeframe_ms > now:
+            continue
+        bars[timestamp] = bar  # last one wins on overlapping pages
+    return [bars[timestamp] for timestamp in sorted(bars)]
+
+
+def find_gaps(timestamps, timeframe_ms):
+    """(start, end) ms ranges of missing candles between consecutive timestamps."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) < 2:
+        return []
+    steps = np.diff(timestamps)
+    holes = np.nonzero(steps > timeframe_ms)[0]
+    return [(int(timestamps[i] + timeframe_ms), int(timestamps[i + 1] - timeframe_ms)) for i in holes]
+
+
+async def fetch_new_bars(exchange, symbol, timeframe, since, limit, now):
+    """
+    Page through fetch_ohlcv from `since` until the exchange has no more
+    closed candles, so a restart or a missed poll backfills the gap.
+    """
+    timeframe_ms = TIMEFRAME_MS[timeframe]
+    ohlcv = []
+    while since + timeframe_ms <= now:
+        page = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+        if not page:
+            break
+        ohlcv.extend(page)
+        last = int(page[-1][0])
+        if last < since:
+            break
+        # the exchange may cap pages below `limit`, so keep going until caught up
+        since = last + timeframe_ms
+    return ohlcv
@@ -1,65 +1,98 @@
-import ccxt.async_support as ccxt
 import pandas as pd
 import asyncio
+import logging
 from datetime import datetime, timezone
 import time
-from filelock import FileLock
 import os
+from .storage import CsvStorage, get_storage
+from .exchange_session import ExchangeSession
+from .ingestion import (
+    TIMEFRAME_MS,
+    HighWaterMarks,
+    clean_bars,
+    fetch_new_bars,
+    find_gaps,
+    now_ms,
+)
+from utils.metrics import metrics
 
-
-class AsyncExchangeManager:
-    def __init__(self, api_key, api_secret):
-        self.api_key = api_key
-        self.api_secret = api_secret
-
-    async def __aenter__(self):
-        self.exchange = ccxt.coinbase(
-            {
-                "apiKey": self.api_key,
-                "secret": self.api_secret,
-            }
-        )
-        return self.exchange
-
-    async def __aexit__(self, exc_type, exc, tb):
-        await self.exchange.close()
+logger = logging.getLogger(__name__)
 
 
 class MarketDataFeed:
-    def __init__(self, api_key, api_secret, data_dir):
+    def __init__(self, api_key, api_secret, data_dir, candle_store=None, persist=True, storage="csv",
+                 timeframe="5m", fetch_limit=300, exchange_factory=None, max_in_flight=8,
+                 rate_limit=10, on_candles=None, on_gap=None, poll_delay=2.0):
         self.api_key = api_key
         self.api_secret = api_secret
         self.symbols = []
         self.data_dir = data_dir
-        self.last_timestamps = {symbol: None for symbol in self.symbols}
+        # candles are published to the in-memory store, disk is only a sink
+        self.candle_store = candle_store
+        # called with each batch of new bars once stored, e.g. BarQueue.publish
+        self.on_candles = on_candles
+        # called with (symbol, first, last missing bar ms) for bars the exchange did not return
+        self.on_gap = on_gap
+        self.persist = persist
+        self.storage = get_storage(storage, data_dir)
+        self.timeframe = timeframe
+        self.fetch_limit = fetch_limit  # candles per request, coinbase caps at 300
+        self.poll_delay = poll_delay  # seconds after a bar closes before it is fetched
         self.running = True
-        self.exchange = AsyncExchangeManager(self.api_key, self.api_secret)
+        self.stopped = asyncio.Event()
+        # one client for the life of the feed, requests paced by the session
+        self.exchange = ExchangeSession(
+            self.api_key,
+            self.api_secret,
+            exchange_factory=exchange_factory,
+            max_in_flight=max_in_flight,
+            rate=rate_limit,
+            burst=rate_limit,
+        )
 
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
+        # last stored candle per symbol, survives restarts
+        self.high_water_marks = HighWaterMarks(os.path.join(data_dir, "high_water_marks.json"))
 
     def add_subscription(self, symbols):
-        self.symbols.extend(symbols)
-        temp = {symbol: None for symbol in symbols}
-        self.last_timestamps = self.last_timestamps | temp
+        self.symbols.extend(s for s in symbols if s not in self.symbols)
 
     def get_csv_path(self, table_name):
-        date_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        return f"{self.data_dir}/{table_name}_{date_str}.csv"
+        return CsvStorage(self.data_dir).get_path(table_name)
+
+    async def fetch_ohlcv(self, exchange, symbol, timeframe=None, since=None):
+        timeframe = timeframe or self.timeframe
+        timeframe_ms = TIMEFRAME_MS[timeframe]
+        high_water_mark = self.high_water_marks.get(symbol)
+        now = now_ms()
+
+        if since is None:
+            if high_water_mark is None:
+                # Fetch data from the beginning of today in UTC
+                since = datetime.now(timezone.utc).replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                )
+                since = int(since.timestamp() * 1000)  # Convert to milliseconds
+            else:
+                since = high_water_mark + timeframe_ms  # only bars not stored yet
 
-    async def fetch_ohlcv(self, exchange, symbol, timeframe="5m", since=None):
-        last_timestamp = self.last_timestamps.get(symbol)
+        ohlcv = await fetch_new_bars(exchange, symbol, timeframe, since, self.fetch_limit, now)
+        ohlcv = clean_bars(ohlcv, high_water_mark, timeframe_ms, now)
 
-        if last_timestamp is None:
-            # Fetch data from the beginning of today in UTC
-            since = datetime.now(timezone.utc).replace(
-                hour=0, minute=0, second=0, microsecond=0
+        # Retry holes inside the new bars once, a page may have come back short
+        for gap_start, gap_end in find_gaps([bar[0] for bar in ohlcv], timeframe_ms):
+            ohlcv += await fetch_new_bars(
+                exchange, symbol, timeframe, gap_start, self.fetch_limit, gap_end + timeframe_ms
             )
-            since = int(since.timestamp() * 1000)  # Convert to milliseconds
-        else:
-            since = int(last_timestamp.timestamp() * 1000)  # Convert to milliseconds
+            ohlcv = clean_bars(ohlcv, high_water_mark, timeframe_ms, now)
+
+        if self.on_gap is not None and ohlcv:
+            # holes left after the retry, and between the last stored bar and the new ones
+            stored = [] if high_water_mark is None else [high_water_mark]
+            for gap_start, gap_end in find_gaps(stored + [bar[0] for bar in ohlcv], timeframe_ms):
+                self.on_gap(symbol, gap_start, gap_end)
 
-        ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since=since)
         data = pd.DataFrame(
             ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"]
         )
@@ -69,28 +102,67 @@ class MarketDataFeed:
         return data
 
     def store_data(self, data, table_name):
-        file_path = self.get_csv_path(table_name)
-        lock = FileLock(file_path + ".lock")
-
-        with lock:
-            if os.path.exists(file_path):
-                data.to_csv(file_path, mode="a", header=False, index=False)
-            else:
-                data.to_csv(file_path, mode="w", header=True, index=False)
+        if self.candle_store is not None:
+            self.candle_store.append(data)
+        if self.persist:
+            self.storage.write(data, table_name)
 
     async def update_market_data(self):
         async with self.exchange as exchange:
             tasks = [self.fetch_ohlcv(exchange, symbol) for symbol in self.symbols]
             results = await asyncio.gather(*tasks)
-            all_data = pd.concat(results)
-            self.store_data(all_data, "ohlcv")
+        results = [data for data in results if not data.empty]
+        if not results:
+            return
+        all_data = pd.concat(results, ignore_index=True)
+        self.store_data(all_data, "ohlcv")
+
+        # Advance the marks only once the bars are stored
+        for data in results:
+            last = data["timestamp"].iloc[-1]
+            self.high_water_marks.update(data["symbol"].iloc[0], last.value // 1_000_000)
+        self.high_water_marks.save()
+        if self.on_candles is not None:
+            self.on_candles(all_data)
+
+    def seconds_to_next_poll(self):
+        # poll right after each bar closes instead of on a free-running timer
+        timeframe_ms = TIMEFRAME_MS[self.timeframe]
+        now = now_ms()
+        return ((now // timeframe_ms + 1) * timeframe_ms - now) / 1000 + self.poll_delay
+
+    async def poll(self):
+        """One update_market_data, a failure is logged and left for the next poll to catch up."""
+        try:
+            await self.update_market_data()
+            return True
+        except Exception:
+            metrics.count("feed.errors")
+            logger.exception("Market data poll failed, retrying on the next bar")
+            return False
+
+    async def backfill(self, symbols):
+        """Fetch everything missed since the high-water marks once, e.g. before a stream takes over."""
+        self.add_subscription(symbols)
+        try:
+            return await self.poll()
+        finally:
+            await self.exchange.close()
 
     async def start(self, symbols):
         self.add_subscription(symbols)
-        while self.running:
-            await self.update_market_data()
-            await asyncio.sleep(5 * 60)  # Wait for 5 minutes
-
-    def stop(self, signum, frame):
-        print(f"Received signal {signum}, stopping...")
+        try:
+            while self.running:
+                await self.poll()
+                try:
+                    await asyncio.wait_for(self.stopped.wait(), self.seconds_to_next_poll())
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.exchange.close()
+
+    def stop(self, signum=None, frame=None):
+        if signum is not None:
+            logger.info("Received signal %s, stopping...", signum)
         self.running = False
+        self.stopped.set()
@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+from .candle_store import COLUMNS, FIELDS, CandleStore
+from .ingestion import TIMEFRAME_MS
+
+# Higher timeframes are built from the base candles the feed already stores,
+# so a 1h or 1d signal costs no extra exchange calls or files. Buckets are
+# aligned to the epoch (UTC), like the exchange's own candles.
+
+
+def _aggregate(timestamps, values, timeframe_ns):
+    """
+    OHLCV of the buckets spanned by time-sorted base bars.
+
+    :param timestamps: int64 ns
+    :param values: (n, 5) open, high, low, close, volume
+    :return: bucket start times (int64 ns) and their (m, 5) OHLCV
+    """
+    buckets = timestamps - timestamps % timeframe_ns
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)]
+    bars = np.empty((len(starts), len(FIELDS)))
+    bars[:, 0] = values[starts, 0]
+    bars[:, 1] = np.maximum.reduceat(values[:, 1], starts)
+    bars[:, 2] = np.minimum.reduceat(values[:, 2], starts)
+    bars[:, 3] = values[ends - 1, 3]
+    bars[:, 4] = np.add.reduceat(values[:, 4], starts)
+    return buckets[starts], bars
+
+
+def _frame(symbol, timestamps, bars):
+    frame = pd.DataFrame(bars, columns=list(FIELDS))
+    frame.insert(0, "timestamp", pd.to_datetime(timestamps, unit="ns"))
+    frame["symbol"] = symbol
+    return frame
+
+
+def resample_ohlcv(data, timeframe, closed_only=False, base="5m"):
+    """
+    Aggregate candles to a higher timeframe in one pass, the last bucket of
+    each symbol may still be forming.
+
+    :param data: candles in the load_data layout, any order
+    :param timeframe: key of TIMEFRAME_MS, e.g. "1h"
+    :param closed_only: only the buckets whose last base bar, or a later
+        one, is in data, for consumers that keep every bar they see such as
+        IncrementalSignalEngine. Whether a bucket is complete is read from the
+        stored bars, not the clock: the feed stores a bar a little after it closes.
+    :param base: timeframe of the candles in data
+    """
+    if data.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    data = data.sort_values(["symbol", "timestamp"], kind="stable")
+    timeframe_ns = TIMEFRAME_MS[timeframe] * 1_000_000
+    base_ns = TIMEFRAME_MS[base] * 1_000_000
+    frames = []
+    for symbol, frame in data.groupby("symbol", sort=True):
+        base_timestamps = frame["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        timestamps, bars = _aggregate(
+            base_timestamps, frame[list(FIELDS)].to_numpy(dtype=np.float64), timeframe_ns
+        )
+        if closed_only:
+            # a bucket is complete once a base bar closing at or after its end is stored
+            closed = timestamps + timeframe_ns <= base_timestamps[-1] + base_ns
+            timestamps, bars = timestamps[closed], bars[closed]
+        frames.append(_frame(symbol, timestamps, bars))
+    return pd.concat(frames, ignore_index=True)
+
+
+class BarAggregator:
+    """
+    Folds one symbol's base bars into bars of a higher timeframe. A bar is
+    emitted as soon as its last base bar arrives (or a later one does, when
+    there is a gap); the partial bar is kept in `forming`.
+    """
+
+    def __init__(self, timeframe, base="5m"):
+        self.timeframe_ns = TIMEFRAME_MS[timeframe] * 1_000_000
+        self.base_ns = TIMEFRAME_MS[base] * 1_000_000
+        self.forming = None  # (bucket start ns, OHLCV array)
+        self.last_timestamp = None
+
+    def append(self, timestamps, values):
+        """
+        :param timestamps: int64 ns base bar open times, sorted
+        :param values: (n, 5) OHLCV of the base bars
+        :return: start times and OHLCV of the bars closed by these base bars
+        """
+        if self.last_timestamp is not None:
+            newer = timestamps > self.last_timestamp
+            timestamps, values = timestamps[newer], values[newer]
+        if len(timestamps) == 0:
+            return timestamps, np.empty((0, len(FIELDS)))
+        self.last_timestamp = timestamps[-1]
+
+        starts, bars = _aggregate(timestamps, values, self.timeframe_ns)
+        if self.forming is not None:
+            forming_start, forming = self.forming
+            if forming_start == starts[0]:
+                bars[0, 0] = forming[0]
+                bars[0, 1] = max(bars[0, 1], forming[1])
+                bars[0, 2] = min(bars[0, 2], forming[2])
+                bars[0, 4] += forming[4]
+            else:
+                starts = np.r_[forming_start, starts]
+                bars = np.vstack([forming, bars])
+
+        if timestamps[-1] + self.base_ns >= starts[-1] + self.timeframe_ns:
+            self.forming = None
+            return starts, bars
+        self.forming = (starts[-1], bars[-1].copy())
+        return starts[:-1], bars[:-1]
+
+    def get_state(self):
+        return self.forming, self.last_timestamp
+
+    def set_state(self, state):
+        self.forming, self.last_timestamp = state
+
+
+class TimeframeResampler:
+    """
+    Keeps a CandleStore of closed bars per higher timeframe, fed with the
+    base candles as the feed publishes them (its on_candles hook), so each
+    new base bar is an O(1) update and no cycle resamples the history.
+
+    store(timeframe) can be passed anywhere a CandleStore of base candles
+    is used, e.g. as the TradingSystem's candle_store.
+
+    :param base: timeframe of the candles passed to append
+    :param timeframes: timeframes to build, each a multiple of base
+    :param retention: bars kept per symbol and timeframe
+    """
+
+    def __init__(self, base="5m", timeframes=("15m", "1h", "4h", "1d"), retention=2016):
+        for timeframe in timeframes:
+            if TIMEFRAME_MS[timeframe] % TIMEFRAME_MS[base]:
+                raise ValueError(f"{timeframe} is not a multiple of {base}")
+        self.base = base
+        self.timeframes = tuple(timeframes)
+        self.stores = {timeframe: CandleStore(retention) for timeframe in self.timeframes}
+        self.aggregators = {}
+
+    def _aggregator(self, symbol, timeframe):
+        aggregator = self.aggregators.get((symbol, timeframe))
+        if aggregator is None:
+            aggregator = self.aggregators[symbol, timeframe] = BarAggregator(timeframe, self.base)
+        return aggregator
+
+    def append(self, data):
+        """
+        Fold new base candles (load_data layout) into every timeframe.
+
+        :return: dict of timeframe -> frame of the bars closed by this data
+        """
+        closed = {timeframe: [] for timeframe in self.timeframes}
+        if not data.empty:
+            codes, symbols = pd.factorize(data["symbol"])
+            timestamps = pd.to_datetime(data["timestamp"]).to_numpy(dtype="datetime64[ns]").view(np.int64)
+            order = np.lexsort((timestamps, codes))
+            codes, timestamps = codes[order], timestamps[order]
+            values = data[list(FIELDS)].to_numpy(dtype=np.float64)[order]
+            bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True])
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                symbol = symbols[codes[start]]
+                for timeframe in self.timeframes:
+                    starts, bars = self._aggregator(symbol, timeframe).append(
+                        timestamps[start:end], values[start:end]
+                    )
+                    if len(starts):
+                        self.stores[timeframe].append_arrays(symbol, starts, bars)
+                        closed[timeframe].append((symbol, starts, bars))
+
+        result = {}
+        for timeframe, parts in closed.items():
+            if parts:
+                result[timeframe] = pd.concat(
+                    [_frame(symbol, starts, bars) for symbol, starts, bars in parts], ignore_index=True
+                )
+            else:
+                result[timeframe] = pd.DataFrame(columns=COLUMNS)
+        return result
+
+    def get_state(self):
+        """
+        Partial bars and the last base bar seen per symbol and timeframe, for a
+        warm restart. The closed bars are in the stores, saved with
+        CandleStore.get_state by whoever reads them.
+        """
+        return {key: aggregator.get_state() for key, aggregator in self.aggregators.items()}
+
+    def set_state(self, state):
+        for (symbol, timeframe), aggregator_state in state.items():
+            if timeframe in self.stores:
+                self._aggregator(symbol, timeframe).set_state(aggregator_state)
+
+    def store(self, timeframe):
+        return self.stores[timeframe]
+
+    def to_frame(self, timeframe, symbols=None, since=None):
+        """Closed bars of one timeframe, like CandleStore.to_frame."""
+        return self.stores[timeframe].to_frame(symbols, since)
@@ -0,0 +1,187 @@
+import os
+from datetime import datetime, timezone
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+from filelock import FileLock
+
+FIELDS = ("open", "high", "low", "close", "volume")
+COLUMNS = ["timestamp", *FIELDS, "symbol"]
+
+
+def _day_range(start, end):
+    return pd.date_range(start.normalize(), end.normalize(), freq="D")
+
+
+def _naive_utc(timestamp):
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp
+
+
+def encode_symbol(symbol):
+    """Directory name of a symbol: "/" becomes "-", a "-" or "%" in the symbol is %-escaped."""
+    return symbol.replace("%", "%25").replace("-", "%2D").replace("/", "-")
+
+
+def decode_symbol(name):
+    return unquote(name.replace("-", "/"))
+
+
+def _time_range(start, end):
+    # default query is today (UTC), like the daily csv load
+    if start is None:
+        start = pd.Timestamp.now(tz="UTC").normalize()
+    if end is None:
+        end = pd.Timestamp.now(tz="UTC")
+    return _naive_utc(start), _naive_utc(end)
+
+
+class CsvStorage:
+    """One csv per UTC day of the bars, holding every symbol: <data_dir>/<table>_<YYYY-MM-DD>.csv"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def get_path(self, table_name, date=None):
+        date = date or datetime.now(timezone.utc)
+        return f"{self.data_dir}/{table_name}_{date.strftime('%Y-%m-%d')}.csv"
+
+    def write(self, data, table_name="ohlcv"):
+        if data.empty:
+            return
+        days = pd.to_datetime(data["timestamp"]).dt.normalize()
+        for day, frame in data.groupby(days, sort=True):
+            file_path = self.get_path(table_name, day)
+            with FileLock(file_path + ".lock"):
+                if os.path.exists(file_path):
+                    frame.to_csv(file_path, mode="a", header=False, index=False)
+                else:
+                    frame.to_csv(file_path, mode="w", header=True, index=False)
+
+    def load(self, symbols=None, start=None, end=None, table_name="ohlcv"):
+        start, end = _time_range(start, end)
+        frames = []
+        for day in _day_range(start, end):
+            file_path = self.get_path(table_name, day)
+            if not os.path.exists(file_path):
+                continue
+            with FileLock(file_path + ".lock"):
+                frames.append(pd.read_csv(file_path, parse_dates=["timestamp"]))
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+
+        data = pd.concat(frames, ignore_index=True)
+        mask = (data["timestamp"] >= start) & (data["timestamp"] <= end)
+        if symbols is not None:
+            mask &= data["symbol"].isin(symbols)
+        return data[mask].reset_index(drop=True)
+
+
+class NpyStorage:
+    """
+    Columnar partitions, one directory per symbol and UTC day, one .npy per
+    column: <data_dir>/<table>/<BTC-USD>/<YYYY-MM-DD>/<column>.npy (see
+    encode_symbol)
+
+    Partitions are memory-mapped on load, and a range query only opens the
+    day directories of the requested symbols that overlap [start, end].
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def symbol_dir(self, table_name, symbol):
+        return os.path.join(self.data_dir, table_name, encode_symbol(symbol))
+
+    def partition_dir(self, table_name, symbol, day):
+        return os.path.join(self.symbol_dir(table_name, symbol), day.strftime("%Y-%m-%d"))
+
+    def _read_partition(self, path, mmap_mode="r"):
+        if not os.path.exists(os.path.join(path, "timestamp.npy")):
+            return None
+        return {
+            column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode=mmap_mode)
+            for column in ("timestamp", *FIELDS)
+        }
+
+    def _write_partition(self, path, columns):
+        os.makedirs(path, exist_ok=True)
+        for column, values in columns.items():
+            tmp_path = os.path.join(path, f"{column}.tmp.npy")
+            np.save(tmp_path, values)
+            os.replace(tmp_path, os.path.join(path, f"{column}.npy"))
+
+    def write(self, data, table_name="ohlcv"):
+        if data.empty:
+            return
+        data = data.assign(timestamp=pd.to_datetime(data["timestamp"]))
+        days = data["timestamp"].dt.normalize()
+        for (symbol, day), frame in data.groupby(["symbol", days], sort=False):
+            path = self.partition_dir(table_name, symbol, day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with FileLock(path + ".lock"):
+                timestamps = frame["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+                columns = {"timestamp": timestamps}
+                columns.update({field: frame[field].to_numpy(dtype=np.float64) for field in FIELDS})
+
+                existing = self._read_partition(path, mmap_mode=None)
+                if existing is not None:
+                    columns = {
+                        column: np.concatenate([existing[column], values])
+                        for column, values in columns.items()
+                    }
+                # sorted by time, last write wins on duplicate timestamps
+                order = np.argsort(columns["timestamp"], kind="stable")
+                timestamps = columns["timestamp"][order]
+                keep = np.append(timestamps[1:] != timestamps[:-1], True)
+                self._write_partition(
+                    path, {column: values[order][keep] for column, values in columns.items()}
+                )
+
+    def list_symbols(self, table_name="ohlcv"):
+        root = os.path.join(self.data_dir, table_name)
+        if not os.path.isdir(root):
+            return []
+        return sorted(decode_symbol(name) for name in os.listdir(root))
+
+    def load(self, symbols=None, start=None, end=None, table_name="ohlcv"):
+        start, end = _time_range(start, end)
+        lo, hi = start.value, end.value
+        symbols = self.list_symbols(table_name) if symbols is None else symbols
+
+        chunks, chunk_symbols = [], []
+        for symbol in symbols:
+            for day in _day_range(start, end):
+                path = self.partition_dir(table_name, symbol, day)
+                if not os.path.isdir(path):
+                    continue
+                with FileLock(path + ".lock"):
+                    partition = self._read_partition(path)
+                if partition is None:
+                    continue
+                i = np.searchsorted(partition["timestamp"], lo, side="left")
+                j = np.searchsorted(partition["timestamp"], hi, side="right")
+                if i < j:
+                    chunks.append({column: values[i:j] for column, values in partition.items()})
+                    chunk_symbols.append((symbol, j - i))
+        if not chunks:
+            return pd.DataFrame(columns=COLUMNS)
+
+        # one concatenate per column, then a single DataFrame
+        data = {"timestamp": np.concatenate([c["timestamp"] for c in chunks]).view("datetime64[ns]")}
+        data.update({field: np.concatenate([c[field] for c in chunks]) for field in FIELDS})
+        names, counts = zip(*chunk_symbols)
+        data["symbol"] = np.repeat(np.array(names, dtype=object), counts)
+        return pd.DataFrame(data, columns=COLUMNS)
+
+
+STORAGE_BACKENDS = {"csv": CsvStorage, "npy": NpyStorage}
+
+
+def get_storage(backend, data_dir):
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return STORAGE_BACKENDS[backend](data_dir)
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+
+import pandas as pd
+
+from utils.metrics import metrics
+
+from .ingestion import TIMEFRAME_MS
+
+# Streaming market data over the Coinbase Advanced Trade websocket: a local
+# level-2 book per product (top of book is an O(1) read) and candles built
+# from the trade ticks. aiohttp already comes with ccxt, so no new dependency;
+# it is imported when a stream starts, the REST mode never pays for it.
+
+COINBASE_WS_URL = "wss://advanced-trade-ws.coinbase.com"
+
+logger = logging.getLogger(__name__)
+
+
+def to_product_id(symbol):
+    return symbol.replace("/", "-")
+
+
+def to_symbol(product_id):
+    return product_id.replace("-", "/")
+
+
+def parse_time_ms(text):
+    return pd.Timestamp(text).value // 1_000_000
+
+
+class LocalOrderBook:
+    """Price -> size per side, with the top of book kept up to date on every change."""
+
+    def __init__(self):
+        self.bids = {}
+        self.asks = {}
+        self.top = {
+            "best_bid": None,
+            "best_bid_size": None,
+            "best_offer": None,
+            "best_offer_size": None,
+        }
+
+    def clear(self):
+        self.bids.clear()
+        self.asks.clear()
+        self._refresh_bid()
+        self._refresh_offer()
+
+    def _refresh_bid(self):
+        price = max(self.bids) if self.bids else None
+        self.top["best_bid"] = price
+        self.top["best_bid_size"] = self.bids.get(price)
+
+    def _refresh_offer(self):
+        price = min(self.asks) if self.asks else None
+        self.top["best_offer"] = price
+        self.top["best_offer_size"] = self.asks.get(price)
+
+    def update(self, side, price, size):
+        is_bid = side in ("bid", "buy")
+        levels = self.bids if is_bid else self.asks
+        best = self.top["best_bid"] if is_bid else self.top["best_offer"]
+        if size == 0:
+            levels.pop(price, None)
+            # only removing the best level needs a scan for the next one
+            if price != best:
+                return
+        else:
+            levels[price] = size
+            if best is not None and (price < best if is_bid else price > best):
+                return
+        if is_bid:
+            self._refresh_bid()
+        else:
+            self._refresh_offer()
+
+    def get_top(self):
+        return dict(self.top)
+
+
+class CandleBuilder:
+    """Aggregates trade ticks into OHLCV candles of one timeframe."""
+
+    def __init__(self, symbol, timeframe_ms):
+        self.symbol = symbol
+        self.timeframe_ms = timeframe_ms
+        self.current = None  # [timestamp, open, high, low, close, volume]
+        self.last_closed = None  # bucket of the last candle returned
+
+    def _close(self):
+        closed, self.current = self.current, None
+        self.last_closed = closed[0]
+        return closed
+
+    def add_trade(self, timestamp_ms, price, size):
+        """Add a trade, return the candle it closed (or None)."""
+        bucket = timestamp_ms - timestamp_ms % self.timeframe_ms
+        # trades for an already closed bucket arrive late and are dropped
+        if self.last_closed is not None and bucket <= self.last_closed:
+            return None
+        closed = None
+        if self.current is not None and bucket > self.current[0]:
+            closed = self._close()
+        if self.current is None:
+            self.current = [bucket, price, price, price, price, size]
+        elif bucket == self.current[0]:
+            self.current[2] = max(self.current[2], price)
+            self.current[3] = min(self.current[3], price)
+            self.current[4] = price
+            self.current[5] += size
+        return closed
+
+    def flush(self, now_ms):
+        """Close the current candle once its period is over, even without a new trade."""
+        if self.current is not None and self.current[0] + self.timeframe_ms <= now_ms:
+            return self._close()
+        return None
+
+
+class StreamingMarketData:
+    """
+    Websocket market data mode. Keeps a LocalOrderBook per symbol and turns
+    market trades into candles that are appended to the candle store (and
+    passed to `on_candles`), so callers see the same data as from
+    MarketDataFeed without REST polling.
+
+    get_orderbook_data has the same return shape as the broker's, so a broker
+    can serve it from memory.
+    """
+
+    def __init__(self, symbols=(), url=COINBASE_WS_URL, timeframe="1m", candle_store=None,
+                 on_candles=None, reconnect_delay=1.0, clock=None):
+        self.symbols = []
+        self.url = url
+        self.timeframe_ms = TIMEFRAME_MS[timeframe]
+        self.candle_store = candle_store
+        self.on_candles = on_candles
+        self.reconnect_delay = reconnect_delay
+        self.clock = clock or (lambda: pd.Timestamp.now(tz="UTC").value // 1_000_000)
+        self.books = {}
+        self.builders = {}
+        self.ready = set()  # symbols whose book snapshot has arrived
+        self.sequence = None
+        self.running = True
+        self.connected = asyncio.Event()
+        self.add_subscription(symbols)
+
+    def add_subscription(self, symbols):
+        for symbol in symbols:
+            if symbol not in self.books:
+                self.symbols.append(symbol)
+                self.books[symbol] = LocalOrderBook()
+                self.builders[symbol] = CandleBuilder(symbol, self.timeframe_ms)
+
+    def get_orderbook_data(self, symbol):
+        if symbol not in self.ready:
+            return None
+        return self.books[symbol].get_top()
+
+    def publish(self, candles):
+        if not candles:
+            return
+        data = pd.DataFrame(candles, columns=["timestamp", "open", "high", "low", "close", "volume", "symbol"])
+        data["timestamp"] = pd.to_datetime(data["timestamp"], unit="ms")
+        if self.candle_store is not None:
+            self.candle_store.append(data)
+        if self.on_candles is not None:
+            self.on_candles(data)
+
+    def handle_message(self, message):
+        sequence = message.get("sequence_num")
+        if sequence is not None:
+            if self.sequence is not None and sequence != self.sequence + 1:
+                raise ConnectionError(f"Missed messages: sequence {self.sequence} -> {sequence}")
+            self.sequence = sequence
+
+        channel = message.get("channel")
+        if channel == "l2_data":
+            for event in message["events"]:
+                symbol = to_symbol(event["product_id"])
+                book = self.books.get(symbol)
+                if book is None:
+                    continue
+                if event["type"] == "snapshot":
+                    book.clear()
+                    self.ready.add(symbol)
+                for update in event["updates"]:
+                    book.update(update["side"], float(update["price_level"]), float(update["new_quantity"]))
+        elif channel == "market_trades":
+            closed = []
+            for event in message["events"]:
+                # the snapshot replays recent history we may already have stored
+                if event["type"] == "snapshot":
+                    continue
+                for trade in event["trades"]:
+                    symbol = to_symbol(trade["product_id"])
+                    builder = self.builders.get(symbol)
+                    if builder is None:
+                        continue
+                    candle = builder.add_trade(
+                        parse_time_ms(trade["time"]), float(trade["price"]), float(trade["size"])
+                    )
+                    if candle is not None:
+                        closed.append(candle + [symbol])
+            self.publish(closed)
+
+    def flush(self):
+        now = self.clock()
+        closed = []
+        for symbol, builder in self.builders.items():
+            candle = builder.flush(now)
+            if candle is not None:
+                closed.append(candle + [symbol])
+        self.publish(closed)
+
+    async def _flush_loop(self):
+        while self.running:
+            await asyncio.sleep(1)
+            self.flush()
+
+    async def _listen(self, session):
+        import aiohttp
+
+        async with session.ws_connect(self.url, heartbeat=30) as ws:
+            product_ids = [to_product_id(symbol) for symbol in self.symbols]
+            for channel in ("heartbeats", "level2", "market_trades"):
+                await ws.send_json({"type": "subscribe", "product_ids": product_ids, "channel": channel})
+            self.connected.set()
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    try:
+                        self.handle_message(json.loads(msg.data))
+                    except (ValueError, KeyError, TypeError):
+                        # a malformed message is skipped, a sequence gap (ConnectionError) reconnects
+                        metrics.count("stream.bad_messages")
+                        logger.warning("Skipping malformed market data message: %.200s", msg.data, exc_info=True)
+                elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    break
+                if not self.running:
+                    break
+
+    async def start(self, symbols=()):
+        self.add_subscription(symbols)
+        import aiohttp
+
+        flusher = asyncio.create_task(self._flush_loop())
+        try:
+            async with aiohttp.ClientSession() as session:
+                while self.running:
+                    try:
+                        await self._listen(session)
+                    except (aiohttp.ClientError, ConnectionError) as e:
+                        logger.warning("Market data stream error: %s, reconnecting...", e)
+                    # a new connection starts with fresh snapshots
+                    self.connected.clear()
+                    self.ready.clear()
+                    self.sequence = None
+                    if self.running:
+                        await asyncio.sleep(self.reconnect_delay)
+        finally:
+            flusher.cancel()
+
+    def stop(self, signum=None, frame=None):
+        self.running = False
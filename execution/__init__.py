@@ -1,3 +1,6 @@
 from .execution import ExecutionAlgo
+from .scheduler import ExecutionScheduler
+from .risk import RiskEngine
+from .reconcile import OrderReconciler
 
-__all__ = ["ExecutionAlgo"]
+__all__ = ["ExecutionAlgo", "ExecutionScheduler", "RiskEngine", "OrderReconciler"]
@@ -1,73 +1,188 @@
+import asyncio
+import logging
+import math
 import time
 from broker import Broker
 
 ## inspired by https://qoppac.blogspot.com/2014/10/the-worlds-simplest-execution-algorithim.html
 
-## TO-DO: 1. might change to async when placing orders; 2. curreney limit
+## TO-DO: curreney limit
+
+logger = logging.getLogger(__name__)
 
 
 class ExecutionAlgo:
-    def __init__(self, broker: Broker, symbol):
+    def __init__(self, broker: Broker, symbol, clock=time):
         self.broker = broker
         self.symbol = symbol
+        # time() and sleep() of the sync loop, a simulated clock in replays
+        self.clock = clock
         self.passive_time_limit = 5 * 60  # 5 minutes
         self.total_time_limit = 10 * 60  # 10 minutes
         self.max_imbalance = 5.0
+        self.tick = 1  # seconds between book checks
+
+    @staticmethod
+    def has_book(bookdata):
+        """Both sides of the top of book are known (no quote yet, or a stream still waiting for its snapshot)."""
+        return bookdata is not None and all(
+            bookdata.get(key) is not None for key in ("best_bid", "best_bid_size", "best_offer", "best_offer_size")
+        )
+
+    @staticmethod
+    def filled_quantity(order):
+        """Filled quantity of a broker order dict, all of it for a closed order that does not say."""
+        filled = order.get("filled")
+        if filled is None:
+            filled = order.get("amount", 0.0) if order.get("status") == "closed" else 0.0
+        return filled
+
+    @staticmethod
+    def remaining(trade, filled):
+        """Signed part of `trade` still to place once `filled` of it has traded, 0.0 when done."""
+        left = abs(trade) - filled
+        return 0.0 if left <= abs(trade) * 1e-9 else math.copysign(left, trade)
+
+    def next_action(self, mode, elapsed_time, trade, bookdata, order_id):
+        """
+        Decide what to do on this tick. Without a book only the time limits
+        apply: nothing is placed or repriced until a quote arrives.
+
+        :return: (mode, action), action is one of None, "place", "switch",
+            "update" or "cancel"
+        """
+        has_book = self.has_book(bookdata)
+        if mode == "Passive":
+            if (elapsed_time > self.passive_time_limit) or (
+                has_book
+                and (self.is_adverse_price_move(trade, bookdata) or self.is_order_imbalance(trade, bookdata))
+            ):
+                return "Aggressive", "switch"
+            if order_id is None and has_book:
+                return mode, "place"
+        elif mode == "Aggressive":
+            if elapsed_time > self.total_time_limit:
+                return mode, "cancel"
+            elif has_book and self.is_further_adverse_price_move(trade, bookdata):
+                return mode, "update"
+        return mode, None
 
     def execute_trade(self, trade):
-        start_time = time.time()
+        """Work the trade until it fills or times out, returns the last order id."""
+        start_time = self.clock.time()
         mode = "Passive"
         order_id = None
+        filled = 0.0  # by the orders canceled so far
 
         while True:
-            current_time = time.time()
+            current_time = self.clock.time()
             elapsed_time = current_time - start_time
+            if order_id is not None and self.broker.get_order_status(order_id)["status"] == "closed":
+                break
             bookdata = self.broker.get_orderbook_data(self.symbol)
 
-            if mode == "Passive":
-                if (
-                    (elapsed_time > self.passive_time_limit)
-                    or self.is_adverse_price_move(trade, bookdata)
-                    or self.is_order_imbalance(trade, bookdata)
-                ):
-                    mode = self.switch_to_aggressive(order_id)
-                else:
-                    order_id = self.place_limit_order(trade, bookdata)
-
-            elif mode == "Aggressive":
-                if elapsed_time > self.total_time_limit:
+            mode, action = self.next_action(mode, elapsed_time, trade, bookdata, order_id)
+            if action == "switch":
+                self.switch_to_aggressive(order_id)
+            elif action == "place":
+                order_id = self.place_limit_order(trade, bookdata)
+            elif action == "update":
+                new_id, filled = self.update_limit_order(trade, order_id, bookdata, filled)
+                if new_id is None:  # the canceled order filled the rest
+                    break
+                order_id = new_id
+            elif action == "cancel":
+                if order_id is not None:
                     self.broker.cancel_order(order_id)
+                break
+
+            self.clock.sleep(self.tick)  # Sleep for a while before the next tick
+        return order_id
+
+    async def execute_trade_async(self, trade):
+        """
+        execute_trade for an AsyncBroker. Waiting yields to the event loop,
+        so many symbols' executions progress side by side.
+        """
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        mode = "Passive"
+        order_id = None
+        filled = 0.0  # by the orders canceled so far
+
+        while True:
+            elapsed_time = loop.time() - start_time
+            if order_id is not None:
+                order = await self.broker.get_order_status(order_id)
+                if order["status"] == "closed":
+                    break
+            bookdata = await self.broker.get_orderbook_data(self.symbol)
+
+            mode, action = self.next_action(mode, elapsed_time, trade, bookdata, order_id)
+            if action == "switch":
+                self.switch_to_aggressive(order_id)
+            elif action == "place":
+                order = await self.broker.place_order(*self.limit_order_args(trade, bookdata))
+                order_id = order["id"]
+            elif action == "update":
+                if order_id is not None:
+                    order = await self.broker.cancel_order(order_id)
+                    if not isinstance(order, dict) or order.get("filled") is None:
+                        order = await self.broker.get_order_status(order_id)
+                    filled += self.filled_quantity(order)
+                remaining = self.remaining(trade, filled)
+                if not remaining:  # the canceled order filled the rest
                     break
-                elif self.is_further_adverse_price_move(trade, bookdata):
-                    order_id = self.update_limit_order(trade, order_id, bookdata)
+                order = await self.broker.place_order(
+                    *self.limit_order_args(remaining, bookdata, aggressive=True)
+                )
+                order_id = order["id"]
+            elif action == "cancel":
+                if order_id is not None:
+                    await self.broker.cancel_order(order_id)
+                break
 
-            time.sleep(1)  # Sleep for a while before the next tick
+            await asyncio.sleep(self.tick)
+        return order_id
 
-    def place_limit_order(self, trade, bookdata):
+    def limit_order_args(self, trade, bookdata, aggressive=False):
         # TO-DO: handle missing data
-        limit_price = (
-            bookdata["best_bid"] if trade > 0 else bookdata["best_offer"]
-        )
+        if aggressive:
+            limit_price = bookdata["best_offer"] if trade > 0 else bookdata["best_bid"]
+        else:
+            limit_price = bookdata["best_bid"] if trade > 0 else bookdata["best_offer"]
         side = "buy" if trade > 0 else "sell"
         amount = abs(trade)
-        order = self.broker.place_order(self.symbol, "limit", side, amount, limit_price)
+        return self.symbol, "limit", amount, side, limit_price
+
+    def place_limit_order(self, trade, bookdata):
+        order = self.broker.place_order(*self.limit_order_args(trade, bookdata))
         return order["id"]
 
     def switch_to_aggressive(self, order_id):
-        print(f"Switching to aggressive mode for order {order_id}")
+        logger.debug("Switching to aggressive mode for order %s", order_id)
         return "Aggressive"
 
-    def update_limit_order(self, trade, order_id, bookdata):
-        new_limit_price = (
-            bookdata["best_offer"] if trade > 0 else bookdata["best_bid"]
-        )
-        side = "buy" if trade > 0 else "sell"
-        amount = abs(trade)
-        self.broker.cancel_order(order_id)
+    def update_limit_order(self, trade, order_id, bookdata, filled=0.0):
+        """
+        Replace the order with an aggressive one for what is still unfilled.
+
+        :param filled: quantity of the trade filled by orders canceled before
+        :return: the new order id, None when the canceled order filled the
+            rest, and the quantity filled by canceled orders
+        """
+        if order_id is not None:
+            order = self.broker.cancel_order(order_id)
+            if not isinstance(order, dict) or order.get("filled") is None:
+                order = self.broker.get_order_status(order_id)
+            filled += self.filled_quantity(order)
+        remaining = self.remaining(trade, filled)
+        if not remaining:
+            return None, filled
         order = self.broker.place_order(
-            self.symbol, "limit", side, amount, new_limit_price
+            *self.limit_order_args(remaining, bookdata, aggressive=True)
         )
-        return order["id"]
+        return order["id"], filled
 
     def is_adverse_price_move(self, trade, bookdata):
         if trade > 0:
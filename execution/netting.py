@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# One order per symbol per cycle: the cycle's signals are applied in order to
+# the current position (buys add, sells reduce, long only by default) and
+# only the difference between that target and the position is sent.
+
+NET_COLUMNS = ["symbol", "quantity", "target", "price", "signals"]
+
+
+def net_signals(signals, quantities, positions, long_only=True, min_notional=0.0):
+    """
+    :param signals: one cycle's signals (SIGNAL_COLUMNS), oldest first per symbol
+    :param quantities: unsigned quantity of each signal row, 0 where it is not traded
+    :param positions: symbol -> current position, including orders still working
+    :param long_only: sells never take a position below zero
+    :param min_notional: drop deltas worth less than this at the signal price
+    :return: DataFrame of NET_COLUMNS, one row per symbol to trade, where
+        quantity is the signed delta to the target position
+    """
+    if signals.empty:
+        return pd.DataFrame([], columns=NET_COLUMNS)
+
+    frame = pd.DataFrame(
+        {
+            "symbol": signals["symbol"].to_numpy(),
+            "change": np.where(signals["signal"].to_numpy() == "buy", 1.0, -1.0)
+            * np.asarray(quantities, dtype=float),
+            "price": signals["price"].to_numpy(dtype=float),
+        }
+    )
+    start = frame["symbol"].map(lambda symbol: positions.get(symbol, 0.0)).to_numpy(dtype=float)
+    groups = frame.groupby("symbol", sort=False)
+    running = start + groups["change"].cumsum().to_numpy()
+    if long_only:
+        # as if each signal were sent on its own: a sell stops at flat
+        running = running - np.minimum(0.0, pd.Series(running).groupby(frame["symbol"]).cummin().to_numpy())
+    frame["target"] = running
+    frame["start"] = start
+
+    net = frame.groupby("symbol", sort=False).agg(
+        target=("target", "last"), start=("start", "first"), price=("price", "last"), signals=("change", "size")
+    )
+    net["quantity"] = net["target"] - net["start"]
+    net = net[(net["quantity"] != 0) & (net["quantity"].abs() * net["price"] >= min_notional)]
+    return net.reset_index()[NET_COLUMNS]
+
+
+def reduction_ratio(n_signals, n_orders):
+    """Share of the signals that did not become an order."""
+    return 1 - n_orders / n_signals if n_signals else 0.0
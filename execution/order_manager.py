@@ -1,40 +1,233 @@
+import asyncio
+import time
 from collections import deque
 
+# Order lifecycle: new -> submitted -> open -> filled / canceled / rejected / expired.
+# Orders in a final state leave the book and go to the bounded history.
+ORDER_STATES = ("new", "submitted", "open", "filled", "canceled", "rejected", "expired")
+FINAL_STATES = frozenset(("filled", "canceled", "rejected", "expired"))
+
+# ccxt order status -> our state
+EXCHANGE_STATES = {
+    "open": "open",
+    "closed": "filled",
+    "filled": "filled",
+    "canceled": "canceled",
+    "cancelled": "canceled",
+    "expired": "expired",
+    "rejected": "rejected",
+}
+
+
+class Order:
+    __slots__ = (
+        "id", "symbol", "quantity", "side", "price", "status", "exchange_id",
+        "filled", "filled_before", "average", "created_at", "updated_at",
+    )
+
+    def __init__(self, order_id, symbol, quantity, side, price=None):
+        self.id = order_id
+        self.symbol = symbol
+        self.quantity = quantity
+        self.side = side
+        self.price = price
+        self.status = "new"
+        self.exchange_id = None
+        self.filled = 0.0
+        # filled by the earlier exchange orders of an order the ExecutionScheduler works
+        # through several, None for an order sent once
+        self.filled_before = None
+        self.average = None  # average price of the filled quantity
+        self.created_at = self.updated_at = time.time()
+
+    @property
+    def signed_quantity(self):
+        return self.quantity if self.side == "buy" else -self.quantity
+
+    def __repr__(self):
+        return (
+            f"Order({self.id}, {self.symbol}, {self.side} {self.quantity}"
+            f"{f' @ {self.price}' if self.price is not None else ''}, {self.status})"
+        )
+
 
 class OrderManager:
-    def __init__(self, broker):
+    """
+    Book of live orders indexed by id, symbol, status and exchange id, so
+    lookups and state transitions are O(1) however many orders a session
+    has seen. Orders reaching a final state leave the book; the last
+    `history` of them are kept in executed_orders.
+    """
+
+    def __init__(self, broker, history=10_000):
         self.broker = broker
-        self.order_queue = deque()
-        self.executed_orders = []
+        self.last_id = 0
+        self.orders = {}  # live orders by id
+        self.by_symbol = {}
+        self.by_status = {state: {} for state in ORDER_STATES if state not in FINAL_STATES}
+        self.by_exchange_id = {}
+        self.executed_orders = deque(maxlen=history)
         self.positions = {}
+        # called with (order, filled quantity, price or None) on every fill
+        self.fill_listeners = []
 
     def place_order(self, symbol, quantity, side, price=None):
-        order = {"symbol": symbol, "quantity": quantity, "side": side, "price": price}
-        self.order_queue.append(order)
+        self.last_id += 1
+        order = Order(self.last_id, symbol, quantity, side, price)
+        self._index(order)
         return order
 
+    def _index(self, order):
+        self.orders[order.id] = order
+        self.by_symbol.setdefault(order.symbol, {})[order.id] = order
+        self.by_status[order.status][order.id] = order
+        if order.exchange_id is not None:
+            self.by_exchange_id[order.exchange_id] = order
+
+    def get_order(self, order_id):
+        return self.orders.get(order_id)
+
+    def get_by_exchange_id(self, exchange_id):
+        return self.by_exchange_id.get(exchange_id)
+
+    def get_orders(self, symbol=None, status=None):
+        """Live orders, optionally of one symbol and/or status, oldest first."""
+        if status is not None:
+            orders = self.by_status.get(status, {})
+            if symbol is None:
+                return list(orders.values())
+            return [order for order in orders.values() if order.symbol == symbol]
+        if symbol is not None:
+            return list(self.by_symbol.get(symbol, {}).values())
+        return list(self.orders.values())
+
+    def transition(self, order, status, exchange_id=None, filled=None, price=None):
+        """
+        Move a live order to `status`, O(1).
+
+        :param exchange_id: id of the order on the exchange, the current one for a worked order
+        :param filled: total quantity filled so far, all of it for "filled"
+        :param price: average price of everything filled so far, if known.
+            Fill listeners get the price of the new part alone.
+        """
+        if status not in ORDER_STATES:
+            raise ValueError(f"Unknown order state: {status}")
+        if order.status in FINAL_STATES:
+            raise ValueError(f"Order {order.id} is already {order.status}")
+        del self.by_status[order.status][order.id]
+        order.status = status
+        order.updated_at = time.time()
+        if exchange_id is not None and exchange_id != order.exchange_id:
+            # a worked order moves to each replacement the scheduler places
+            self.by_exchange_id.pop(order.exchange_id, None)
+            order.exchange_id = exchange_id
+            self.by_exchange_id[exchange_id] = order
+
+        if status == "filled":
+            filled = order.quantity if filled is None else filled
+        if filled is not None and filled > order.filled:
+            quantity = filled - order.filled
+            fill_price = price
+            if price is not None:
+                if order.filled and order.average is not None:
+                    fill_price = (price * filled - order.average * order.filled) / quantity
+                order.average = price
+            else:  # the average of all of it is no longer known
+                order.average = None
+            order.filled = filled
+            self.update_positions(order, quantity)
+            for listener in self.fill_listeners:
+                listener(order, quantity, fill_price)
+
+        if status in FINAL_STATES:
+            del self.orders[order.id]
+            symbol_orders = self.by_symbol[order.symbol]
+            del symbol_orders[order.id]
+            if not symbol_orders:
+                del self.by_symbol[order.symbol]
+            if order.exchange_id is not None:
+                self.by_exchange_id.pop(order.exchange_id, None)
+            self.executed_orders.append(order)
+        else:
+            self.by_status[status][order.id] = order
+        return order
+
+    def apply_exchange_order(self, order, result):
+        """Update an order from a ccxt order dict (place_order / fetch_order response)."""
+        status = EXCHANGE_STATES.get(result.get("status"), "open")
+        return self.transition(
+            order, status, exchange_id=result.get("id"), filled=result.get("filled"),
+            price=result.get("average") or result.get("price"),
+        )
+
     def process_orders(self):
-        processed_orders = []
-        while self.order_queue:
-            order = self.order_queue.popleft()
-            processed_orders.append(order)
-        self.order_queue = deque(processed_orders)
-
-    def update_positions(self, order):
-        symbol = order["symbol"]
-        side = order["side"]
-        quantity = order["quantity"]
-        if side == "buy":
-            if symbol in self.positions:
-                self.positions[symbol] += quantity
+        """Orders placed since the last call, marked submitted. Only new orders are touched."""
+        new_orders = list(self.by_status["new"].values())
+        for order in new_orders:
+            self.transition(order, "submitted")
+        return new_orders
+
+    async def submit_orders(self, orders=None, order_type="market", max_concurrency=8):
+        """
+        Send orders to an AsyncBroker concurrently, at most max_concurrency in flight.
+
+        :param orders: orders to send, the new ones (process_orders) by default
+        :return: list of (order, broker response or the exception it raised)
+        """
+        orders = self.process_orders() if orders is None else orders
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def submit(order):
+            async with semaphore:
+                return await self.broker.place_order(
+                    order.symbol, order_type, order.quantity, order.side, order.price
+                )
+
+        results = await asyncio.gather(*(submit(order) for order in orders), return_exceptions=True)
+        for order, result in zip(orders, results):
+            if order.status in FINAL_STATES:
+                continue
+            if isinstance(result, Exception):
+                self.transition(order, "rejected")
             else:
-                self.positions[symbol] = quantity
-        elif side == "sell":
-            if symbol in self.positions:
-                self.positions[symbol] -= quantity
+                self.apply_exchange_order(order, result)
+        return list(zip(orders, results))
+
+    def update_positions(self, order, quantity=None):
+        quantity = order.quantity if quantity is None else quantity
+        if order.side == "buy":
+            self.positions[order.symbol] = self.positions.get(order.symbol, 0) + quantity
+        elif order.side == "sell":
+            if order.symbol in self.positions:
+                self.positions[order.symbol] -= quantity
+
+    def net_position(self, symbol):
+        """Filled position plus what the symbol's live orders would still add."""
+        working = sum(
+            order.signed_quantity - (order.filled if order.side == "buy" else -order.filled)
+            for order in self.by_symbol.get(symbol, {}).values()
+        )
+        return self.positions.get(symbol, 0) + working
 
     def get_positions(self):
         return self.positions
 
     def get_executed_orders(self):
-        return self.executed_orders
+        return list(self.executed_orders)
+
+    def get_state(self):
+        """Live orders and positions for a warm restart, the fill history is not kept."""
+        return {"last_id": self.last_id, "orders": list(self.orders.values()), "positions": self.positions}
+
+    def set_state(self, state):
+        self.last_id = state["last_id"]
+        self.positions = state["positions"]
+        for order in state["orders"]:
+            if not hasattr(order, "average"):  # snapshot from before fill prices were kept
+                order.average = None
+            if not hasattr(order, "filled_before"):
+                order.filled_before = None
+            self._index(order)
+
+    def __len__(self):
+        return len(self.orders)
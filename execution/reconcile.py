@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+
+from utils.metrics import metrics
+
+from .execution import ExecutionAlgo
+from .order_manager import FINAL_STATES
+
+logger = logging.getLogger(__name__)
+
+
+def _average(order, filled, fill_price):
+    """Average price of `filled` when the part beyond order.filled traded at `fill_price`."""
+    if fill_price is None or order.average is None or not order.filled:
+        return fill_price
+    return (order.average * order.filled + fill_price * (filled - order.filled)) / filled
+
+
+class OrderReconciler:
+    """
+    Keeps the OrderManager in step with the exchange after submission:
+    partial fills, later fills of resting orders, and orders canceled or
+    expired on the exchange.
+
+    A poll makes one fetch_open_orders and one fetch_my_trades call for the
+    whole account, however many orders are live. An order's filled
+    quantity is the largest of what the book already has, what the open
+    order reports and the sum of its trades seen since the reconciler
+    started. Each of these is a lower bound of the true fill, so a fill
+    seen by several of them is applied once. Only orders that left the open
+    list without their trades covering the whole quantity (canceled,
+    expired, or trades not visible yet) are looked up with get_order_status.
+    Orders worked by an ExecutionScheduler (order.filled_before set) are
+    left to it, it cancels and replaces their exchange orders as it goes.
+    apply() also takes the polls of another reconciler over the same account,
+    so several books can share one (runtime.supervisor.SharedReconciler).
+
+    :param broker: AsyncBroker with fetch_open_orders and fetch_my_trades
+    :param interval: seconds between polls in run()
+    :param trade_limit: most trades fetched per poll, the rest come with the next one
+    :param clock: time() source of the first `since`, trades before it are not fetched
+    """
+
+    def __init__(self, order_manager, broker, interval=5.0, trade_limit=1000, max_concurrency=8, clock=time):
+        self.order_manager = order_manager
+        self.broker = broker
+        self.interval = interval
+        self.trade_limit = trade_limit
+        self.max_concurrency = max_concurrency
+        self.since = int(clock.time() * 1000)
+        self.seen = set()  # ids of the trades at `since`, which is inclusive
+        self.traded = {}  # exchange id of a live order -> quantity in its trades seen
+        self.running = True
+        self.stopped = None
+
+    def _new_trades(self, trades):
+        """Trades not seen by an earlier poll, and move `since` to the newest one."""
+        latest = max((trade["timestamp"] for trade in trades), default=self.since)
+        new = [
+            trade for trade in trades
+            if trade["timestamp"] > self.since or (trade["timestamp"] == self.since and trade["id"] not in self.seen)
+        ]
+        if latest == self.since and len(trades) >= self.trade_limit:
+            # a whole page in one millisecond: step past it, later polls cannot page through it.
+            # Fills it hides reach the book through the open orders or get_order_status.
+            self.since, self.seen = latest + 1, set()
+        else:
+            seen = self.seen if latest == self.since else set()
+            seen.update(trade["id"] for trade in new if trade["timestamp"] == latest)
+            self.since, self.seen = latest, seen
+        return new
+
+    async def _lookup(self, orders):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def lookup(order):
+            async with semaphore:
+                return await self.broker.get_order_status(order.exchange_id)
+
+        return await asyncio.gather(*(lookup(order) for order in orders), return_exceptions=True)
+
+    async def poll(self):
+        """
+        The account's open orders, its trades not seen by an earlier poll and
+        the time.time() the poll started at, the arguments of apply().
+        """
+        started = time.time()
+        open_orders, trades = await asyncio.gather(
+            self.broker.fetch_open_orders(), self.broker.fetch_my_trades(since=self.since, limit=self.trade_limit)
+        )
+        return open_orders, self._new_trades(trades), started
+
+    async def reconcile(self):
+        """One poll, returns the number of orders whose fill or state changed."""
+        return await self.apply(*await self.poll())
+
+    async def apply(self, open_orders, trades, started):
+        """
+        Bring the book in step with a poll, made by this reconciler or by
+        another one over the same account. Returns the number of orders whose
+        fill or state changed.
+        """
+        manager = self.order_manager
+        # quantity and notional of this poll's trades per order, for the fill price
+        fills = {}
+        for trade in trades:
+            order = manager.get_by_exchange_id(trade["order"])
+            if order is None or order.filled_before is not None:  # another system's, final or worked
+                continue
+            self.traded[order.exchange_id] = self.traded.get(order.exchange_id, 0.0) + trade["amount"]
+            quantity, notional = fills.get(order.id, (0.0, 0.0))
+            fills[order.id] = (quantity + trade["amount"], notional + trade["amount"] * trade["price"])
+        reported = {result["id"]: result for result in open_orders}
+
+        updated = 0
+        missing = []
+        for exchange_id, order in list(manager.by_exchange_id.items()):
+            if order.filled_before is not None:
+                continue
+            result = reported.get(exchange_id)
+            filled = max(order.filled, self.traded.get(exchange_id, 0.0), (result or {}).get("filled") or 0.0)
+            if filled >= order.quantity * (1 - 1e-9):  # summed partial fills may round below
+                status = "filled"
+            elif result is not None:
+                status = "open"
+            else:
+                status = order.status
+                if order.updated_at < started:  # not placed while the poll was in flight
+                    missing.append(order)
+            if status == order.status and filled <= order.filled:
+                continue
+            if order.id in fills:
+                quantity, notional = fills[order.id]
+                price = _average(order, filled, notional / quantity)
+            else:
+                price = (result or {}).get("average") or _average(order, filled, order.price)
+            manager.transition(order, status, filled=filled, price=price)
+            if status in FINAL_STATES:
+                self.traded.pop(exchange_id, None)
+            updated += 1
+
+        # closed on the exchange with fills unaccounted for: ask for each one
+        for order, result in zip(missing, await self._lookup(missing) if missing else ()):
+            if isinstance(result, Exception) or order.status in FINAL_STATES:
+                continue  # tried again next poll
+            manager.apply_exchange_order(order, result)
+            if order.status in FINAL_STATES:
+                self.traded.pop(order.exchange_id, None)
+            updated += 1
+
+        metrics.count("reconcile.updated", updated)
+        metrics.count("reconcile.lookups", len(missing))
+        return updated
+
+    async def cancel_worked(self):
+        """
+        Cancel the exchange orders of worked orders no ExecutionScheduler is
+        working any more, those of a restored book before the scheduler
+        starts, and apply what they filled. Returns the number of orders closed;
+        one whose cancel fails stays in the book, and is logged.
+        """
+        manager = self.order_manager
+        orders = [order for order in manager.get_orders() if order.filled_before is not None and order.exchange_id]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def cancel(order):
+            async with semaphore:
+                try:
+                    result = await self.broker.cancel_order(order.exchange_id)
+                except Exception:  # closed already, or the cancel failed: the status tells
+                    result = None
+                if not isinstance(result, dict) or result.get("filled") is None:
+                    result = await self.broker.get_order_status(order.exchange_id)
+                return result
+
+        closed = 0
+        results = await asyncio.gather(*(cancel(order) for order in orders), return_exceptions=True)
+        for order, result in zip(orders, results):
+            if isinstance(result, Exception) or result.get("status") == "open":
+                metrics.count("reconcile.errors")
+                logger.error("Could not cancel %s (exchange order %s): %s", order, order.exchange_id, result)
+                continue
+            filled = max(order.filled, order.filled_before + ExecutionAlgo.filled_quantity(result))
+            status = "filled" if filled >= order.quantity * (1 - 1e-9) else "canceled"
+            price = _average(order, filled, result.get("average") or result.get("price"))
+            manager.transition(order, status, filled=filled, price=price)
+            closed += 1
+        return closed
+
+    async def run(self):
+        """Poll every `interval` seconds until stop(); a failed poll is retried on the next one."""
+        self.stopped = asyncio.Event()
+        while self.running:
+            try:
+                with metrics.timer("reconcile"):
+                    await self.reconcile()
+            except Exception:
+                metrics.count("reconcile.errors")
+                logger.exception("Reconcile poll failed, retrying in %ss", self.interval)
+            try:
+                await asyncio.wait_for(self.stopped.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self.running = False
+        if self.stopped is not None:
+            self.stopped.set()
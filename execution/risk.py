@@ -0,0 +1,174 @@
+import time
+from collections import deque
+
+
+class SymbolRisk:
+    """Position, average cost and last mark of one symbol."""
+
+    __slots__ = ("quantity", "average_cost", "mark", "exposure", "unrealized")
+
+    def __init__(self):
+        self.quantity = 0.0
+        self.average_cost = 0.0
+        self.mark = None
+        self.exposure = 0.0  # abs(quantity) * mark
+        self.unrealized = 0.0  # quantity * (mark - average_cost)
+
+
+class RiskEngine:
+    """
+    Pre-trade checks between signal generation and order placement.
+
+    Exposure and PnL are running totals updated on every fill and mark, so
+    a check never loops over positions or orders: check_order is a few dict
+    lookups and comparisons.
+
+    Limits set to None are not checked.
+    """
+
+    def __init__(self, max_loss=1000, max_symbol_exposure=None, max_gross_exposure=None,
+                 max_orders_per_minute=None, clock=time.monotonic):
+        self.max_loss = max_loss
+        self.max_symbol_exposure = max_symbol_exposure
+        self.max_gross_exposure = max_gross_exposure
+        self.max_orders_per_minute = max_orders_per_minute
+        self.clock = clock
+        self.symbols = {}
+        self.gross_exposure = 0.0
+        self.realized_pnl = 0.0
+        self.unrealized_pnl = 0.0
+        self.order_times = deque()  # accepted orders in the last minute
+        self.rejected = {}
+
+    def _symbol(self, symbol):
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = self.symbols[symbol] = SymbolRisk()
+        return state
+
+    @property
+    def pnl(self):
+        return self.realized_pnl + self.unrealized_pnl
+
+    @property
+    def current_loss(self):
+        return max(0.0, -self.pnl)
+
+    def should_stop(self):
+        return self.max_loss is not None and self.current_loss >= self.max_loss
+
+    def position(self, symbol):
+        state = self.symbols.get(symbol)
+        return state.quantity if state is not None else 0.0
+
+    def _revalue(self, state):
+        """Refresh one symbol's exposure and unrealized PnL, and the totals."""
+        exposure = abs(state.quantity) * state.mark if state.mark is not None else 0.0
+        unrealized = state.quantity * (state.mark - state.average_cost) if state.mark is not None else 0.0
+        self.gross_exposure += exposure - state.exposure
+        self.unrealized_pnl += unrealized - state.unrealized
+        state.exposure = exposure
+        state.unrealized = unrealized
+
+    def on_mark(self, symbol, price):
+        state = self._symbol(symbol)
+        state.mark = price
+        self._revalue(state)
+
+    def on_fill(self, symbol, quantity, price=None, fee=0.0):
+        """
+        :param quantity: signed filled quantity, negative for sells
+        :param price: price of this fill, the last mark if unknown; raises
+            ValueError when there is neither
+        """
+        if quantity == 0:
+            return
+        if price is None:
+            price = self.symbols[symbol].mark if symbol in self.symbols else None
+            if price is None:
+                raise ValueError(f"Fill of {quantity} {symbol} without a price or a mark")
+        state = self._symbol(symbol)
+        position = state.quantity
+        if position == 0 or (position > 0) == (quantity > 0):
+            # opening or adding: new average cost
+            total = position + quantity
+            state.average_cost = (position * state.average_cost + quantity * price) / total
+            state.quantity = total
+        else:
+            closed = min(abs(quantity), abs(position))
+            sign = 1 if position > 0 else -1
+            self.realized_pnl += closed * sign * (price - state.average_cost)
+            state.quantity = position + quantity
+            if state.quantity == 0:
+                state.average_cost = 0.0
+            elif (state.quantity > 0) != (position > 0):
+                state.average_cost = price  # flipped side, the rest opens at the fill price
+        self.realized_pnl -= fee
+        state.mark = price  # the latest traded price
+        self._revalue(state)
+
+    def check_order(self, symbol, quantity, side, price=None):
+        """
+        :return: None when the order may be placed, otherwise why not. An
+            accepted order counts towards the order rate. Orders that only
+            reduce a position are always accepted, so it can still be
+            flattened past the loss limit.
+        """
+        state = self.symbols.get(symbol)
+        position = state.quantity if state is not None else 0.0
+        signed = quantity if side == "buy" else -quantity
+        reduces = position != 0 and (signed > 0) != (position > 0) and abs(signed) <= abs(position)
+
+        if self.should_stop() and not reduces:
+            return self._reject("max_loss")
+
+        now = self.clock()
+        if self.max_orders_per_minute is not None:
+            order_times = self.order_times
+            while order_times and order_times[0] <= now - 60:
+                order_times.popleft()
+            if len(order_times) >= self.max_orders_per_minute and not reduces:
+                return self._reject("order_rate")
+
+        if price is None and state is not None:
+            price = state.mark
+        if price is not None:
+            current = state.exposure if state is not None else 0.0
+            exposure = abs(position + signed) * price
+            if self.max_symbol_exposure is not None and exposure > self.max_symbol_exposure and exposure > current:
+                return self._reject("symbol_exposure")
+            gross = self.gross_exposure - current + exposure
+            if self.max_gross_exposure is not None and gross > self.max_gross_exposure and gross > self.gross_exposure:
+                return self._reject("gross_exposure")
+
+        if self.max_orders_per_minute is not None:
+            self.order_times.append(now)
+        return None
+
+    def _reject(self, reason):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return reason
+
+    def get_state(self):
+        """Positions and PnL for a warm restart; limits and the order-rate window are not kept."""
+        return {
+            "symbols": self.symbols,
+            "gross_exposure": self.gross_exposure,
+            "realized_pnl": self.realized_pnl,
+            "unrealized_pnl": self.unrealized_pnl,
+        }
+
+    def set_state(self, state):
+        self.symbols = state["symbols"]
+        self.gross_exposure = state["gross_exposure"]
+        self.realized_pnl = state["realized_pnl"]
+        self.unrealized_pnl = state["unrealized_pnl"]
+
+    def summary(self):
+        return {
+            "realized_pnl": self.realized_pnl,
+            "unrealized_pnl": self.unrealized_pnl,
+            "gross_exposure": self.gross_exposure,
+            "orders_last_minute": len(self.order_times),
+            "rejected": dict(self.rejected),
+        }
@@ -0,0 +1,329 @@
+import asyncio
+import itertools
+import math
+from collections import defaultdict, deque
+
+import numpy as np
+
+from utils.metrics import metrics
+
+from .execution import ExecutionAlgo
+
+
+class ExecutionTask:
+    """State of one order worked by the ExecutionScheduler."""
+
+    __slots__ = (
+        "task_id", "symbol", "trade", "mode", "order_id", "submitted_at",
+        "first_order_at", "done_at", "status", "orders_placed", "done",
+        "filled", "notional", "priced", "filled_before", "notional_before", "priced_before",
+        "errors", "error", "on_update",
+    )
+
+    def __init__(self, task_id, symbol, trade, submitted_at, done, on_update=None):
+        self.task_id = task_id
+        self.symbol = symbol
+        self.trade = trade
+        self.mode = "Passive"
+        self.order_id = None
+        self.submitted_at = submitted_at
+        self.first_order_at = None
+        self.done_at = None
+        self.status = "working"  # working, filled, expired or error
+        self.orders_placed = 0
+        self.done = done  # future resolved with the task when it finishes
+        # quantity filled, the part of it with a known price and its cost, over all
+        # orders placed and over those already canceled
+        self.filled = self.notional = self.priced = 0.0
+        self.filled_before = self.notional_before = self.priced_before = 0.0
+        self.errors = 0  # broker errors in a row
+        self.error = None  # the last one
+        self.on_update = on_update  # called with the task when it places an order or `filled` grows
+
+    @property
+    def average(self):
+        """Average fill price, None before the first fill or while part of the fill has no price."""
+        if not self.filled or self.priced < self.filled * (1 - 1e-9):
+            return None
+        return self.notional / self.priced
+
+    def _keep_fill(self):
+        """The current order is gone, what it filled stays with the task."""
+        self.filled_before, self.notional_before, self.priced_before = self.filled, self.notional, self.priced
+
+    @property
+    def remaining(self):
+        """Signed quantity still to trade."""
+        return math.copysign(max(abs(self.trade) - self.filled, 0.0), self.trade)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: `size` slots of `resolution` seconds. Scheduling and
+    expiry are O(1) per task, however many orders are being worked.
+    """
+
+    def __init__(self, resolution, size=64):
+        self.resolution = resolution
+        self.size = size
+        self.slots = [[] for _ in range(size)]
+        self.current_tick = None
+
+    def schedule(self, item, when):
+        # rounded up, a timer never fires early
+        tick = math.ceil(when / self.resolution)
+        if self.current_tick is not None:
+            tick = max(tick, self.current_tick + 1)
+        self.slots[tick % self.size].append((tick, item))
+
+    def advance(self, now):
+        """Items due up to `now`."""
+        target = math.floor(now / self.resolution)
+        if self.current_tick is None:
+            self.current_tick = target - 1
+        due = []
+        while self.current_tick < target:
+            self.current_tick += 1
+            slot = self.slots[self.current_tick % self.size]
+            if not slot:
+                continue
+            later = []
+            for tick, item in slot:
+                if tick <= self.current_tick:
+                    due.append(item)
+                else:
+                    later.append((tick, item))  # due on a later lap
+            slot[:] = later
+        return due
+
+    def __len__(self):
+        return sum(len(slot) for slot in self.slots)
+
+
+class ExecutionScheduler:
+    """
+    Works many ExecutionAlgo state machines in one event loop. Every tick
+    the due orders are grouped by symbol, the book is fetched once per
+    symbol and shared, and broker calls for all orders go out concurrently.
+
+    Records per-order latency (submit -> first order acknowledged) and
+    fill time (submit -> filled), the last `history` of each.
+
+    A failed broker call is retried after 1, 2, 4, ... ticks; after
+    `max_retries` failures in a row the task's order is canceled and the
+    task finishes as "error". Every task's `done` is resolved, also when
+    the scheduler stops while it is still working.
+    """
+
+    def __init__(self, broker, tick=1.0, max_concurrency=16, wheel_size=64, max_retries=5, history=10_000):
+        self.broker = broker
+        self.tick = tick
+        self.max_retries = max_retries
+        self.wheel = TimerWheel(tick, wheel_size)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.algos = {}
+        self.active = 0
+        self.ids = itertools.count(1)
+        self.order_latencies = deque(maxlen=history)
+        self.fill_times = deque(maxlen=history)
+        self.completed = defaultdict(int)
+        self.running = True
+        self.wakeup = asyncio.Event()
+
+    def get_algo(self, symbol):
+        if symbol not in self.algos:
+            self.algos[symbol] = ExecutionAlgo(self.broker, symbol)
+        return self.algos[symbol]
+
+    def submit(self, symbol, trade, on_update=None):
+        """
+        Queue a signed trade, returns the ExecutionTask (await task.done for the result).
+
+        :param on_update: called with the task after each order it places (task.order_id)
+            and each fill, partial ones included
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        task = ExecutionTask(next(self.ids), symbol, trade, now, loop.create_future(), on_update)
+        self.get_algo(symbol)
+        self.wheel.schedule(task, now)
+        self.active += 1
+        self.wakeup.set()
+        return task
+
+    async def _call(self, method, *args):
+        async with self.semaphore:
+            with metrics.timer(f"broker.{method}"):
+                return await getattr(self.broker, method)(*args)
+
+    def _record_fill(self, task, order):
+        """Take the fill of the task's current order from a broker order dict."""
+        filled = ExecutionAlgo.filled_quantity(order)
+        price = order.get("average") or order.get("price")
+        previous = task.filled
+        task.filled = task.filled_before + filled
+        if price is None:  # left unpriced rather than booked at 0
+            task.notional, task.priced = task.notional_before, task.priced_before
+        else:
+            task.notional = task.notional_before + filled * price
+            task.priced = task.priced_before + filled
+        if task.filled > previous and task.on_update is not None:
+            task.on_update(task)
+
+    async def _cancel(self, task):
+        """Cancel the task's order and keep what it filled."""
+        order = await self._call("cancel_order", task.order_id)
+        if not isinstance(order, dict) or order.get("filled") is None:
+            order = await self._call("get_order_status", task.order_id)
+        self._record_fill(task, order)
+        task._keep_fill()
+        task.order_id = None
+
+    async def _retry(self, task, error, now):
+        """Run the task again after a backoff, give up after max_retries errors in a row."""
+        metrics.count("scheduler.errors")
+        task.errors += 1
+        task.error = error
+        if task.errors <= self.max_retries:
+            self.wheel.schedule(task, now + self.tick * 2 ** (task.errors - 1))
+            return
+        if task.order_id is not None:
+            try:
+                await self._cancel(task)
+            except Exception:
+                pass  # the order may be left resting on the exchange
+        self._finish(task, "error", now)
+
+    def _finish(self, task, status, now):
+        task.status = status
+        task.done_at = now
+        if status == "filled":
+            self.fill_times.append(now - task.submitted_at)
+        self.completed[status] += 1
+        self.active -= 1
+        if not task.done.done():
+            task.done.set_result(task)
+
+    async def _step(self, task, bookdata, now):
+        try:
+            await self._work(task, bookdata, now)
+        except Exception as e:
+            await self._retry(task, e, now)
+        else:
+            task.errors = 0
+
+    async def _work(self, task, bookdata, now):
+        algo = self.algos[task.symbol]
+        if task.order_id is not None:
+            order = await self._call("get_order_status", task.order_id)
+            self._record_fill(task, order)
+            if order["status"] == "closed":
+                self._finish(task, "filled", now)
+                return
+            if order["status"] != "open":  # canceled or expired on the exchange, place the rest again
+                task._keep_fill()
+                task.order_id = None
+
+        elapsed_time = now - task.submitted_at
+        task.mode, action = algo.next_action(
+            task.mode, elapsed_time, task.trade, bookdata, task.order_id
+        )
+        if action is None and task.mode == "Aggressive" and task.order_id is None and algo.has_book(bookdata):
+            action = "update"  # the order was canceled but its replacement failed
+        if action == "switch":
+            algo.switch_to_aggressive(task.order_id)
+        elif action in ("place", "update"):
+            if action == "update" and task.order_id is not None:
+                await self._cancel(task)
+            if abs(task.remaining) <= abs(task.trade) * 1e-9:  # the canceled order filled it all
+                self._finish(task, "filled", now)
+                return
+            # only what earlier orders left unfilled
+            args = algo.limit_order_args(task.remaining, bookdata, aggressive=action == "update")
+            order = await self._call("place_order", *args)
+            task.order_id = order["id"]
+            task.orders_placed += 1
+            if task.on_update is not None:
+                task.on_update(task)
+            if task.first_order_at is None:
+                task.first_order_at = asyncio.get_running_loop().time()
+                self.order_latencies.append(task.first_order_at - task.submitted_at)
+        elif action == "cancel":
+            if task.order_id is not None:
+                await self._cancel(task)
+            self._finish(task, "expired", now)
+            return
+        self.wheel.schedule(task, now + self.tick)
+
+    async def run_once(self, now):
+        due = self.wheel.advance(now)
+        if not due:
+            return 0
+        by_symbol = defaultdict(list)
+        for task in due:
+            by_symbol[task.symbol].append(task)
+
+        # one book fetch per symbol, shared by every order on it
+        symbols = list(by_symbol)
+        books = await asyncio.gather(
+            *(self._call("get_orderbook_data", s) for s in symbols), return_exceptions=True
+        )
+        await asyncio.gather(
+            *(
+                self._retry(task, bookdata, now) if isinstance(bookdata, Exception)
+                else self._step(task, bookdata, now)
+                for symbol, bookdata in zip(symbols, books)
+                for task in by_symbol[symbol]
+            )
+        )
+        return len(due)
+
+    async def _cancel_working(self, now):
+        """Cancel the orders of every task still working and finish the tasks as expired."""
+        tasks = [task for slot in self.wheel.slots for _, task in slot]
+        for slot in self.wheel.slots:
+            slot.clear()
+
+        async def cancel(task):
+            if task.order_id is not None:
+                try:
+                    await self._cancel(task)
+                except Exception as e:
+                    task.error = e
+            self._finish(task, "expired", now)
+
+        await asyncio.gather(*(cancel(task) for task in tasks))
+
+    async def run(self):
+        """Work the submitted tasks until stop(), then cancel what is still working."""
+        loop = asyncio.get_running_loop()
+        while self.running:
+            if self.active == 0:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            await self.run_once(loop.time())
+            # sleep to the start of the next wheel slot
+            await asyncio.sleep(self.tick - loop.time() % self.tick)
+        await self._cancel_working(loop.time())
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+    def metrics(self):
+        def summary(values):
+            if not values:
+                return {"count": 0, "p50": None, "p99": None}
+            return {
+                "count": len(values),
+                "p50": float(np.percentile(values, 50)),
+                "p99": float(np.percentile(values, 99)),
+            }
+
+        return {
+            "order_latency": summary(self.order_latencies),
+            "fill_time": summary(self.fill_times),
+            "completed": dict(self.completed),
+            "active": self.active,
+        }
@@ -0,0 +1,22 @@
+import math
+
+import numpy as np
+
+
+def atr_position_size(atr, total_capital, portfolio_size, risk_target, min_size=30):
+    """
+    USD size of an ATR-targeted position, shared by TradingSystem and the backtester.
+
+    :param atr: latest ATR, a scalar or a numpy array
+    :return: (1 / portfolio_size) * total_capital * (risk_target / atr), or 0
+        where the ATR is missing or the size is below min_size USD
+    """
+    if isinstance(atr, float):
+        # plain float path for per-symbol sizing in the trading cycle
+        size = (1 / portfolio_size) * total_capital * (risk_target / atr) if atr > 0 else 0.0
+        return size if math.isfinite(size) and size >= min_size else 0.0
+    atr = np.asarray(atr, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        size = (1 / portfolio_size) * total_capital * (risk_target / atr)
+    size = np.where(np.isfinite(size) & (size >= min_size), size, 0.0)
+    return float(size) if size.ndim == 0 else size
@@ -1,101 +1,318 @@
-import ccxt
-import pandas as pd
 import asyncio
-from datetime import datetime
-from broker import CoinbaseBroker
+from broker import AsyncCoinbaseBroker
 from data.market_data_feed import MarketDataFeed
-from signals.smart_money import generate_signals, load_data, calculate_atr
-from execution.order_manager import OrderManager
-from config.dontshare_settings import API_KEY, API_SECRET, DATA_DIR
+from data.candle_store import CandleStore
+from data.streaming import StreamingMarketData
+from data.bar_events import BarQueue
+from data.resample import TimeframeResampler
+from signals.smart_money import load_data
+from signals.incremental import IncrementalSignalEngine
+from execution.order_manager import FINAL_STATES, OrderManager
+from execution.scheduler import ExecutionScheduler
+from execution.reconcile import OrderReconciler
+from execution.sizing import atr_position_size
+from execution.risk import RiskEngine
+from execution.netting import net_signals, reduction_ratio
+try:
+    from config.dontshare_settings import API_KEY, API_SECRET, DATA_DIR
+except ImportError:
+    # local secrets file not present: enough to import TradingSystem (tests, benchmarks),
+    # running this module needs the real keys, see __main__
+    from config.settings import API_KEY, API_SECRET, DATA_DIR
+from config.settings import (
+    CANDLE_RETENTION_BARS, STORAGE_BACKEND, MARKET_DATA_MODE, SIGNAL_TIMEFRAME,
+    MAX_SYMBOL_EXPOSURE, MAX_GROSS_EXPOSURE, MAX_ORDERS_PER_MINUTE,
+    METRICS_FILE, PROFILE_FILE, LOG_FILE, LOG_FORMAT, LOG_MAX_BYTES, STATE_FILE, RECONCILE_INTERVAL,
+)
 from utils.logger import setup_logger
+from utils.metrics import metrics, SamplingProfiler
+from utils.snapshot import read_snapshot, write_snapshot
+import math
+import os
+import pandas as pd
 import signal
+import time
 
 
 class TradingSystem:
-    def __init__(self, broker, order_manager, market_data_feed, symbols, interval=5, risk_target=0.25, total_capital=3000, portfolio_size=10, max_loss = 1000):
+    def __init__(self, broker, order_manager, market_data_feed, symbols, interval=5, risk_target=0.25, total_capital=3000, portfolio_size=10, max_loss = 1000, candle_store=None, max_concurrent_orders=8, execution_scheduler=None, risk_engine=None, bar_events=None, timeframe=None, resampler=None, log_file=LOG_FILE, metrics_file=METRICS_FILE, state_file=STATE_FILE):
         self.broker = broker
         self.order_manager = order_manager
         self.market_data_feed = market_data_feed
+        self.candle_store = candle_store
+        self.max_concurrent_orders = max_concurrent_orders
+        # when set, orders are worked passive -> aggressive instead of sent as market orders
+        self.execution_scheduler = execution_scheduler
+        # when set, a cycle runs as soon as the feed publishes closed bars instead of every interval
+        self.bar_events = bar_events
+        # signal candles when reading from disk, None keeps the stored 5m bars
+        self.timeframe = timeframe
+        # folds the feed's 5m bars into candle_store's timeframe, its partial bars are saved with the state
+        self.resampler = resampler
+        # per instance so several systems (e.g. sharded workers) do not share files, empty disables
+        self.metrics_file = metrics_file
+        self.state_file = state_file
         self.symbols = symbols
         self.interval = interval
-        self.logger = setup_logger("trading_system", "trading_system.log")
+        self.logger = setup_logger(
+            "trading_system", log_file, json_format=LOG_FORMAT == "json", max_bytes=LOG_MAX_BYTES
+        )
         self.risk_target = risk_target
         self.total_capital = total_capital
         self.portfolio_size = portfolio_size
+        self.min_order_size = 30  # USD, smaller net orders are not sent
         self.stop_signal_received = False
         self.max_loss = max_loss
         self.current_loss = 0
+        self.signal_engine = IncrementalSignalEngine()
+        # Pre-trade checks on every order, kept up to date from fills and marks
+        self.risk_engine = risk_engine or RiskEngine(
+            max_loss=max_loss,
+            max_symbol_exposure=MAX_SYMBOL_EXPOSURE * total_capital,
+            max_gross_exposure=MAX_GROSS_EXPOSURE * total_capital,
+            max_orders_per_minute=MAX_ORDERS_PER_MINUTE,
+        )
+        self.order_manager.fill_listeners.append(self.on_fill)
         
         # Register signal handlers
         signal.signal(signal.SIGINT, self.handle_stop_signal)
         signal.signal(signal.SIGTERM, self.handle_stop_signal)
 
     def handle_stop_signal(self, signum, frame):
-        self.logger.info(f"Received stop signal: {signum}")
+        self.logger.info("Received stop signal: %s", signum)
         self.stop_signal_received = True
+        if self.bar_events is not None:
+            self.bar_events.close()
 
-    async def generate_and_execute_signals(self):
-        data_df = load_data(DATA_DIR)
+    async def generate_and_execute_signals(self, event=None):
+        with metrics.timer("cycle.load_data"):
+            if self.candle_store is not None:
+                # Read only the bars the signal engine has not seen yet
+                data_df = self.candle_store.to_frame(
+                    self.symbols, since=self.signal_engine.last_timestamps()
+                )
+            else:
+                # the engine keeps every bar it is fed, so no still-forming bucket
+                data_df = load_data(
+                    DATA_DIR, self.symbols, backend=STORAGE_BACKEND, timeframe=self.timeframe,
+                    closed_only=True,
+                )
+        metrics.count("bars", len(data_df))
 
-        _, signals = generate_signals(data_df)
-        self.logger.info(f"Generated signals at {datetime.now()}: {signals}")
-        
-        _, atr = calculate_atr(data_df)
-        # Get the latest ATR for each symbol
-        atr = atr.loc[atr.groupby('symbol')['timestamp'].idxmax()]
-        # Set the symbol column as the index
-        atr.set_index('symbol', inplace=True)
-        self.logger.info(f"calculated atr at {datetime.now()}: {atr}")
+        # Only candles that arrived since the last cycle are fed to the indicators
+        with metrics.timer("cycle.generate_signals"):
+            signals = self.signal_engine.update(data_df)
+        metrics.count("signals", len(signals))
+        self.logger.info("Generated %d signals:\n%s", len(signals), signals)
         
-        # Debugging: Print columns and first few rows of signals DataFrame
-        print("Signals DataFrame columns:", signals.columns)
-        print("First few rows of signals DataFrame:\n", signals.head())
+        # Latest ATR, close, SMAs and support/resistance per symbol, updated by the engine
+        latest = self.signal_engine.latest
+        self.logger.info("Latest indicators:\n%s", latest.to_frame())
         
-        for _, row in signals.iterrows():
-            symbol = row["symbol"]
-            if row["signal"] == "buy":
-                size = self.get_size(symbol, atr)
-                if size > 0:
-                    self.order_manager.place_order(row["symbol"], size/row["price"], "buy")
-            elif row["signal"] == "sell":
-                size = self.get_size(symbol, atr)
-                if size > 0:
-                    self.order_manager.place_order(row["symbol"], size/row["price"], "sell")
-
-        # Process any queued orders
-        self.order_manager.process_orders()
-
-        # Try to execute orders with the broker and log the results
-        for order in self.order_manager.order_queue:
-            result = self.broker.execute_order(
-                order["symbol"], order["quantity"], order["side"]
+        # Mark positions to the latest closes so exposure and PnL are current
+        for symbol, close in latest.items("close"):
+            self.risk_engine.on_mark(symbol, close)
+        self.current_loss = self.risk_engine.current_loss
+
+        # Net the cycle's signals into one order per symbol
+        with metrics.timer("cycle.netting"):
+            sizes = {symbol: self.get_size(symbol) for symbol in signals["symbol"].unique()}
+            quantities = signals["symbol"].map(sizes) / signals["price"]
+            positions = {symbol: self.order_manager.net_position(symbol) for symbol in sizes}
+            orders = net_signals(signals, quantities, positions, min_notional=self.min_order_size)
+        self.logger.info(
+            "Netted %d signals into %d orders (reduction %.0f%%)",
+            len(signals), len(orders), 100 * reduction_ratio(len(signals), len(orders)),
+        )
+
+        for order in orders.itertuples(index=False):
+            side = "buy" if order.quantity > 0 else "sell"
+            quantity = abs(order.quantity)
+            with metrics.timer("cycle.risk_check"):
+                rejected = self.risk_engine.check_order(order.symbol, quantity, side, order.price)
+            if rejected:
+                metrics.count(f"risk_rejected.{rejected}")
+                self.logger.info("Order rejected by risk (%s): %s %s %s", rejected, side, quantity, order.symbol)
+                continue
+            self.order_manager.place_order(order.symbol, quantity, side)
+            metrics.count("orders")
+
+        if self.execution_scheduler is not None:
+            # Only orders placed this cycle, earlier ones are already being worked
+            submitted = self.order_manager.process_orders()
+            for order in submitted:
+                task = self.execution_scheduler.submit(
+                    order.symbol, order.signed_quantity,
+                    on_update=lambda task, order=order: self.on_execution_update(order, task),
+                )
+                task.done.add_done_callback(
+                    lambda done, order=order: self.on_execution_done(order, done.result())
+                )
+            if submitted:
+                self.record_latency(event)
+            return
+
+        # Send the new orders concurrently and log the results
+        with metrics.timer("cycle.submit_orders"):
+            results = await self.order_manager.submit_orders(
+                max_concurrency=self.max_concurrent_orders
             )
-            if result["status"] == "filled":
-                self.logger.info(f"Order filled: {result}")
-                self.order_manager.update_positions(order)
+        if results:
+            self.record_latency(event)
+        for order, result in results:
+            if isinstance(result, Exception):
+                self.logger.error("Order failed: %s: %s", order, result)
+            elif order.status == "filled":
+                self.logger.info("Order filled: %s", result)
             else:
-                self.logger.info(f"Order not filled: {result}")
+                self.logger.info("Order not filled: %s", result)
+
+    def get_state(self):
+        """Everything a restart needs to trade right away instead of rebuilding from history."""
+        state = {
+            "signal_engine": self.signal_engine.get_state(),
+            "order_manager": self.order_manager.get_state(),
+            "risk_engine": self.risk_engine.get_state(),
+        }
+        if self.candle_store is not None:
+            state["candle_store"] = self.candle_store.get_state()
+        if self.resampler is not None:
+            state["resampler"] = self.resampler.get_state()
+        if self.market_data_feed is not None:
+            state["high_water_marks"] = self.market_data_feed.high_water_marks.marks
+            feed_store = self.market_data_feed.candle_store
+            if feed_store is not None and feed_store is not self.candle_store:
+                state["feed_candle_store"] = feed_store.get_state()
+        return state
+
+    def save_state(self, path):
+        with metrics.timer("state.save"):
+            write_snapshot(path, self.get_state())
+
+    def restore_state(self, path):
+        """Load a snapshot written by save_state, returns False when there is none."""
+        if not os.path.exists(path):
+            return False
+        with metrics.timer("state.restore"):
+            state = read_snapshot(path)
+            self.signal_engine.set_state(state["signal_engine"])
+            self.order_manager.set_state(state["order_manager"])
+            self.risk_engine.set_state(state["risk_engine"])
+            if self.candle_store is not None and "candle_store" in state:
+                self.candle_store.set_state(state["candle_store"])
+            if self.resampler is not None and "resampler" in state:
+                self.resampler.set_state(state["resampler"])
+            if self.market_data_feed is not None:
+                for symbol, timestamp in state.get("high_water_marks", {}).items():
+                    self.market_data_feed.high_water_marks.update(symbol, timestamp)
+                if self.market_data_feed.candle_store is not None and "feed_candle_store" in state:
+                    self.market_data_feed.candle_store.set_state(state["feed_candle_store"])
+            self.invalidate_stale_indicators()
+            # without an exchange id an order never reached the exchange and nothing would ever
+            # close it. The reconciler follows the others, and cancels those the scheduler was
+            # working (OrderReconciler.cancel_worked)
+            for order in self.order_manager.get_orders():
+                if order.exchange_id is None:
+                    self.order_manager.transition(order, "canceled")
+                    self.logger.warning("Dropped order without an exchange id on restore: %s", order)
+        self.current_loss = self.risk_engine.current_loss
+        self.logger.info("Restored state from %s: %d open orders", path, len(self.order_manager))
+        return True
+
+    def invalidate_stale_indicators(self):
+        """
+        Reset the indicators the candles cannot carry on from after a restore:
+        symbols no longer traded, and those whose candles start after the
+        engine's last bar, the bars in between being lost.
+        """
+        for symbol, last_timestamp in list(self.signal_engine.last_timestamps().items()):
+            if symbol in self.symbols:
+                if self.candle_store is None or last_timestamp is None:
+                    continue
+                first = self.candle_store.first_timestamp(symbol)
+                if first is None or first <= last_timestamp:
+                    continue
+            self.logger.warning("Resetting the indicators of %s, its candles do not continue them", symbol)
+            self.signal_engine.reset(symbol)
+
+    def on_data_gap(self, symbol, first_ms, last_ms):
+        """The feed could not get some bars: the indicators start again after the gap."""
+        metrics.count("feed.gaps")
+        self.logger.warning(
+            "No bars for %s from %s to %s, resetting its indicators",
+            symbol, pd.Timestamp(first_ms, unit="ms"), pd.Timestamp(last_ms, unit="ms"),
+        )
+        self.signal_engine.reset(symbol, resume_after=pd.Timestamp(last_ms, unit="ms"))
+
+    def record_latency(self, event):
+        """Bar close to orders sent, and the part of it spent waiting in the bar queue."""
+        if event is None:
+            return
+        metrics.observe("latency.bar_close_to_order", event.latency())
+        metrics.observe("latency.publish_to_order", time.monotonic() - event.published_at)
+
+    def on_fill(self, order, quantity, price):
+        signed = quantity if order.side == "buy" else -quantity
+        try:
+            self.risk_engine.on_fill(order.symbol, signed, price)
+        except ValueError as e:  # no price and no mark yet: left out of PnL rather than costed at 0
+            metrics.count("risk.unpriced_fills")
+            self.logger.error("%s (%s)", e, order)
+        self.current_loss = self.risk_engine.current_loss
+
+    def on_execution_update(self, order, task):
+        """
+        Partial fills reach positions and risk as they happen, not when the task ends,
+        and the order follows the exchange order the scheduler works it with, so a
+        restart can cancel it.
+        """
+        if order.status not in FINAL_STATES:
+            order.filled_before = task.filled_before
+            self.order_manager.transition(
+                order, "open", exchange_id=task.order_id, filled=task.filled, price=task.average
+            )
+
+    def on_execution_done(self, order, task):
+        if task.status == "filled":
+            self.logger.info("Order filled: %s after %.1fs", order, task.done_at - task.submitted_at)
+            self.order_manager.transition(order, "filled", price=task.average)
+            return
+        if task.status == "error":
+            self.logger.error("Order failed: %s: %s", order, task.error)
+        else:
+            self.logger.info("Order not filled: %s (%s, %s filled)", order, task.status, task.filled)
+        # what it filled before it expired or failed still counts
+        self.order_manager.transition(order, "expired", filled=task.filled, price=task.average)
 
     async def start(self):
-        while True:
-            await self.generate_and_execute_signals()
-            await asyncio.sleep(self.interval * 60)  # Convert minutes to seconds
+        while not self.check_stop_conditions():
+            event = None
+            if self.bar_events is not None:
+                event = await self.bar_events.get()
+                if event is None:  # closed on shutdown
+                    break
+            with metrics.timer("cycle"):
+                await self.generate_and_execute_signals(event)
+            if self.metrics_file:
+                metrics.export(self.metrics_file)
+            if self.state_file:
+                self.save_state(self.state_file)
+            if self.bar_events is None:
+                await asyncio.sleep(self.interval * 60)  # Convert minutes to seconds
     
-    def get_size(self, symbol, atr_df, min_size = 30):
+    def get_size(self, symbol, min_size = 30):
         # if size < min_size usd then don't trade
         # Update orders based on signals
-        atr_value = self.get_atr_value(atr_df, symbol)
-        if atr_value:
-            size = (1 / self.portfolio_size) * self.total_capital * (self.risk_target / atr_value)
-            if size < min_size:
-                size = 0
-        else:
-            size = 0
-        return size
+        atr_value = self.get_atr_value(symbol)
+        if atr_value is None:
+            return 0
+        return atr_position_size(
+            atr_value, self.total_capital, self.portfolio_size, self.risk_target, min_size
+        )
         
     def check_stop_conditions(self):
         if self.current_loss >= self.max_loss:
-            self.logger.info(f"Stopping trading system due to reaching max loss limit: {self.current_loss}")
+            self.logger.info("Stopping trading system due to reaching max loss limit: %s", self.current_loss)
             return True
         if self.stop_signal_received:
             self.logger.info("Stopping trading system due to received stop signal.")
@@ -103,24 +320,96 @@ class TradingSystem:
         return False
     
     # Function to get the ATR value for a specific symbol
-    def get_atr_value(self, atr_df, symbol):
-        if symbol in atr_df.index:
-            return atr_df.loc[symbol]['atr']
-        else:
-            return None
+    def get_atr_value(self, symbol):
+        atr = self.signal_engine.latest.get(symbol, "atr")
+        return None if math.isnan(atr) else atr
 
 if __name__ == "__main__":
-    broker = CoinbaseBroker(API_KEY, API_SECRET)
+    try:
+        from config.dontshare_settings import API_KEY, API_SECRET, DATA_DIR
+    except ImportError:
+        raise SystemExit("config/dontshare_settings.py with API_KEY, API_SECRET and DATA_DIR is required to trade")
+
+    candle_store = CandleStore(retention=CANDLE_RETENTION_BARS)
+    # Every batch of closed bars the feed stores triggers a trading cycle
+    bar_events = BarQueue(timeframe=SIGNAL_TIMEFRAME)
+    on_candles = bar_events.publish
+    signal_store = candle_store
+    resampler = None
+    if SIGNAL_TIMEFRAME != "5m":
+        # signals on higher timeframe bars folded from the 5m feed, a cycle per closed bar
+        resampler = TimeframeResampler(
+            base="5m", timeframes=(SIGNAL_TIMEFRAME,), retention=CANDLE_RETENTION_BARS
+        )
+        signal_store = resampler.store(SIGNAL_TIMEFRAME)
+        on_candles = lambda data: bar_events.publish(resampler.append(data)[SIGNAL_TIMEFRAME])
+    # In streaming mode the websocket keeps the order book and builds candles
+    stream = None
+    if MARKET_DATA_MODE == "stream":
+        stream = StreamingMarketData(timeframe="5m", candle_store=candle_store, on_candles=on_candles)
+    broker = AsyncCoinbaseBroker(API_KEY, API_SECRET, market_data=stream)
     order_manager = OrderManager(broker)
-    market_data_feed = MarketDataFeed(API_KEY, API_SECRET, DATA_DIR)
+    market_data_feed = MarketDataFeed(
+        API_KEY, API_SECRET, DATA_DIR, candle_store=candle_store, storage=STORAGE_BACKEND,
+        on_candles=on_candles,
+    )
+
+    execution_scheduler = ExecutionScheduler(broker)
+    # Partial and late fills of orders with an exchange id, two account-wide calls per poll.
+    # Orders worked by the scheduler report their fills through on_execution_update instead
+    reconciler = OrderReconciler(order_manager, broker, interval=RECONCILE_INTERVAL)
 
     symbols = ["BTC/USD", "ETH/USD"]
     trading_system = TradingSystem(
-        broker, order_manager, market_data_feed, symbols, interval=5
+        broker, order_manager, market_data_feed, symbols, interval=5, candle_store=signal_store,
+        execution_scheduler=execution_scheduler, bar_events=bar_events, resampler=resampler,
     )
+    market_data_feed.on_gap = trading_system.on_data_gap
         
-    loop = asyncio.get_event_loop()
-    try:
-        loop.run_until_complete(trading_system.start())
-    finally:
-        loop.close()
+    # Warm restart: positions, open orders, candles and indicator state from the last cycle
+    if STATE_FILE:
+        trading_system.restore_state(STATE_FILE)
+
+    # Opt-in sampling profiler, collapsed stacks are written on exit
+    profiler = SamplingProfiler().start() if PROFILE_FILE else None
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, trading_system.handle_stop_signal, sig, None)
+
+        if len(order_manager):
+            # restored orders may have filled or closed while the system was down, and
+            # no task works those the scheduler had on the exchange any more
+            try:
+                await reconciler.cancel_worked()
+                await reconciler.reconcile()
+            except Exception:
+                trading_system.logger.exception("Reconciling restored orders failed")
+        feed = stream if stream is not None else market_data_feed
+        if stream is not None:
+            # the websocket only builds bars from now on, fill the store with what was missed over REST
+            await market_data_feed.backfill(symbols)
+        feed_task = asyncio.create_task(feed.start(symbols))
+        # if the feed dies the trading loop stops too instead of waiting for bars
+        feed_task.add_done_callback(lambda task: bar_events.close())
+        scheduler_task = asyncio.create_task(execution_scheduler.run())
+        tasks = [feed_task, scheduler_task]
+        if RECONCILE_INTERVAL:
+            tasks.append(asyncio.create_task(reconciler.run()))
+        try:
+            # returns on a stop signal or when a stop condition is hit
+            await trading_system.start()
+        finally:
+            feed.stop()
+            execution_scheduler.stop()
+            reconciler.stop()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if STATE_FILE:
+                trading_system.save_state(STATE_FILE)
+            await broker.close()
+            if profiler is not None:
+                profiler.stop()
+                profiler.export(PROFILE_FILE)
+
+    asyncio.run(run())
@@ -0,0 +1,14 @@
+from .shared_candles import SharedCandleStore
+from .gateway import BrokerGateway, GatewayBroker
+from .supervisor import SharedReconciler, Supervisor, WorkerSpec, plan_workers, shard_symbols
+
+__all__ = [
+    "SharedCandleStore",
+    "BrokerGateway",
+    "GatewayBroker",
+    "SharedReconciler",
+    "Supervisor",
+    "WorkerSpec",
+    "plan_workers",
+    "shard_symbols",
+]
@@ -0,0 +1,62 @@
+# python -m runtime: the feed, broker gateway and health checks in this process, TradingSystems in workers
+import asyncio
+import os
+import signal
+
+import pandas as pd
+
+from broker import AsyncCoinbaseBroker
+from data.market_data_feed import MarketDataFeed
+from signals.smart_money import load_data
+from config.settings import (
+    CANDLE_RETENTION_BARS, STORAGE_BACKEND, SYMBOLS, STRATEGIES, SHARDS, WORKER_DIR, HEARTBEAT_TIMEOUT,
+    RECONCILE_INTERVAL,
+)
+try:
+    from config.dontshare_settings import API_KEY, API_SECRET, DATA_DIR
+except ImportError:
+    raise SystemExit("config/dontshare_settings.py with API_KEY, API_SECRET and DATA_DIR is required to trade")
+
+from .shared_candles import SharedCandleStore
+from .supervisor import Supervisor, plan_workers
+
+
+def main():
+    shards = SHARDS or max(1, (os.cpu_count() or 1) // len(STRATEGIES))
+    store = SharedCandleStore(SYMBOLS, retention=CANDLE_RETENTION_BARS)
+    # the feed resumes from its high-water marks, so the history comes from disk
+    start = pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(minutes=5 * CANDLE_RETENTION_BARS)
+    store.append(load_data(DATA_DIR, SYMBOLS, start=str(start), backend=STORAGE_BACKEND))
+
+    broker = AsyncCoinbaseBroker(API_KEY, API_SECRET)
+    supervisor = Supervisor(
+        plan_workers(SYMBOLS, STRATEGIES, shards), store, {"default": broker},
+        directory=WORKER_DIR, heartbeat_timeout=HEARTBEAT_TIMEOUT, reconcile_interval=RECONCILE_INTERVAL,
+    )
+    feed = MarketDataFeed(
+        API_KEY, API_SECRET, DATA_DIR, candle_store=store, storage=STORAGE_BACKEND,
+        on_candles=supervisor.publish,
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, supervisor.stop, sig, None)
+        feed_task = asyncio.create_task(feed.start(SYMBOLS))
+        feed_task.add_done_callback(lambda task: supervisor.stop())
+        try:
+            await supervisor.run()
+        finally:
+            feed.stop()
+            await asyncio.gather(feed_task, return_exceptions=True)
+            await broker.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        store.close()
+        store.unlink()
+
+
+if __name__ == "__main__":
+    main()
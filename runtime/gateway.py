@@ -0,0 +1,106 @@
+import asyncio
+import itertools
+
+from broker.base import AsyncBroker
+from utils.metrics import metrics
+
+# Calls a worker may make, and those answered once for every worker asking
+# at the same time (same arguments) instead of once per worker.
+CALLS = frozenset((
+    "get_account_balance", "get_orderbook_data", "place_order", "cancel_order", "get_order_status",
+    "fetch_open_orders", "fetch_my_trades",
+))
+SHARED_CALLS = frozenset(("get_account_balance", "get_orderbook_data", "fetch_open_orders", "fetch_my_trades"))
+
+
+class BrokerGateway:
+    """
+    One account's AsyncBroker, shared by every worker process trading it:
+    one client, connection pool and concurrency limit per account however
+    many workers there are, and concurrent identical reads (order book,
+    balance, open orders, trades) go to the exchange once.
+
+    :param max_concurrency: broker calls in flight at once
+    """
+
+    def __init__(self, broker, max_concurrency=8):
+        self.broker = broker
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = {}  # (method, args) of shared calls -> task
+
+    async def _call(self, method, args):
+        async with self.semaphore:
+            return await getattr(self.broker, method)(*args)
+
+    async def call(self, method, args):
+        """A worker's broker call, raises what the broker raises."""
+        if method not in CALLS:
+            raise AttributeError(f"Broker call not allowed: {method}")
+        metrics.count(f"gateway.{method}")
+        if method not in SHARED_CALLS:
+            return await self._call(method, args)
+        key = (method, args)
+        task = self.in_flight.get(key)
+        if task is None:
+            task = self.in_flight[key] = asyncio.ensure_future(self._call(method, args))
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            metrics.count("gateway.coalesced")
+        return await asyncio.shield(task)
+
+
+class GatewayBroker(AsyncBroker):
+    """
+    AsyncBroker of a worker process: every call is sent as ("call", call id,
+    method, args) over the worker's connection to the supervisor, which runs
+    it on the account's BrokerGateway. The replies are handed to resolve()
+    on the event loop by the worker's reader.
+
+    :param timeout: seconds before a call without a reply raises TimeoutError
+    """
+
+    def __init__(self, connection, timeout=30.0):
+        super().__init__(None, None)
+        self.connection = connection
+        self.timeout = timeout
+        self.call_ids = itertools.count(1)
+        self.pending = {}
+
+    async def _call(self, method, *args):
+        call_id = next(self.call_ids)
+        future = self.pending[call_id] = asyncio.get_running_loop().create_future()
+        self.connection.send(("call", call_id, method, args))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self.pending.pop(call_id, None)
+
+    def resolve(self, call_id, result, exception):
+        future = self.pending.get(call_id)
+        if future is None or future.done():  # timed out meanwhile
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    async def get_account_balance(self):
+        return await self._call("get_account_balance")
+
+    async def get_orderbook_data(self, symbol):
+        return await self._call("get_orderbook_data", symbol)
+
+    async def place_order(self, symbol, order_type, amount, side, price=None):
+        return await self._call("place_order", symbol, order_type, amount, side, price)
+
+    async def cancel_order(self, order_id):
+        return await self._call("cancel_order", order_id)
+
+    async def get_order_status(self, order_id):
+        return await self._call("get_order_status", order_id)
+
+    async def fetch_open_orders(self, symbol=None):
+        return await self._call("fetch_open_orders", symbol)
+
+    async def fetch_my_trades(self, symbol=None, since=None, limit=None):
+        return await self._call("fetch_my_trades", symbol, since, limit)
@@ -0,0 +1,172 @@
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from data.candle_store import COLUMNS, FIELDS
+
+
+class SharedCandleStore:
+    """
+    CandleStore in one shared memory block, written by the process running
+    the market data feed and read by every worker process, so the candles
+    are fetched and stored once however many workers trade them.
+
+    Each symbol has a ring of the last `retention` bars; the symbol list is
+    fixed when the block is created. There is a single writer: readers
+    check a sequence number around their copy and retry if an append ran
+    meanwhile. Pickling the store (e.g. as a Process argument) attaches the
+    other process to the same block instead of copying it.
+
+    :param symbols: symbols the block has room for, candles of others are ignored
+    :param name: attach to an existing block instead of creating one
+    """
+
+    def __init__(self, symbols, retention=2016, name=None):
+        self.symbol_list = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbol_list)}
+        self.retention = retention
+        n = len(self.symbol_list)
+        # sequence number, bars ever appended per symbol, then the rings
+        size = 8 * (1 + n + n * retention * (1 + len(FIELDS)))
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        buffer = self.shm.buf
+        self.sequence = np.ndarray(1, np.int64, buffer, 0)
+        self.counts = np.ndarray(n, np.int64, buffer, 8)
+        self.timestamps = np.ndarray((n, retention), np.int64, buffer, 8 * (1 + n))
+        self.values = np.ndarray(
+            (n, retention, len(FIELDS)), np.float64, buffer, 8 * (1 + n + n * retention)
+        )
+        if self.owner:
+            self.sequence[0] = 0
+            self.counts[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __reduce__(self):
+        return SharedCandleStore, (self.symbol_list, self.retention, self.name)
+
+    def symbols(self):
+        return [symbol for symbol in self.symbol_list if self.counts[self.index[symbol]]]
+
+    def append(self, data):
+        """
+        Append a DataFrame of candles (the load_data/fetch_ohlcv layout).
+        Only the process that runs the feed may call it.
+
+        :return: number of new bars stored
+        """
+        if data.empty:
+            return 0
+        data = data.assign(timestamp=pd.to_datetime(data["timestamp"]))
+        stored = 0
+        for symbol, frame in data.groupby("symbol", sort=False):
+            if symbol not in self.index:
+                continue
+            frame = frame.sort_values("timestamp", kind="stable")
+            frame = frame.drop_duplicates("timestamp", keep="last")
+            stored += self.append_arrays(
+                symbol,
+                frame["timestamp"].to_numpy(dtype="datetime64[ns]"),
+                frame[list(FIELDS)].to_numpy(dtype=np.float64),
+            )
+        return stored
+
+    def append_arrays(self, symbol, timestamps, values):
+        """
+        Append one symbol's candles already in array form, sorted by time.
+
+        :param timestamps: datetime64[ns] (or int64 ns) open times
+        :param values: (n, 5) float64 OHLCV
+        :return: number of new bars stored
+        """
+        i = self.index.get(symbol)
+        if i is None:
+            return 0
+        timestamps = np.asarray(timestamps).astype("datetime64[ns]").view(np.int64)
+        count = int(self.counts[i])
+        if count:
+            newer = timestamps > self.timestamps[i, (count - 1) % self.retention]
+            timestamps, values = timestamps[newer], values[newer]
+        n = len(timestamps)
+        if n == 0:
+            return 0
+        keep = min(n, self.retention)
+        positions = np.arange(count + n - keep, count + n) % self.retention
+        self.sequence[0] += 1  # odd while the rings are being written
+        self.timestamps[i, positions] = timestamps[n - keep:]
+        self.values[i, positions] = values[n - keep:]
+        self.counts[i] = count + n
+        self.sequence[0] += 1
+        return n
+
+    def _read(self, i, since):
+        """Copy of one symbol's bars newer than `since`, oldest first."""
+        while True:
+            sequence = int(self.sequence[0])
+            if sequence % 2 == 0:
+                count = int(self.counts[i])
+                positions = np.arange(count - min(count, self.retention), count) % self.retention
+                timestamps = self.timestamps[i, positions]
+                if since is not None:
+                    start = np.searchsorted(timestamps, pd.Timestamp(since).value, side="right")
+                    timestamps, positions = timestamps[start:], positions[start:]
+                values = self.values[i, positions]
+                if int(self.sequence[0]) == sequence:
+                    return timestamps, values
+            time.sleep(0)
+
+    def last_timestamp(self, symbol):
+        i = self.index.get(symbol)
+        if i is None or not self.counts[i]:
+            return None
+        timestamps, _ = self._read(i, None)
+        return pd.Timestamp(timestamps[-1])
+
+    def get(self, symbol, since=None):
+        """Candles of one symbol newer than `since` (all retained bars by default)."""
+        i = self.index.get(symbol)
+        if i is None:
+            return pd.DataFrame(columns=COLUMNS)
+        timestamps, values = self._read(i, since)
+        frame = pd.DataFrame(values, columns=list(FIELDS))
+        frame.insert(0, "timestamp", timestamps.view("datetime64[ns]"))
+        frame["symbol"] = symbol
+        return frame
+
+    def to_frame(self, symbols=None, since=None):
+        """
+        Candles of several symbols in one frame, like CandleStore.to_frame.
+
+        :param since: a timestamp, or a dict of symbol -> timestamp
+        """
+        symbols = self.symbols() if symbols is None else symbols
+        frames = []
+        for symbol in symbols:
+            symbol_since = since.get(symbol) if isinstance(since, dict) else since
+            frame = self.get(symbol, symbol_since)
+            if not frame.empty:
+                frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def get_state(self):
+        # the candles belong to the feed's process, a worker snapshot does not carry them
+        return None
+
+    def set_state(self, state):
+        pass
+
+    def close(self):
+        """Detach this process; the arrays must not be used afterwards."""
+        self.sequence = self.counts = self.timestamps = self.values = None
+        self.shm.close()
+
+    def unlink(self):
+        """Free the block once every process has closed it, only the creator should call it."""
+        self.shm.unlink()
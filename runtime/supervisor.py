@@ -0,0 +1,397 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from data.bar_events import BarQueue
+from data.ingestion import TIMEFRAME_MS
+from execution.reconcile import OrderReconciler
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+from .gateway import BrokerGateway, GatewayBroker
+
+# One process per (strategy, shard of symbols). The process running the
+# supervisor owns the market data feed, the SharedCandleStore it writes to
+# and one BrokerGateway and SharedReconciler per account; workers only
+# compute signals and send orders, so adding symbols or strategies adds
+# processes, not API calls.
+
+
+class WorkerSpec:
+    """A TradingSystem over `symbols` with the strategy's parameters, trading on `account`."""
+
+    __slots__ = ("name", "symbols", "account", "params")
+
+    def __init__(self, name, symbols, account="default", params=None):
+        self.name = name
+        self.symbols = list(symbols)
+        self.account = account
+        self.params = params or {}  # TradingSystem kwargs, e.g. risk_target, portfolio_size
+
+    def __repr__(self):
+        return f"WorkerSpec({self.name}, {len(self.symbols)} symbols, {self.account})"
+
+
+def shard_symbols(symbols, shards):
+    """
+    Deal the sorted symbols round-robin into at most `shards` lists of equal
+    size (give or take one). Adding or removing symbols moves others to a
+    different shard, whose worker starts them without their orders and
+    positions: clear the workers' snapshots when changing the symbol list.
+    """
+    symbols = sorted(symbols)
+    return [symbols[i::shards] for i in range(min(shards, len(symbols)))]
+
+
+def plan_workers(symbols, strategies, shards):
+    """
+    :param strategies: name -> TradingSystem kwargs, plus an optional "account"
+    :param shards: worker processes per strategy
+    :return: a WorkerSpec for every strategy and shard
+    """
+    specs = []
+    for strategy, params in strategies.items():
+        params = dict(params)
+        account = params.pop("account", "default")
+        for i, shard in enumerate(shard_symbols(symbols, shards)):
+            specs.append(WorkerSpec(f"{strategy}-{i}", shard, account, params))
+    return specs
+
+
+class SharedReconciler(OrderReconciler):
+    """
+    Polls the open orders and trades of an account for all the workers
+    trading it, two calls per interval however many workers there are.
+    Each poll goes to `publish` and every worker applies it to its own book
+    (OrderReconciler.apply), looking up only its own missing orders.
+    """
+
+    def __init__(self, broker, publish, **kwargs):
+        super().__init__(None, broker, **kwargs)
+        self.publish = publish
+
+    async def reconcile(self):
+        self.publish(*await self.poll())
+        return 0
+
+
+def _read_connection(connection, loop, broker, bar_events, stop, polls=None):
+    """Worker thread: replies, bar events and order polls from the supervisor, handed to the event loop."""
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):  # the supervisor is gone
+            message = ("stop",)
+        if message[0] == "reply":
+            loop.call_soon_threadsafe(broker.resolve, *message[1:])
+        elif message[0] == "bars":
+            loop.call_soon_threadsafe(bar_events.notify, *message[1:])
+        elif message[0] == "orders" and polls is not None:
+            loop.call_soon_threadsafe(polls.put_nowait, message[1:])
+        elif message[0] == "stop":
+            loop.call_soon_threadsafe(stop)
+            return
+
+
+async def _heartbeat(heartbeat, interval):
+    while True:
+        heartbeat.value = time.time()
+        await asyncio.sleep(interval)
+
+
+async def _apply_polls(reconciler, polls, logger):
+    while True:
+        poll = await polls.get()
+        try:
+            await reconciler.apply(*poll)
+        except Exception:
+            logger.exception("Applying the account's orders and trades failed")
+
+
+async def _run_worker(spec, store, connection, heartbeat, directory, heartbeat_interval):
+    # imported here, the supervisor process never builds a TradingSystem
+    from execution.order_manager import OrderManager
+    from main import TradingSystem
+
+    loop = asyncio.get_running_loop()
+    broker = GatewayBroker(connection)
+    bar_events = BarQueue()
+    order_manager = OrderManager(broker)
+    path = os.path.join(directory, spec.name)
+    system = TradingSystem(
+        broker, order_manager, None, spec.symbols, candle_store=store, bar_events=bar_events,
+        log_file=f"{path}.log", metrics_file=f"{path}.metrics.json", state_file=f"{path}.snapshot",
+        **spec.params,
+    )
+    system.restore_state(system.state_file)
+
+    def stop():
+        system.handle_stop_signal("stop", None)
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, system.handle_stop_signal, sig, None)
+    # the open orders and trades of the account polled by the supervisor, the
+    # worker only applies those of its own orders
+    polls = asyncio.Queue()
+    reconciler = OrderReconciler(order_manager, broker)
+    threading.Thread(
+        target=_read_connection, args=(connection, loop, broker, bar_events, stop, polls), name="worker-reader",
+        daemon=True,
+    ).start()
+    tasks = [
+        asyncio.create_task(_heartbeat(heartbeat, heartbeat_interval)),
+        asyncio.create_task(_apply_polls(reconciler, polls, system.logger)),
+    ]
+    # catch up on the bars stored before the worker (re)started
+    bar_events.notify(spec.symbols, time.time() * 1000)
+    try:
+        await system.start()
+    finally:
+        for task in tasks:
+            task.cancel()
+        system.save_state(system.state_file)
+
+
+def run_worker(spec, store, connection, heartbeat, directory, heartbeat_interval=1.0):
+    """
+    Entry point of a worker process. Exits with 0 when its TradingSystem
+    stops (stop message, signal or a stop condition), any other exit is a
+    crash the supervisor restarts.
+    """
+    asyncio.run(_run_worker(spec, store, connection, heartbeat, directory, heartbeat_interval))
+
+
+class Worker:
+    """Supervisor's handle on one worker process, kept across its restarts."""
+
+    def __init__(self, spec, context):
+        self.spec = spec
+        self.heartbeat = context.Value("d", 0.0, lock=False)  # time.time() of the last beat
+        self.process = None
+        # a new pipe for every run: a process killed mid-message cannot leave it locked
+        self.connection = None
+        self.started_at = None
+        self.restart_at = 0.0
+        self.restarts = 0
+        self.finished = False
+
+    def send(self, message):
+        if self.connection is None:
+            return
+        try:
+            self.connection.send(message)
+        except OSError:  # died meanwhile, the health check restarts it
+            pass
+
+
+class Supervisor:
+    """
+    Runs the workers, relays bar events to the ones trading the symbols,
+    runs their broker calls on the account's BrokerGateway, sends them the
+    account's SharedReconciler polls and restarts workers that crash or
+    stall.
+
+    A worker is restarted when it exits with a non-zero code or its
+    heartbeat is older than `heartbeat_timeout` (its event loop is stuck),
+    after `restart_backoff` seconds doubling with every restart up to
+    `max_backoff`. It restores its snapshot, so it resumes with its orders,
+    positions and indicator state.
+
+    :param specs: WorkerSpec per worker process
+    :param store: SharedCandleStore the feed writes to
+    :param brokers: account -> AsyncBroker, each shared through one BrokerGateway
+    :param directory: worker logs, metrics and snapshots, <worker name>.*
+    :param reconcile_interval: seconds between polls of each account's orders and trades, 0 for none
+    """
+
+    def __init__(self, specs, store, brokers, directory="workers", timeframe="5m", heartbeat_timeout=30.0,
+                 check_interval=1.0, restart_backoff=1.0, max_backoff=60.0, reconcile_interval=5.0,
+                 start_method="spawn"):
+        self.store = store
+        self.directory = directory
+        self.timeframe_ms = TIMEFRAME_MS[timeframe]
+        self.heartbeat_timeout = heartbeat_timeout
+        self.check_interval = check_interval
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        # spawn: workers do not inherit the feed's event loop and threads
+        self.context = multiprocessing.get_context(start_method)
+        os.makedirs(directory, exist_ok=True)
+        self.logger = setup_logger("supervisor", os.path.join(directory, "supervisor.log"))
+
+        self.gateways = {account: BrokerGateway(broker) for account, broker in brokers.items()}
+        self.reconcilers = {}  # account -> SharedReconciler
+        if reconcile_interval:
+            for account, broker in brokers.items():
+                publish = functools.partial(self.publish_orders, account)
+                self.reconcilers[account] = SharedReconciler(broker, publish, interval=reconcile_interval)
+        self.workers = {spec.name: Worker(spec, self.context) for spec in specs}
+        self.routes = {}  # symbol -> workers trading it
+        for worker in self.workers.values():
+            for symbol in worker.spec.symbols:
+                self.routes.setdefault(symbol, []).append(worker)
+        self.calls = set()
+        self.stopping = False
+        self.stopped = None
+
+    def publish(self, data):
+        """on_candles hook of the feed: tell each worker which of its symbols have new bars."""
+        if data.empty:
+            return
+        close_time_ms = data["timestamp"].max().value // 1_000_000 + self.timeframe_ms
+        published_at = time.monotonic()
+        symbols = {}
+        for symbol in data["symbol"].unique():
+            for worker in self.routes.get(symbol, ()):
+                symbols.setdefault(worker.spec.name, []).append(symbol)
+        for name, worker_symbols in symbols.items():
+            self.workers[name].send(("bars", worker_symbols, close_time_ms, published_at))
+
+    def publish_orders(self, account, open_orders, trades, started):
+        """SharedReconciler hook: an account's poll to every worker trading on it."""
+        for worker in self.workers.values():
+            if worker.spec.account == account:
+                worker.send(("orders", open_orders, trades, started))
+
+    def _receive(self, worker, connection):
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):  # the worker exited, the health check deals with it
+            self._disconnect(worker)
+            return
+        if message[0] == "call":
+            task = asyncio.ensure_future(self._serve(worker, connection, *message[1:]))
+            self.calls.add(task)
+            task.add_done_callback(self.calls.discard)
+
+    async def _serve(self, worker, connection, call_id, method, args):
+        try:
+            reply = ("reply", call_id, await self.gateways[worker.spec.account].call(method, args), None)
+        except Exception as exc:
+            reply = ("reply", call_id, None, exc)
+        if worker.connection is connection:  # not a call of a previous run
+            try:
+                worker.send(reply)
+            except Exception as exc:  # e.g. an exception that does not pickle
+                worker.send(("reply", call_id, None, RuntimeError(f"{type(exc).__name__}: {exc}")))
+
+    def _disconnect(self, worker):
+        if worker.connection is not None:
+            asyncio.get_running_loop().remove_reader(worker.connection.fileno())
+            worker.connection.close()
+            worker.connection = None
+
+    def _spawn(self, worker, now):
+        """Start a run of the worker, from the event loop (its pipe is read there)."""
+        spec = worker.spec
+        worker.connection, child = self.context.Pipe()
+        worker.heartbeat.value = now  # startup counts against the timeout
+        worker.process = self.context.Process(
+            target=run_worker, name=f"worker {spec.name}", daemon=True,
+            args=(spec, self.store, child, worker.heartbeat, self.directory),
+        )
+        worker.process.start()
+        child.close()
+        asyncio.get_running_loop().add_reader(
+            worker.connection.fileno(), self._receive, worker, worker.connection
+        )
+        worker.started_at = now
+        self.logger.info("Started worker %s (pid %s): %s", spec.name, worker.process.pid, spec)
+
+    def _kill(self, process, timeout=5.0):
+        process.terminate()
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def _schedule_restart(self, worker, now, reason):
+        self._disconnect(worker)
+        if now - worker.started_at > self.max_backoff:
+            worker.restarts = 0  # it ran fine for a while, start the backoff over
+        delay = min(self.restart_backoff * 2 ** worker.restarts, self.max_backoff)
+        worker.restarts += 1
+        worker.process = None
+        worker.restart_at = now + delay
+        metrics.count("supervisor.restarts")
+        self.logger.warning("Worker %s %s, restarting in %.0fs", worker.spec.name, reason, delay)
+
+    async def check(self):
+        """
+        Health check, from the event loop: restart crashed and stalled workers
+        once their backoff is over. A stalled worker is killed in an executor,
+        the other workers' broker calls are served meanwhile.
+        """
+        now = time.time()
+        for worker in self.workers.values():
+            process = worker.process
+            if process is None:
+                if not worker.finished and not self.stopping and now >= worker.restart_at:
+                    self._spawn(worker, now)
+            elif not process.is_alive():
+                process.join()
+                if process.exitcode == 0:
+                    self.logger.info("Worker %s finished", worker.spec.name)
+                    self._disconnect(worker)
+                    worker.process = None
+                    worker.finished = True
+                else:
+                    self._schedule_restart(worker, now, f"exited with code {process.exitcode}")
+            elif now - worker.heartbeat.value > self.heartbeat_timeout:
+                await asyncio.get_running_loop().run_in_executor(None, self._kill, process)
+                self._schedule_restart(worker, now, f"stalled for {now - worker.heartbeat.value:.0f}s")
+
+    async def run(self):
+        """Run and check the workers until stop() is called or every one of them has finished."""
+        self.stopped = asyncio.Event()
+        if self.stopping:
+            self.stopped.set()
+        polls = [asyncio.create_task(reconciler.run()) for reconciler in self.reconcilers.values()]
+        try:
+            while not self.stopping:
+                await self.check()
+                if all(worker.finished for worker in self.workers.values()):
+                    break
+                try:
+                    await asyncio.wait_for(self.stopped.wait(), self.check_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.stopping = True
+            await self.shutdown_workers()
+            for reconciler in self.reconcilers.values():
+                reconciler.stop()
+            await asyncio.gather(*polls, return_exceptions=True)
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        if self.stopped is not None:
+            self.stopped.set()
+
+    async def shutdown_workers(self, timeout=30.0):
+        """
+        Ask every worker to stop and wait, killing those still running after
+        `timeout`. Their broker calls are served meanwhile, so they can finish
+        the cycle and save their state.
+        """
+        running = [worker for worker in self.workers.values() if worker.process is not None]
+        for worker in running:
+            worker.send(("stop",))
+
+        def join():
+            deadline = time.time() + timeout
+            for worker in running:
+                worker.process.join(max(0.0, deadline - time.time()))
+                if worker.process.is_alive():
+                    self.logger.warning("Worker %s did not stop, killing it", worker.spec.name)
+                    self._kill(worker.process)
+
+        await asyncio.get_running_loop().run_in_executor(None, join)
+        await asyncio.gather(*self.calls, return_exceptions=True)
+        for worker in running:
+            self._disconnect(worker)
+            worker.process = None
@@ -5,6 +5,8 @@ from .smart_money import (
     load_data,
     calculate_atr,
 )
+from .pipeline import partition_by_symbol, compute_indicators, run_pipeline
+from .incremental import IncrementalSignalEngine, LatestIndicators
 
 __all__ = [
     "identify_market_phases",
@@ -12,4 +14,9 @@ __all__ = [
     "generate_signals",
     "load_data",
     "calculate_atr",
+    "partition_by_symbol",
+    "compute_indicators",
+    "run_pipeline",
+    "IncrementalSignalEngine",
+    "LatestIndicators",
 ]
@@ -0,0 +1,319 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .smart_money import SIGNAL_COLUMNS
+
+# Streaming versions of the smart_money indicators. Each symbol keeps only
+# O(window) state and every appended candle is an O(1) (amortized) update,
+# so a cycle costs the same at 23:55 as it does at 00:05.
+
+NAN = float("nan")
+
+SNAPSHOT_COLUMNS = [
+    "timestamp", "symbol", "close", "SMA10", "SMA100", "phase", "volume_avg",
+    "volume_spike", "rolling_min", "rolling_max", "atr", "signal", "price",
+]
+
+# Fields of LatestIndicators, support/resistance are the rolling min/max of the close
+LATEST_FIELDS = ["close", "atr", "SMA10", "SMA100", "support", "resistance"]
+_LATEST_SOURCES = ["close", "atr", "SMA10", "SMA100", "rolling_min", "rolling_max"]
+
+
+class RollingMean:
+    """Ring buffer with a compensated running sum, NaN until the window is full."""
+
+    __slots__ = ("window", "min_periods", "values", "pos", "count", "total", "compensation")
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = [0.0] * window
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def _add(self, value):
+        # Kahan summation keeps the running sum close to a fresh window sum
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+    def push(self, value):
+        if self.count == self.window:
+            self._add(-self.values[self.pos])
+        else:
+            self.count += 1
+        self.values[self.pos] = value
+        self.pos = (self.pos + 1) % self.window
+        self._add(value)
+
+    @property
+    def value(self):
+        if self.count < self.min_periods:
+            return NAN
+        return self.total / self.count
+
+
+class RollingExtremum:
+    """Rolling min (or max) over a fixed window using a monotonic deque."""
+
+    __slots__ = ("window", "is_max", "candidates", "index")
+
+    def __init__(self, window, is_max=False):
+        self.window = window
+        self.is_max = is_max
+        self.candidates = deque()
+        self.index = 0
+
+    def push(self, value):
+        candidates = self.candidates
+        if self.is_max:
+            while candidates and candidates[-1][1] <= value:
+                candidates.pop()
+        else:
+            while candidates and candidates[-1][1] >= value:
+                candidates.pop()
+        candidates.append((self.index, value))
+        if candidates[0][0] <= self.index - self.window:
+            candidates.popleft()
+        self.index += 1
+
+    @property
+    def value(self):
+        if self.index < self.window:
+            return NAN
+        return self.candidates[0][1]
+
+
+class IncrementalIndicators:
+    """
+    Per-symbol indicator state matching signals.pipeline.compute_indicators
+    and extract_signals for a single symbol's candles fed in timestamp order.
+    """
+
+    def __init__(self, symbol, fast=10, slow=100, volume_window=20, threshold=2,
+                 window=20, atr_period=14):
+        self.symbol = symbol
+        self.threshold = threshold
+        self.sma_fast = RollingMean(fast)
+        self.sma_slow = RollingMean(slow)
+        self.volume_avg = RollingMean(volume_window)
+        self.rolling_min = RollingExtremum(window)
+        self.rolling_max = RollingExtremum(window, is_max=True)
+        self.atr = RollingMean(atr_period, min_periods=1)
+        self.prev_close = NAN
+        self.last_timestamp = None
+        self.latest = None
+
+    def update(self, timestamp, high, low, close, volume):
+        """Append one candle, return its indicator row (including any signal)."""
+        self.sma_fast.push(close)
+        self.sma_slow.push(close)
+        self.volume_avg.push(volume)
+        self.rolling_min.push(close)
+        self.rolling_max.push(close)
+
+        # NaN-skipping max, as DataFrame.max(axis=1) does for the first bar
+        true_range = high - low
+        if not math.isnan(self.prev_close):
+            true_range = max(
+                true_range, abs(high - self.prev_close), abs(low - self.prev_close)
+            )
+        self.atr.push(true_range)
+        self.prev_close = close
+
+        sma10 = self.sma_fast.value
+        sma100 = self.sma_slow.value
+        volume_avg = self.volume_avg.value
+        if sma10 > sma100:
+            phase = "markup"
+        elif sma10 < sma100:
+            phase = "markdown"
+        else:
+            phase = "neutral"
+        volume_spike = 1 if volume > self.threshold * volume_avg else 0
+
+        signal = None
+        price = NAN
+        if volume_spike == 1 and phase != "neutral":
+            signal = "buy" if phase == "markup" else "sell"
+            if close < sma10:
+                price = self.rolling_min.value
+            elif close > sma100:
+                price = self.rolling_max.value
+            else:
+                price = sma10
+
+        self.last_timestamp = timestamp
+        self.latest = {
+            "timestamp": timestamp,
+            "symbol": self.symbol,
+            "close": close,
+            "SMA10": sma10,
+            "SMA100": sma100,
+            "phase": phase,
+            "volume_avg": volume_avg,
+            "volume_spike": volume_spike,
+            "rolling_min": self.rolling_min.value,
+            "rolling_max": self.rolling_max.value,
+            "atr": self.atr.value,
+            "signal": signal,
+            "price": price,
+        }
+        return self.latest
+
+
+class LatestIndicators:
+    """
+    Latest LATEST_FIELDS values per symbol in one float64 array, a row per
+    symbol. Rows are rewritten once per update for the symbols that got new
+    bars, so reads are a dict lookup and an array read returning a plain
+    float (NaN for unknown symbols or invalidated rows).
+    """
+
+    COLUMN = {field: i for i, field in enumerate(LATEST_FIELDS)}
+
+    def __init__(self, capacity=16):
+        self.rows = {}
+        self.values = np.full((capacity, len(LATEST_FIELDS)), np.nan)
+        self.timestamps = [None] * capacity
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, symbol):
+        return symbol in self.rows
+
+    def _row(self, symbol):
+        row = self.rows.get(symbol)
+        if row is None:
+            row = self.rows[symbol] = len(self.rows)
+            if row == len(self.values):
+                self.values = np.vstack([self.values, np.full_like(self.values, np.nan)])
+                self.timestamps.extend([None] * row)
+        return row
+
+    def set(self, symbol, timestamp, values):
+        """:param values: one value per LATEST_FIELDS"""
+        row = self._row(symbol)
+        self.values[row] = values
+        self.timestamps[row] = timestamp
+
+    def invalidate(self, symbol):
+        """Forget a symbol's values, e.g. when its candle history is reset."""
+        row = self.rows.get(symbol)
+        if row is not None:
+            self.values[row] = np.nan
+            self.timestamps[row] = None
+
+    def get(self, symbol, field):
+        row = self.rows.get(symbol)
+        if row is None:
+            return NAN
+        return self.values.item(row, self.COLUMN[field])
+
+    def timestamp(self, symbol):
+        row = self.rows.get(symbol)
+        return None if row is None else self.timestamps[row]
+
+    def items(self, field):
+        """(symbol, value) for every symbol with a value."""
+        column = self.values[:, self.COLUMN[field]]
+        for symbol, row in self.rows.items():
+            value = column.item(row)
+            if not math.isnan(value):
+                yield symbol, value
+
+    def to_frame(self):
+        symbols = list(self.rows)
+        rows = [self.rows[symbol] for symbol in symbols]
+        frame = pd.DataFrame(self.values[rows], columns=LATEST_FIELDS, index=pd.Index(symbols, name="symbol"))
+        frame.insert(0, "timestamp", [self.timestamps[row] for row in rows])
+        return frame
+
+    def __str__(self):
+        return self.to_frame().to_string()
+
+
+class IncrementalSignalEngine:
+    """
+    Keeps one IncrementalIndicators per symbol and only processes candles
+    newer than the last one seen for that symbol.
+    """
+
+    def __init__(self, **indicator_params):
+        self.indicator_params = indicator_params
+        self.indicators = {}
+        self.latest = LatestIndicators()
+
+    def get(self, symbol):
+        if symbol not in self.indicators:
+            self.indicators[symbol] = IncrementalIndicators(symbol, **self.indicator_params)
+        return self.indicators[symbol]
+
+    def last_timestamps(self):
+        return {symbol: state.last_timestamp for symbol, state in self.indicators.items()}
+
+    def new_bars(self, data):
+        """Rows of data that have not been fed to the engine yet, per symbol in time order."""
+        frames = []
+        for symbol, frame in data.groupby("symbol", sort=True):
+            last_timestamp = self.get(symbol).last_timestamp
+            if last_timestamp is not None:
+                frame = frame[frame["timestamp"] > last_timestamp]
+            if not frame.empty:
+                frames.append(frame.sort_values("timestamp", kind="stable"))
+        if not frames:
+            return data.iloc[:0]
+        return pd.concat(frames)
+
+    def update(self, data):
+        """
+        Feed the unseen candles of data and return the signals fired on them.
+
+        :param data: DataFrame with timestamp, symbol, high, low, close, volume
+        :return: signals DataFrame with the same columns as generate_signals
+        """
+        signals = []
+        updated = {}
+        bars = self.new_bars(data)
+        columns = ["symbol", "timestamp", "high", "low", "close", "volume"]
+        for symbol, timestamp, high, low, close, volume in bars[columns].itertuples(
+            index=False, name=None
+        ):
+            row = updated[symbol] = self.get(symbol).update(timestamp, high, low, close, volume)
+            if row["signal"] is not None:
+                signals.append((timestamp, symbol, row["signal"], row["price"]))
+        # one table write per symbol with new bars, not per bar
+        for symbol, row in updated.items():
+            self.latest.set(symbol, row["timestamp"], [row[source] for source in _LATEST_SOURCES])
+        return pd.DataFrame(signals, columns=SIGNAL_COLUMNS)
+
+    def get_state(self):
+        return {"indicators": self.indicators, "latest": self.latest}
+
+    def set_state(self, state):
+        self.indicators = state["indicators"]
+        self.latest = state["latest"]
+
+    def reset(self, symbol, resume_after=None):
+        """
+        Drop a symbol's indicator state, its next candles start from scratch.
+
+        :param resume_after: candles up to this timestamp are not fed again,
+            e.g. the end of a gap in the symbol's history
+        """
+        self.indicators.pop(symbol, None)
+        self.latest.invalidate(symbol)
+        if resume_after is not None:
+            self.get(symbol).last_timestamp = resume_after
+
+    def snapshot(self):
+        """Latest indicator row per symbol, indexed by symbol."""
+        rows = [state.latest for state in self.indicators.values() if state.latest]
+        return pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS).set_index("symbol")
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from .smart_money import (
+    SIGNAL_COLUMNS,
+    identify_market_phases,
+    detect_volume_spikes,
+    calculate_atr,
+    extract_signals,
+)
+
+# Indicators are computed per symbol so rolling windows and shift(1) never
+# cross from one symbol's candles into another's.
+
+
+def partition_by_symbol(data):
+    partitions = []
+    for _, frame in data.groupby("symbol", sort=True):
+        frame = frame.sort_values("timestamp", kind="stable")
+        partitions.append(frame.reset_index(drop=True))
+    return partitions
+
+
+def compute_indicators(data, window=20):
+    data = identify_market_phases(data)
+    data = detect_volume_spikes(data)
+    data["rolling_min"] = data["close"].rolling(window=window).min()
+    data["rolling_max"] = data["close"].rolling(window=window).max()
+    data, _ = calculate_atr(data)
+    return data
+
+
+def _compute_partition(data):
+    indicators = compute_indicators(data)
+    return indicators, extract_signals(indicators)
+
+
+def run_pipeline(data, max_workers=None, executor="thread"):
+    """
+    Partition the multi-symbol frame by symbol and compute indicators and
+    signals for every partition on a pool.
+
+    :param data: DataFrame as returned by load_data
+    :param max_workers: pool size, defaults to the number of cores
+    :param executor: "thread", "process" or None to run in the calling thread
+    :return: (indicators, signals) DataFrames, ordered by symbol then timestamp
+    """
+    if data.empty:
+        return data.copy(), pd.DataFrame([], columns=SIGNAL_COLUMNS)
+
+    partitions = partition_by_symbol(data)
+
+    if executor is None or len(partitions) == 1:
+        results = [_compute_partition(partition) for partition in partitions]
+    else:
+        max_workers = max_workers or os.cpu_count() or 1
+        if executor == "process":
+            pool = ProcessPoolExecutor(max_workers=max_workers)
+            chunksize = max(len(partitions) // (4 * max_workers), 1)
+        elif executor == "thread":
+            pool = ThreadPoolExecutor(max_workers=max_workers)
+            chunksize = 1
+        else:
+            raise ValueError(f"Unknown executor: {executor}")
+        with pool:
+            results = list(pool.map(_compute_partition, partitions, chunksize=chunksize))
+
+    indicators = pd.concat([result[0] for result in results], ignore_index=True)
+    signals = [result[1] for result in results if not result[1].empty]
+    if signals:
+        signals = pd.concat(signals, ignore_index=True)
+    else:
+        signals = pd.DataFrame([], columns=SIGNAL_COLUMNS)
+
+    return indicators, signals
@@ -1,11 +1,16 @@
 import pandas as pd
 import numpy as np
-from filelock import FileLock
 from datetime import datetime, timezone
+from data.storage import get_storage
+from data.resample import resample_ohlcv
 
 # Market data 5 min candles, then I try SMA10 (50 min), SMA100 (500min)
+# Other horizons: the same functions on resampled candles, load_data(timeframe="1h")
+# or TimeframeResampler for the live loop
 # TO-DO: Add cache to optimize memory usage; Handle exceptions when market data unavailble 
 
+SIGNAL_COLUMNS = ["timestamp", "symbol", "signal", "price"]
+
 
 def get_csv_path(data_dir):
     # get ohlcv data
@@ -13,17 +18,29 @@ def get_csv_path(data_dir):
     return f"{data_dir}/ohlcv_{date_str}.csv"
 
 
-def load_data(data_dir):
-    file_path = get_csv_path(data_dir)
-    lock = FileLock(file_path + ".lock")
-    with lock:
-        data = pd.read_csv(file_path)
+def load_data(data_dir, symbols=None, start=None, end=None, backend="csv", timeframe=None,
+              closed_only=False):
+    """
+    Load ohlcv candles from the storage backend.
+
+    :param symbols: symbols to load, all stored symbols by default
+    :param start: first timestamp (UTC), defaults to the start of today
+    :param end: last timestamp (UTC), defaults to now
+    :param backend: "csv" (daily files) or "npy" (columnar partitions)
+    :param timeframe: resample the stored candles to this timeframe, e.g. "1h"
+    :param closed_only: with timeframe, leave out the buckets still forming
+    """
+    storage = get_storage(backend, data_dir)
+    data = storage.load(symbols=symbols, start=start, end=end)
+    if timeframe is not None:
+        data = resample_ohlcv(data, timeframe, closed_only=closed_only)
     return data
 
 
-def identify_market_phases(data):
-    data["SMA10"] = data["close"].rolling(window=10).mean()
-    data["SMA100"] = data["close"].rolling(window=100).mean()
+def identify_market_phases(data, fast=10, slow=100):
+    # columns keep their names whatever the windows, later steps read them by name
+    data["SMA10"] = data["close"].rolling(window=fast).mean()
+    data["SMA100"] = data["close"].rolling(window=slow).mean()
 
     conditions = [
         (data["SMA10"] > data["SMA100"]),  # Uptrend (Markup)
@@ -35,8 +52,8 @@ def identify_market_phases(data):
     return data
 
 
-def detect_volume_spikes(data, threshold=2):
-    data["volume_avg"] = data["volume"].rolling(window=20).mean()
+def detect_volume_spikes(data, threshold=2, window=20):
+    data["volume_avg"] = data["volume"].rolling(window=window).mean()
     data["volume_spike"] = np.where(
         data["volume"] > threshold * data["volume_avg"], 1, 0
     )
@@ -66,22 +83,55 @@ def determine_limit_price(data):
     return limit_price
 
 
+def determine_limit_prices(data, window=20):
+    """
+    Vectorized determine_limit_price: the limit price for every row, as if
+    determine_limit_price had been called on each prefix data[: i + 1].
+    """
+    support = data["close"].rolling(window=window).min()
+    resistance = data["close"].rolling(window=window).max()
+
+    conditions = [
+        (data["close"] < data["SMA10"]),  # Buy at support level if below SMA10
+        (data["close"] > data["SMA100"]),  # Sell at resistance level if above SMA100
+    ]
+    choices = [support, resistance]
+    limit_prices = np.select(conditions, choices, default=data["SMA10"])
+
+    return pd.Series(limit_prices, index=data.index)
+
+
+def extract_signals(data):
+    """
+    Buy/sell rows of a frame that already carries the SMA10, SMA100, phase
+    and volume_spike columns.
+    """
+    spike = data["volume_spike"] == 1
+    buy = (data["phase"] == "markup") & spike
+    sell = (data["phase"] == "markdown") & spike
+    mask = buy | sell
+
+    if not mask.any():
+        return pd.DataFrame([], columns=SIGNAL_COLUMNS)
+
+    limit_prices = determine_limit_prices(data)
+    signals_df = pd.DataFrame(
+        {
+            "timestamp": data.loc[mask, "timestamp"].to_numpy(),
+            "symbol": data.loc[mask, "symbol"].to_numpy(),
+            "signal": np.where(buy[mask], "buy", "sell").astype(object),
+            "price": limit_prices[mask].to_numpy(dtype=float),
+        }
+    )
+    return signals_df
+
+
 def generate_signals(data):
     data = identify_market_phases(data)
     data = detect_volume_spikes(data)
     data = data.reset_index()  # make sure indexes pair with number of rows
-    
-    signals = []
-
-    for i, row in data.iterrows():
-        if row["phase"] == "markup" and row["volume_spike"] == 1:
-            limit_price = determine_limit_price(data[: i + 1])
-            signals.append((row["timestamp"], row["symbol"], "buy", limit_price))
-        elif data["phase"].iloc[i] == "markdown" and data["volume_spike"].iloc[i] == 1:
-            limit_price = determine_limit_price(data[: i + 1])
-            signals.append((row["timestamp"], row["symbol"], "sell", limit_price))
-
-    signals_df = pd.DataFrame(signals, columns=["timestamp", "symbol", "signal", "price"])
+
+    signals_df = extract_signals(data)
 
     return data, signals_df
 
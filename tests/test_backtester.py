@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from backtest import Backtester
+from backtest.backtester import BacktestResult, MarketArrays, compute_indicators
+from benchmarks.common import synthetic_ohlcv
+from execution.sizing import atr_position_size
+from signals.pipeline import run_pipeline
+
+SYMBOLS = ("BTC/USD", "ETH/USD", "SOL/USD")
+
+
+def _data(n_rows=3000, seed=4):
+    data = synthetic_ohlcv(n_rows, symbols=SYMBOLS, seed=seed)
+    return data.sample(frac=1, random_state=1).reset_index(drop=True)
+
+
+def test_signals_match_pipeline():
+    data = _data()
+    indicators, expected = run_pipeline(data, executor=None)
+
+    arrays = MarketArrays(data)
+    result = compute_indicators(arrays)
+    mask = result["signal"] != 0
+
+    assert len(expected) > 0
+    np.testing.assert_array_equal(arrays.timestamps[mask], expected["timestamp"].to_numpy())
+    np.testing.assert_array_equal(arrays.symbols[mask], expected["symbol"].to_numpy())
+    np.testing.assert_array_equal(
+        np.where(result["signal"][mask] > 0, "buy", "sell"), expected["signal"].to_numpy()
+    )
+    np.testing.assert_allclose(result["limit_price"][mask], expected["price"], rtol=1e-9)
+    np.testing.assert_allclose(result["atr"], indicators["atr"], rtol=1e-9)
+
+
+def test_sizing_matches_trading_system():
+    atr = np.array([np.nan, 0.0, 0.001, 0.5, 2.0])
+    sizes = atr_position_size(atr, 3000, 10, 0.25)
+
+    for value, size in zip(atr, sizes):
+        expected = 0 if not value or np.isnan(value) else (1 / 10) * 3000 * (0.25 / value)
+        assert size == (expected if expected >= 30 else 0)
+        assert atr_position_size(float(value), 3000, 10, 0.25) == size
+
+
+def test_fills_and_pnl_accounting():
+    data = _data()
+    result = Backtester(fee_rate=0.001, slippage=0.0).run(data)
+    trades = result.trades
+
+    assert result.summary["trades"] == len(trades) > 0
+    # long only: the running position never goes negative
+    signed = np.where(trades["side"] == "buy", trades["quantity"], -trades["quantity"])
+    held = pd.Series(signed).groupby(trades["symbol"].to_numpy()).cumsum()
+    assert (held > -1e-9).all()
+
+    # fills at the open of the bar they execute on
+    opens = data.set_index(["symbol", "timestamp"])["open"]
+    np.testing.assert_allclose(
+        trades["price"], opens.loc[list(zip(trades["symbol"], trades["timestamp"]))].to_numpy()
+    )
+
+    # PnL = cash flows + what is still held marked at the last close
+    last_close = data.sort_values("timestamp").groupby("symbol")["close"].last()
+    cash = (-signed * trades["price"] - trades["fee"]).groupby(trades["symbol"]).sum()
+    final = held.groupby(trades["symbol"].to_numpy()).last()
+    pnl = (cash + final * last_close.loc[final.index]).sum()
+    assert np.isclose(result.summary["pnl"], pnl)
+    assert np.isclose(result.equity.iloc[-1], pnl)
+    assert np.isclose(result.summary["fees"], trades["fee"].sum())
+
+
+def test_no_lookahead():
+    data = _data()
+    cutoff = data["timestamp"].sort_values().iloc[len(data) // 2]
+    full = Backtester().run(data).trades
+    # rewrite the future: trades executed up to the cutoff must not change
+    future = data["timestamp"] > cutoff
+    changed = data.copy()
+    changed.loc[future, ["open", "high", "low", "close"]] *= 1.5
+    changed.loc[future, "volume"] *= 3
+    partial = Backtester().run(changed).trades
+
+    before = full[full["timestamp"] <= cutoff].reset_index(drop=True)
+    pd.testing.assert_frame_equal(partial[partial["timestamp"] <= cutoff].reset_index(drop=True), before)
+
+
+def test_short_history():
+    data = synthetic_ohlcv(30, symbols=SYMBOLS)
+    result = Backtester().run(data)
+
+    assert result.trades.empty
+    assert result.summary["pnl"] == 0
+    assert result.summary["bars"] == len(data)
+
+
+def test_empty_history():
+    data = synthetic_ohlcv(30, symbols=SYMBOLS)
+    for empty in (data.iloc[:0], MarketArrays(data).between(start="2030-01-01")):
+        result = Backtester().run(empty)
+
+        assert result.trades.empty and list(result.trades.columns) == list(BacktestResult.TRADE_COLUMNS)
+        assert result.equity.empty
+        assert result.summary["bars"] == 0 and result.summary["pnl"] == 0
@@ -0,0 +1,157 @@
+import asyncio
+import time
+
+import ccxt.async_support as ccxt
+import pandas as pd
+
+from benchmarks.fakes import FakeExchange
+from data.bar_events import BarQueue
+from data.candle_store import CandleStore
+from data.market_data_feed import MarketDataFeed
+from utils.metrics import metrics
+
+FIVE_MIN = 5 * 60_000
+
+
+def _bars(symbol, timestamp):
+    return pd.DataFrame({"timestamp": [pd.Timestamp(timestamp)], "symbol": [symbol], "close": [1.0]})
+
+
+def test_pending_events_are_merged():
+    async def run():
+        queue = BarQueue(timeframe="5m")
+        queue.publish(_bars("BTC/USD", "2024-06-25 00:00"))
+        first_published = queue.pending.published_at
+        queue.publish(_bars("ETH/USD", "2024-06-25 00:05"))
+        queue.publish(_bars("BTC/USD", "2024-06-25 00:05").iloc[:0])
+
+        event = await queue.get()
+        assert event.symbols == {"BTC/USD", "ETH/USD"}
+        assert event.published_at == first_published
+        assert event.close_time_ms == pd.Timestamp("2024-06-25 00:10").value // 1_000_000
+        assert event.latency(event.close_time_ms + 1500) == 1.5
+        assert queue.pending is None
+
+    asyncio.run(run())
+
+
+def test_notify_relays_events_from_another_process():
+    async def run():
+        queue = BarQueue(timeframe="5m")
+        queue.notify(["BTC/USD"], 1000, published_at=5.0)
+        queue.notify(["ETH/USD"], 2000)
+        event = await queue.get()
+        assert event.symbols == {"BTC/USD", "ETH/USD"}
+        assert (event.close_time_ms, event.published_at) == (2000, 5.0)
+
+    asyncio.run(run())
+
+
+def test_consumer_wakes_on_publish_and_close():
+    async def run():
+        queue = BarQueue(timeframe="5m")
+        consumer = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        assert not consumer.done()
+        queue.publish(_bars("BTC/USD", "2024-06-25"))
+        assert (await consumer).symbols == {"BTC/USD"}
+
+        consumer = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        queue.close()
+        assert await consumer is None
+        queue.publish(_bars("BTC/USD", "2024-06-25"))
+        assert await queue.get() is None
+
+    asyncio.run(run())
+
+
+def test_feed_publishes_stored_bars_and_stops_promptly(tmp_path, monkeypatch):
+    day = pd.Timestamp("2024-06-25").value // 1_000_000
+    now = day + 10 * FIVE_MIN + 1000
+    monkeypatch.setattr("data.market_data_feed.now_ms", lambda: now)
+    exchange = FakeExchange(now)
+
+    async def run():
+        queue = BarQueue(timeframe="5m")
+        feed = MarketDataFeed(
+            "key", "secret", str(tmp_path), candle_store=CandleStore(), storage="npy",
+            exchange_factory=lambda: exchange, rate_limit=1000, on_candles=queue.publish,
+        )
+        for symbol in ("BTC/USD", "ETH/USD"):
+            feed.high_water_marks.update(symbol, day - FIVE_MIN)
+        assert 0 < feed.seconds_to_next_poll() <= 5 * 60 + feed.poll_delay
+        task = asyncio.create_task(feed.start(["BTC/USD", "ETH/USD"]))
+        event = await asyncio.wait_for(queue.get(), 5)
+        assert event.symbols == {"BTC/USD", "ETH/USD"}
+        assert event.close_time_ms == day + 10 * FIVE_MIN
+        assert len(feed.candle_store.get("BTC/USD")) == 10
+
+        began = time.monotonic()
+        feed.stop()
+        await asyncio.wait_for(task, 5)
+        assert time.monotonic() - began < 1
+        assert exchange.closed
+
+    asyncio.run(run())
+
+
+class FailingExchange(FakeExchange):
+    """Answers the first `failures` candle requests with an error ExchangeSession does not retry."""
+
+    def __init__(self, now_ms, failures=1):
+        super().__init__(now_ms)
+        self.failures = failures
+
+    async def fetch_ohlcv(self, symbol, timeframe="5m", since=None, limit=None):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ccxt.ExchangeError("503 Service Unavailable")
+        return await super().fetch_ohlcv(symbol, timeframe, since, limit)
+
+
+def test_feed_keeps_polling_after_a_failed_poll(tmp_path, monkeypatch):
+    day = pd.Timestamp("2024-06-25").value // 1_000_000
+    now = day + 10 * FIVE_MIN + 1000
+    monkeypatch.setattr("data.market_data_feed.now_ms", lambda: now)
+    exchange = FailingExchange(now)
+
+    async def run():
+        queue = BarQueue(timeframe="5m")
+        feed = MarketDataFeed(
+            "key", "secret", str(tmp_path), candle_store=CandleStore(), storage="npy",
+            exchange_factory=lambda: exchange, rate_limit=1000, on_candles=queue.publish,
+        )
+        feed.high_water_marks.update("BTC/USD", day - FIVE_MIN)
+        feed.seconds_to_next_poll = lambda: 0.01
+        errors = metrics.counters["feed.errors"]
+        task = asyncio.create_task(feed.start(["BTC/USD"]))
+        event = await asyncio.wait_for(queue.get(), 5)
+        assert event.symbols == {"BTC/USD"}
+        assert metrics.counters["feed.errors"] == errors + 1
+        assert not task.done()
+        feed.stop()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(run())
+
+
+def test_backfill_polls_once_and_closes_the_client(tmp_path, monkeypatch):
+    day = pd.Timestamp("2024-06-25").value // 1_000_000
+    now = day + 10 * FIVE_MIN + 1000
+    monkeypatch.setattr("data.market_data_feed.now_ms", lambda: now)
+    exchange = FakeExchange(now)
+    feed = MarketDataFeed(
+        "key", "secret", str(tmp_path), candle_store=CandleStore(), storage="npy",
+        exchange_factory=lambda: exchange, rate_limit=1000,
+    )
+    feed.high_water_marks.update("BTC/USD", day - FIVE_MIN)
+    assert asyncio.run(feed.backfill(["BTC/USD"]))
+    assert len(feed.candle_store.get("BTC/USD")) == 10
+    assert exchange.closed
+
+    exchange = FailingExchange(now)
+    feed.exchange.exchange_factory = lambda: exchange
+    feed.high_water_marks.update("ETH/USD", day - FIVE_MIN)
+    assert not asyncio.run(feed.backfill(["ETH/USD"]))
+    assert exchange.closed
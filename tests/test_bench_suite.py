@@ -0,0 +1,28 @@
+from benchmarks.common import synthetic_days
+from benchmarks.suite import bench_load_data, find_regressions, run_suite
+
+
+def test_load_data_case_reads_every_row(tmp_path):
+    from signals.smart_money import load_data
+
+    data = synthetic_days(2, 2)
+    bench_load_data(data, str(tmp_path), repeat=1)
+    start, end = str(data["timestamp"].min()), str(data["timestamp"].max())
+    for backend in ("csv", "npy"):
+        assert len(load_data(str(tmp_path / backend), start=start, end=end, backend=backend)) == len(data)
+
+
+def test_suite_reports_every_case_and_flags_regressions():
+    results = run_suite(n_symbols=2, days=2, n_cycles=3, n_trades=10, repeat=1)
+    assert set(results) == {
+        "load_data[csv]", "load_data[npy]", "generate_signals", "calculate_atr",
+        "generate_and_execute_signals", "generate_and_execute_signals[orders]", "execute_trade",
+    }
+    assert all(result["rate"] >= 0 for result in results.values())
+    assert results["generate_and_execute_signals"]["count"] == 2 * 3
+
+    assert find_regressions(results, {"cases": results}) == {}
+    inflated = {case: {"rate": result["rate"] * 2 + 1} for case, result in results.items()}
+    assert set(find_regressions(results, {"cases": inflated}, tolerance=0.3)) == set(results)
+    # cases missing from either side are not compared
+    assert find_regressions({}, {"cases": inflated}) == {}
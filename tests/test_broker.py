@@ -1,22 +1,36 @@
-import json
-import threading
-import sys
+import pytest
 
-sys.path.append("..")
+from backtest.replay import SimulatedClock
+from benchmarks.fakes import FakeBroker
 from broker import Broker
+from execution.execution import ExecutionAlgo
 
-def test_broker():
-    # Replace with your actual API keys
 
-    broker = Broker(api_key, api_secret)
-    
-    # Get account balance
-    balance = broker.get_account_balance()
-    print("Account Balance:", balance)
+def test_broker_interface_is_abstract():
+    broker = Broker("key", "secret")
+    assert (broker.api_key, broker.api_secret) == ("key", "secret")
+    for call in (
+        broker.get_account_balance,
+        lambda: broker.get_orderbook_data("BTC/USD"),
+        lambda: broker.place_order("BTC/USD", "market", 0.01, "buy"),
+        lambda: broker.cancel_order("1"),
+        lambda: broker.get_order_status("1"),
+    ):
+        with pytest.raises(NotImplementedError):
+            call()
 
-    # Place an order
-    order = broker.execute_order('BTC-USD', 0.01, 'buy')
-    print("Order Response:", order)
 
-if __name__ == "__main__":
-    test_broker()
+def test_fake_broker_works_an_execution():
+    clock = SimulatedClock()
+    broker = FakeBroker(clock=clock)
+    assert broker.get_account_balance()["USD"]["free"] == 10_000.0
+
+    algo = ExecutionAlgo(broker, "BTC/USD", clock=clock)
+    order_id = algo.execute_trade(0.01)
+    order = broker.get_order_status(order_id)
+    assert order["status"] == "closed" and order["side"] == "buy" and order["amount"] == 0.01
+    assert clock.time() >= algo.tick
+
+    market = broker.place_order("ETH/USD", "market", 1.0, "sell")
+    assert market["status"] == "closed"
+    assert broker.cancel_order(market["id"])["status"] == "canceled"
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from benchmarks.common import synthetic_ohlcv
+from data.candle_store import CandleStore
+from signals.incremental import IncrementalSignalEngine
+
+
+def test_roundtrip_and_since():
+    data = synthetic_ohlcv(200, seed=6)
+    store = CandleStore()
+    assert store.append(data) == 200
+
+    btc = store.get("BTC/USD")
+    expected = data[data["symbol"] == "BTC/USD"].reset_index(drop=True)
+    pd.testing.assert_frame_equal(btc, expected)
+
+    since = expected["timestamp"].iloc[89]
+    assert len(store.get("BTC/USD", since=since)) == 10
+    assert store.to_frame(since={"BTC/USD": since, "ETH/USD": None}).shape[0] == 110
+
+
+def test_duplicates_and_old_bars_are_dropped():
+    data = synthetic_ohlcv(100, seed=7)
+    store = CandleStore()
+    store.append(data.iloc[:60])
+
+    assert store.append(data.iloc[40:]) == 40
+    assert store.append(data) == 0
+    assert len(store.to_frame()) == 100
+
+
+def test_retention_evicts_oldest_bars():
+    data = synthetic_ohlcv(1000, symbols=("BTC/USD",), seed=8)
+    store = CandleStore(retention=50)
+    for start in range(0, 1000, 7):
+        store.append(data.iloc[start:start + 7])
+
+    btc = store.get("BTC/USD")
+    pd.testing.assert_frame_equal(btc, data.iloc[-50:].reset_index(drop=True))
+    assert store.candles["BTC/USD"].capacity < 200
+
+
+def test_engine_reads_only_new_bars_from_store():
+    data = synthetic_ohlcv(600, seed=9)
+    store = CandleStore()
+    engine = IncrementalSignalEngine()
+    for start in range(0, 300, 25):
+        chunk = pd.concat([data.iloc[start:start + 25], data.iloc[300 + start:325 + start]])
+        store.append(chunk)
+        new = store.to_frame(since=engine.last_timestamps())
+        assert len(new) == 50
+        engine.update(new)
@@ -0,0 +1,87 @@
+import asyncio
+
+import ccxt.async_support as ccxt
+import pytest
+
+from benchmarks.fakes import FakeExchange
+from data.exchange_session import ExchangeSession, TokenBucket
+
+NOW = 1_719_273_600_000 + 50 * 5 * 60_000
+
+
+def _session(exchange, **kwargs):
+    created = []
+
+    def factory():
+        created.append(exchange)
+        return exchange
+
+    kwargs.setdefault("rate", 1000)
+    kwargs.setdefault("burst", 1000)
+    return ExchangeSession("key", "secret", exchange_factory=factory, **kwargs), created
+
+
+def test_client_and_markets_are_reused():
+    exchange = FakeExchange(NOW)
+    session, created = _session(exchange)
+
+    async def poll_twice():
+        for _ in range(2):
+            async with session as client:
+                await asyncio.gather(*(client.fetch_ohlcv(f"C{i}/USD", since=NOW - 600_000) for i in range(5)))
+        await session.close()
+
+    asyncio.run(poll_twice())
+    assert len(created) == 1
+    assert exchange.calls["load_markets"] == 1
+    assert exchange.calls["fetch_ohlcv"] == 10
+    assert exchange.closed
+
+
+def test_in_flight_requests_are_capped():
+    exchange = FakeExchange(NOW, latency=0.01)
+    session, _ = _session(exchange, max_in_flight=3)
+
+    async def fan_out():
+        async with session as client:
+            await asyncio.gather(*(client.fetch_ohlcv(f"C{i}/USD", since=NOW - 600_000) for i in range(20)))
+
+    asyncio.run(fan_out())
+    assert exchange.max_in_flight == 3
+
+
+def test_rate_limit_errors_are_retried():
+    exchange = FakeExchange(NOW, rate_limited=3)
+    session, _ = _session(exchange, backoff=0.001)
+
+    bars = asyncio.run(_fetch(session))
+    assert len(bars) > 0
+    assert exchange.calls["load_markets"] + exchange.calls["fetch_ohlcv"] == 5
+
+
+def test_gives_up_after_max_retries():
+    exchange = FakeExchange(NOW, rate_limited=10)
+    session, _ = _session(exchange, backoff=0.001, max_retries=2)
+
+    with pytest.raises(ccxt.RateLimitExceeded):
+        asyncio.run(_fetch(session))
+
+
+async def _fetch(session):
+    async with session as client:
+        return await client.fetch_ohlcv("BTC/USD", since=NOW - 600_000)
+
+
+def test_token_bucket_paces_requests():
+    clock = [0.0]
+    bucket = TokenBucket(rate=10, capacity=2, clock=lambda: clock[0])
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    asyncio.run(take(2))  # the burst is free
+    assert bucket.tokens < 1
+    clock[0] += 0.1
+    asyncio.run(take(1))
+    assert bucket.tokens < 1
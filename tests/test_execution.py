@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+
+from backtest.replay import SimulatedClock
+from benchmarks.fakes import FakeAsyncBroker, FakeBroker
+from execution.execution import ExecutionAlgo
+from execution.order_manager import OrderManager
+
+
+def _fast_algo(broker, symbol):
+    algo = ExecutionAlgo(broker, symbol)
+    algo.passive_time_limit = 0.02
+    algo.total_time_limit = 0.05
+    algo.tick = 0.01
+    return algo
+
+
+def test_executions_share_the_event_loop():
+    broker = FakeAsyncBroker(latency=0.001)
+    algos = [_fast_algo(broker, f"C{i}/USD") for i in range(20)]
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*(algo.execute_trade_async(1.5) for algo in algos))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+    # 20 trades of ~50ms each would take a second back to back
+    assert elapsed < 0.5
+    placed = [order for order in broker.orders.values()]
+    assert {order["symbol"] for order in placed} == {f"C{i}/USD" for i in range(20)}
+    assert all(order["amount"] == 1.5 and order["side"] == "buy" for order in placed)
+    assert all(order["status"] == "canceled" for order in placed)
+
+
+class PartialFillBroker(FakeAsyncBroker):
+    """Fills 40% of every limit order as soon as it is placed."""
+
+    async def place_order(self, symbol, order_type, amount, side, price=None):
+        order = await super().place_order(symbol, order_type, amount, side, price)
+        self.fill(order["id"], 0.4 * amount)
+        return order
+
+
+class PartialFillSyncBroker(FakeBroker):
+    """FakeBroker whose limit orders fill 40% as soon as they are placed, and never more."""
+
+    def __init__(self, clock):
+        super().__init__(clock=clock, fill_after=None)
+
+    def place_order(self, symbol, order_type, amount, side, price=None):
+        order = super().place_order(symbol, order_type, amount, side, price)
+        self.orders[order["id"]]["filled"] = 0.4 * amount
+        return dict(self.orders[order["id"]])
+
+
+def test_replacements_are_sized_to_what_is_left():
+    # offer > bid: aggressive at once, the order is replaced every tick
+    broker = PartialFillBroker()
+    asyncio.run(_fast_algo(broker, "BTC/USD").execute_trade_async(-1.5))
+    amounts = [order["amount"] for order in broker.orders.values()]
+    assert len(amounts) > 2
+    assert amounts == pytest.approx([1.5 * 0.6 ** i for i in range(len(amounts))])
+    assert sum(order["filled"] for order in broker.orders.values()) <= 1.5
+
+    clock = SimulatedClock()
+    broker = PartialFillSyncBroker(clock)
+    ExecutionAlgo(broker, "BTC/USD", clock=clock).execute_trade(1.5)
+    amounts = [order["amount"] for order in broker.orders.values()]
+    assert len(amounts) > 2
+    assert amounts == pytest.approx([1.5 * 0.6 ** i for i in range(len(amounts))])
+    assert sum(order["filled"] for order in broker.orders.values()) == pytest.approx(1.5)
+
+
+def test_submit_orders_bounds_concurrency():
+    broker = FakeAsyncBroker(latency=0.01)
+    order_manager = OrderManager(broker)
+    for i in range(30):
+        order_manager.place_order(f"C{i}/USD", 0.1, "sell")
+
+    results = asyncio.run(order_manager.submit_orders(max_concurrency=5))
+
+    assert broker.max_in_flight == 5
+    assert len(results) == 30
+    assert all(result["status"] == "closed" for _, result in results)
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import synthetic_ohlcv
+from signals.incremental import IncrementalSignalEngine
+from signals.pipeline import run_pipeline
+
+COLUMNS = ["SMA10", "SMA100", "volume_avg", "rolling_min", "rolling_max", "atr"]
+
+
+def _replay(engine, data, chunk):
+    # like the live loop: pass the whole day so far, the engine picks out new bars
+    signals = []
+    timestamps = np.sort(data["timestamp"].unique())
+    for end in range(chunk, len(timestamps) + chunk, chunk):
+        cutoff = timestamps[min(end, len(timestamps)) - 1]
+        signals.append(engine.update(data[data["timestamp"] <= cutoff]))
+    return pd.concat([s for s in signals if not s.empty], ignore_index=True)
+
+
+def test_incremental_matches_batch():
+    data = synthetic_ohlcv(1500, symbols=("BTC/USD", "ETH/USD", "SOL/USD"), seed=3)
+    indicators, expected = run_pipeline(data, executor=None)
+
+    for chunk in (1, 7):
+        engine = IncrementalSignalEngine()
+        signals = _replay(engine, data, chunk)
+        signals = signals.sort_values(["symbol", "timestamp"], kind="stable")
+
+        assert len(expected) > 0
+        pd.testing.assert_frame_equal(
+            signals.reset_index(drop=True), expected, check_exact=False, rtol=1e-9
+        )
+
+        latest = indicators.groupby("symbol").tail(1).set_index("symbol")
+        snapshot = engine.snapshot()
+        np.testing.assert_allclose(
+            snapshot.loc[latest.index, COLUMNS].to_numpy(dtype=float),
+            latest[COLUMNS].to_numpy(dtype=float),
+            rtol=1e-9,
+        )
+        assert (snapshot.loc[latest.index, "phase"] == latest["phase"]).all()
+
+
+def test_every_bar_matches_batch():
+    data = synthetic_ohlcv(400, symbols=("BTC/USD",), seed=4)
+    indicators, _ = run_pipeline(data, executor=None)
+
+    engine = IncrementalSignalEngine()
+    state = engine.get("BTC/USD")
+    rows = [
+        state.update(row.timestamp, row.high, row.low, row.close, row.volume)
+        for row in data.itertuples()
+    ]
+    result = pd.DataFrame(rows)
+
+    np.testing.assert_allclose(
+        result[COLUMNS].to_numpy(dtype=float),
+        indicators[COLUMNS].to_numpy(dtype=float),
+        rtol=1e-9,
+    )
+    assert (result["phase"] == indicators["phase"]).all()
+    assert (result["volume_spike"] == indicators["volume_spike"]).all()
+
+
+def test_old_bars_are_ignored():
+    data = synthetic_ohlcv(600, seed=5)
+    engine = IncrementalSignalEngine()
+    engine.update(data)
+
+    assert engine.update(data).empty
+    assert engine.new_bars(data).empty
+
+
+def test_latest_table_follows_updates():
+    symbols = tuple(f"C{i}/USD" for i in range(20))  # more than the initial capacity
+    data = synthetic_ohlcv(300, symbols=symbols, seed=5)
+    engine = IncrementalSignalEngine()
+    cutoff = data["timestamp"].quantile(0.5)
+    engine.update(data[data["timestamp"] <= cutoff])
+    engine.update(data)
+
+    latest = engine.latest
+    snapshot = engine.snapshot()
+    assert len(latest) == len(symbols)
+    for symbol in symbols:
+        assert latest.timestamp(symbol) == snapshot.loc[symbol, "timestamp"]
+        for field, column in (("atr", "atr"), ("close", "close"), ("SMA100", "SMA100"),
+                              ("support", "rolling_min"), ("resistance", "rolling_max")):
+            value = latest.get(symbol, field)
+            assert type(value) is float
+            np.testing.assert_equal(value, snapshot.loc[symbol, column])
+    pd.testing.assert_series_equal(
+        latest.to_frame()["atr"], snapshot["atr"].rename_axis("symbol"), check_names=False
+    )
+
+    engine.reset("C3/USD")
+    assert np.isnan(latest.get("C3/USD", "atr")) and latest.timestamp("C3/USD") is None
+    assert "C3/USD" not in dict(latest.items("close"))
+    assert np.isnan(latest.get("NEW/USD", "atr"))
+
+    engine.update(data[data["symbol"] == "C3/USD"])
+    assert latest.get("C3/USD", "close") == snapshot.loc["C3/USD", "close"]
+
+    # after a gap the symbol starts again from the bars past it
+    c3 = data[data["symbol"] == "C3/USD"]
+    gap_end = c3["timestamp"].iloc[-5]
+    engine.reset("C3/USD", resume_after=gap_end)
+    assert engine.last_timestamps()["C3/USD"] == gap_end
+    engine.update(c3)
+    fresh = IncrementalSignalEngine()
+    fresh.update(c3[c3["timestamp"] > gap_end])
+    assert latest.get("C3/USD", "atr") == fresh.latest.get("C3/USD", "atr")
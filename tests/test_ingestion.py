@@ -0,0 +1,98 @@
+import asyncio
+
+import pandas as pd
+
+from benchmarks.fakes import FakeExchange
+from data.candle_store import CandleStore
+from data.ingestion import HighWaterMarks, clean_bars, find_gaps
+from data.market_data_feed import MarketDataFeed
+
+FIVE_MIN = 5 * 60_000
+DAY = pd.Timestamp("2024-06-25").value // 1_000_000
+
+
+def _feed(tmp_path, exchange, monkeypatch, now):
+    monkeypatch.setattr("data.market_data_feed.now_ms", lambda: now)
+    feed = MarketDataFeed(
+        "key", "secret", str(tmp_path), candle_store=CandleStore(), storage="npy",
+        exchange_factory=lambda: exchange, rate_limit=1000,
+    )
+    feed.add_subscription(["BTC/USD", "ETH/USD"])
+    return feed
+
+
+def test_clean_bars_drops_old_duplicate_and_forming():
+    bars = [[t, 1, 1, 1, 1, 1] for t in (0, FIVE_MIN, FIVE_MIN, 2 * FIVE_MIN, 3 * FIVE_MIN)]
+    cleaned = clean_bars(bars, high_water_mark=0, timeframe_ms=FIVE_MIN, now=3 * FIVE_MIN + 10)
+    assert [bar[0] for bar in cleaned] == [FIVE_MIN, 2 * FIVE_MIN]
+
+
+def test_find_gaps():
+    timestamps = [0, FIVE_MIN, 4 * FIVE_MIN, 5 * FIVE_MIN]
+    assert find_gaps(timestamps, FIVE_MIN) == [(2 * FIVE_MIN, 3 * FIVE_MIN)]
+
+
+def test_polls_fetch_only_new_bars(tmp_path, monkeypatch):
+    now = DAY + 100 * FIVE_MIN + 30_000
+    exchange = FakeExchange(now, max_limit=40)
+    feed = _feed(tmp_path, exchange, monkeypatch, now)
+    for symbol in feed.symbols:
+        feed.high_water_marks.update(symbol, DAY - FIVE_MIN)
+
+    asyncio.run(feed.update_market_data())
+    # 100 closed bars per symbol, paged 40 at a time
+    assert len(feed.candle_store.get("BTC/USD")) == 100
+    assert exchange.calls["fetch_ohlcv"] == 6
+
+    exchange.calls.clear()
+    asyncio.run(feed.update_market_data())
+    assert exchange.calls["fetch_ohlcv"] == 0  # nothing has closed since
+
+    exchange.now_ms += FIVE_MIN
+    feed = _feed(tmp_path, exchange, monkeypatch, exchange.now_ms)  # restart
+    asyncio.run(feed.update_market_data())
+    assert exchange.calls["fetch_ohlcv"] == 2
+    assert len(feed.candle_store.get("BTC/USD")) == 1
+
+    stored = feed.storage.load(start="2024-06-25", end="2024-06-26")
+    assert len(stored) == 202
+    assert not stored.duplicated(["symbol", "timestamp"]).any()
+
+
+def test_backfills_after_downtime(tmp_path, monkeypatch):
+    marks = HighWaterMarks(str(tmp_path / "high_water_marks.json"))
+    marks.update("BTC/USD", DAY)
+    marks.update("ETH/USD", DAY)
+    marks.save()
+
+    now = DAY + 500 * FIVE_MIN
+    exchange = FakeExchange(now, max_limit=300)
+    feed = _feed(tmp_path, exchange, monkeypatch, now)
+    asyncio.run(feed.update_market_data())
+
+    btc = feed.candle_store.get("BTC/USD")
+    assert len(btc) == 499
+    assert btc["timestamp"].diff().dropna().eq(pd.Timedelta(minutes=5)).all()
+    assert feed.high_water_marks.get("BTC/USD") == DAY + 499 * FIVE_MIN
+
+
+def test_bars_the_exchange_does_not_have_are_reported_as_gaps(tmp_path, monkeypatch):
+    now = DAY + 20 * FIVE_MIN + 1000
+    # a hole right after the stored bars and one inside the new ones
+    missing = [DAY + i * FIVE_MIN for i in (1, 2, 9)]
+    exchange = FakeExchange(now, missing=missing)
+    feed = _feed(tmp_path, exchange, monkeypatch, now)
+    gaps = []
+    feed.on_gap = lambda symbol, first, last: gaps.append((symbol, first, last))
+    for symbol in feed.symbols:
+        feed.high_water_marks.update(symbol, DAY)
+
+    asyncio.run(feed.update_market_data())
+
+    expected = [(DAY + FIVE_MIN, DAY + 2 * FIVE_MIN), (DAY + 9 * FIVE_MIN, DAY + 9 * FIVE_MIN)]
+    assert sorted(gaps) == sorted(
+        [("BTC/USD", *gap) for gap in expected] + [("ETH/USD", *gap) for gap in expected]
+    )
+    gaps.clear()
+    asyncio.run(feed.update_market_data())
+    assert gaps == []  # reported once, the marks have moved past them
@@ -0,0 +1,87 @@
+import json
+import logging
+import threading
+
+import pandas as pd
+
+from utils.logger import flush_logs, setup_logger
+
+
+def test_setup_is_idempotent(tmp_path):
+    log_file = tmp_path / "system.log"
+    first = setup_logger("test_idempotent", log_file)
+    second = setup_logger("test_idempotent", str(log_file))
+
+    assert first is second and len(first.handlers) == 1
+    first.info("hello %s", "world")
+    flush_logs()
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == 1 and lines[0].endswith("INFO hello world")
+
+
+def test_arguments_are_formatted_on_the_writer_thread(tmp_path):
+    class Payload:
+        thread = None
+
+        def copy(self):
+            return Payload()
+
+        def __str__(self):
+            Payload.thread = threading.current_thread()
+            return "payload"
+
+    logger = setup_logger("test_lazy", tmp_path / "lazy.log", level=logging.INFO)
+    logger.debug("%s", Payload())
+    assert Payload.thread is None
+
+    logger.info("%s", Payload())
+    flush_logs()
+    assert Payload.thread is not None and Payload.thread is not threading.current_thread()
+    assert "payload" in (tmp_path / "lazy.log").read_text()
+
+
+def test_arguments_are_logged_as_they_were(tmp_path):
+    class Position:
+        def __init__(self):
+            self.quantity = 1.0
+
+        def __str__(self):
+            return f"position {self.quantity}"
+
+    logger = setup_logger("test_snapshot", tmp_path / "snapshot.log")
+    position, fills, frame = Position(), [1.0], pd.DataFrame({"quantity": [1.0]})
+    logger.info("%s %s %s", position, fills, frame.to_dict("list"))
+    logger.info("%s", frame)
+    # changed before the writer thread renders the records
+    position.quantity = 2.0
+    fills.append(2.0)
+    frame.loc[0, "quantity"] = 2.0
+    flush_logs()
+
+    text = (tmp_path / "snapshot.log").read_text()
+    assert "INFO position 1.0 [1.0] {'quantity': [1.0]}\n" in text
+    frame_text = text.rsplit("INFO ", 1)[1]
+    assert "1.0" in frame_text and "2.0" not in frame_text
+
+
+def test_json_records(tmp_path):
+    logger = setup_logger("test_json", tmp_path / "events.jsonl", json_format=True)
+    logger.info("order %s", "filled", extra={"symbol": "BTC/USD", "quantity": 0.5})
+    flush_logs()
+
+    record = json.loads((tmp_path / "events.jsonl").read_text())
+    assert record["message"] == "order filled"
+    assert record["level"] == "INFO" and record["logger"] == "test_json"
+    assert record["symbol"] == "BTC/USD" and record["quantity"] == 0.5
+
+
+def test_rotation(tmp_path):
+    log_file = tmp_path / "rotating.log"
+    logger = setup_logger("test_rotation", log_file, max_bytes=1000, backup_count=2, batch_size=1)
+    for i in range(100):
+        logger.info("message %03d", i)
+    flush_logs()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["rotating.log", "rotating.log.1", "rotating.log.2"]
+    assert log_file.stat().st_size <= 1000
+    assert log_file.read_text().splitlines()[-1].endswith("message 099")
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from utils.metrics import Histogram, Metrics, SamplingProfiler
+
+
+def test_histogram_keeps_recent_samples():
+    histogram = Histogram(size=100)
+    for value in range(1000):
+        histogram.observe(float(value))
+
+    summary = histogram.summary()
+    assert summary["count"] == 1000
+    assert summary["max"] == 999.0
+    assert summary["mean"] == np.mean(range(1000))
+    # percentiles come from the last 100 observations only
+    assert summary["p50"] == np.percentile(range(900, 1000), 50)
+    assert Histogram().summary() == {"count": 0}
+
+
+def test_timers_counters_and_export(tmp_path):
+    metrics = Metrics()
+
+    @metrics.timed("sync")
+    def work():
+        return 1
+
+    @metrics.timed()
+    async def fetch():
+        await asyncio.sleep(0)
+        return 2
+
+    with metrics.timer("block"):
+        time.sleep(0.01)
+    assert work() == 1 and work() == 1
+    assert asyncio.run(fetch()) == 2
+    metrics.count("orders", 3)
+    metrics.count("orders")
+
+    path = tmp_path / "metrics.json"
+    metrics.export(path)
+    snapshot = json.loads(path.read_text())
+    assert snapshot["timers"]["block"]["max"] >= 0.01
+    assert snapshot["timers"]["sync"]["count"] == 2
+    assert snapshot["timers"]["test_timers_counters_and_export.<locals>.fetch"]["count"] == 1
+    assert snapshot["counters"] == {"orders": 4}
+
+    metrics.reset()
+    assert metrics.snapshot()["timers"] == {}
+
+
+def test_profiler_finds_the_hot_function(tmp_path):
+    def busy():
+        deadline = time.perf_counter() + 0.3
+        while time.perf_counter() < deadline:
+            pass
+
+    profiler = SamplingProfiler(interval=0.001).start()
+    busy()
+    profiler.stop()
+
+    assert profiler.top(1)[0][0].startswith("busy ")
+    path = tmp_path / "stacks.txt"
+    profiler.export(path)
+    assert "busy (test_metrics.py" in path.read_text()
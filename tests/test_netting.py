@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from execution.netting import NET_COLUMNS, net_signals, reduction_ratio
+from signals.smart_money import SIGNAL_COLUMNS
+
+
+def _signals(rows):
+    return pd.DataFrame(
+        [(pd.Timestamp("2024-06-25") + pd.Timedelta(minutes=5 * i), *row) for i, row in enumerate(rows)],
+        columns=SIGNAL_COLUMNS,
+    )
+
+
+def test_opposite_signals_cancel_out():
+    signals = _signals([("BTC/USD", "buy", 100.0), ("ETH/USD", "buy", 10.0), ("BTC/USD", "sell", 101.0)])
+    orders = net_signals(signals, [1.0, 2.0, 1.0], {"BTC/USD": 0.5})
+
+    assert list(orders.columns) == NET_COLUMNS
+    assert orders.to_dict("records") == [
+        {"symbol": "ETH/USD", "quantity": 2.0, "target": 2.0, "price": 10.0, "signals": 1},
+    ]
+
+
+def test_matches_sending_each_signal():
+    rng = np.random.default_rng(0)
+    symbols = ["BTC/USD", "ETH/USD", "SOL/USD"]
+    rows = [(symbols[rng.integers(3)], rng.choice(["buy", "sell"]), 100.0) for _ in range(200)]
+    signals = _signals(rows)
+    quantities = rng.uniform(0, 2, len(rows))
+    positions = {"BTC/USD": 1.0, "ETH/USD": 0.0}
+
+    # one order per signal, a sell never goes below flat
+    expected = dict(positions)
+    for (symbol, side, _), quantity in zip(rows, quantities):
+        position = expected.get(symbol, 0.0)
+        expected[symbol] = position + quantity if side == "buy" else max(position - quantity, 0.0)
+
+    orders = net_signals(signals, quantities, positions).set_index("symbol")
+    for symbol in symbols:
+        delta = orders["quantity"].get(symbol, 0.0)
+        assert np.isclose(positions.get(symbol, 0.0) + delta, expected[symbol])
+    assert orders["signals"].sum() <= len(rows)
+
+
+def test_short_targets_and_small_deltas():
+    signals = _signals([("BTC/USD", "sell", 100.0), ("ETH/USD", "buy", 10.0)])
+
+    orders = net_signals(signals, [1.0, 0.1], {}, long_only=False, min_notional=5)
+    assert orders.to_dict("records") == [
+        {"symbol": "BTC/USD", "quantity": -1.0, "target": -1.0, "price": 100.0, "signals": 1},
+    ]
+    assert net_signals(signals.iloc[:0], [], {}).empty
+
+
+def test_reduction_ratio():
+    assert reduction_ratio(10, 2) == 0.8
+    assert reduction_ratio(0, 0) == 0.0
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from backtest import Backtester, ParameterSweep
+from backtest.backtester import MarketArrays
+from backtest.optimizer import (
+    METRICS,
+    IndicatorCache,
+    parameter_grid,
+    random_parameters,
+    walk_forward_splits,
+)
+from benchmarks.common import synthetic_ohlcv
+
+SPACE = {
+    "fast": [5, 10],
+    "slow": [50, 100],
+    "threshold": [1.5, 2],
+    "risk_target": [0.1, 0.25],
+}
+
+
+def _data():
+    return synthetic_ohlcv(6000, symbols=("BTC/USD", "ETH/USD", "SOL/USD"), seed=5)
+
+
+def test_grid_and_random_samples():
+    grid = parameter_grid(SPACE)
+    assert len(grid) == 16
+    assert grid[0] == {"fast": 5, "slow": 50, "threshold": 1.5, "risk_target": 0.1}
+
+    samples = random_parameters(SPACE, 10, seed=1)
+    assert len(samples) == 10
+    assert len({tuple(s.values()) for s in samples}) == 10
+    assert all(s in grid for s in samples)
+    assert len(random_parameters(SPACE, 100)) == 16
+
+
+def test_sweep_matches_backtester():
+    data = _data()
+    combos = parameter_grid(SPACE)
+    results = ParameterSweep(data, executor=None, chunk_size=3).run(combos)
+
+    assert list(results.columns) == list(SPACE) + list(METRICS)
+    for combo, (_, row) in zip(combos, results.iterrows()):
+        params = dict(combo)
+        backtester = Backtester(risk_target=params.pop("risk_target"))
+        summary = backtester.run(data, **params).summary
+        for metric in METRICS:
+            assert np.isclose(row[metric], summary[metric])
+
+    pooled = ParameterSweep(data, max_workers=2, chunk_size=3).run(combos)
+    pd.testing.assert_frame_equal(pooled, results)
+
+
+def test_results_stream_to_csv(tmp_path):
+    path = tmp_path / "results.csv"
+    combos = parameter_grid(SPACE)
+    results = ParameterSweep(_data(), executor=None).run(combos, results_path=path)
+
+    streamed = pd.read_csv(path).set_index("index").sort_index()
+    np.testing.assert_allclose(streamed["pnl"], results["pnl"])
+
+
+def test_window_warmup_matches_full_history():
+    data = _data()
+    timestamps = np.sort(data["timestamp"].unique())
+    start, end = timestamps[600], timestamps[1500]
+    combos = [{"fast": 10, "slow": 100}]
+
+    result = ParameterSweep(data, executor=None).run(combos, start=start, end=end)
+    arrays = MarketArrays(data).between(None, end)
+    expected = Backtester().run(arrays, start=start).summary
+    assert np.isclose(result["pnl"].iloc[0], expected["pnl"])
+    assert result["trades"].iloc[0] == expected["trades"]
+
+
+def test_walk_forward():
+    data = _data()
+    combos = parameter_grid(SPACE)
+    sweep = ParameterSweep(data, executor=None)
+    folds = sweep.walk_forward(combos, train="2D", test="1D")
+
+    splits = walk_forward_splits(data["timestamp"].min(), data["timestamp"].max() + pd.Timedelta("5min"), "2D", "1D")
+    assert len(folds) == len(splits) > 1
+    for _, fold in folds.iterrows():
+        train = sweep.run(combos, start=fold["train_start"], end=fold["train_end"])
+        assert np.isclose(fold["train_pnl"], train["pnl"].max())
+        best = {name: fold[name] for name in SPACE}
+        test = sweep.run([best], start=fold["test_start"], end=fold["test_end"])
+        assert np.isclose(fold["pnl"], test["pnl"].iloc[0])
+
+
+def test_cache_evicts_least_recently_used():
+    cache = IndicatorCache(max_bytes=3 * 800)
+    for key in "abc":
+        cache[key] = np.zeros(100)
+    cache["a"]
+    cache["d"] = np.zeros(100)
+
+    assert list(cache) == ["c", "a", "d"]
+    assert cache.nbytes == 2400
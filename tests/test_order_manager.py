@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeAsyncBroker
+from execution.order_manager import OrderManager
+
+
+def test_lifecycle_and_indexes():
+    order_manager = OrderManager(broker=None)
+    buy = order_manager.place_order("BTC/USD", 2.0, "buy", price=100.0)
+    sell = order_manager.place_order("ETH/USD", 1.0, "sell")
+
+    assert order_manager.get_order(buy.id) is buy
+    assert order_manager.get_orders(status="new") == [buy, sell]
+    assert order_manager.process_orders() == [buy, sell]
+    assert order_manager.process_orders() == []
+
+    order_manager.apply_exchange_order(buy, {"id": "x1", "status": "open", "filled": 0.5})
+    assert order_manager.get_by_exchange_id("x1") is buy
+    assert order_manager.get_orders("BTC/USD", status="open") == [buy]
+    assert order_manager.get_positions() == {"BTC/USD": 0.5}
+
+    order_manager.apply_exchange_order(buy, {"id": "x1", "status": "closed", "filled": 2.0})
+    assert order_manager.get_positions() == {"BTC/USD": 2.0}
+    assert order_manager.get_order(buy.id) is None
+    assert order_manager.get_by_exchange_id("x1") is None
+    assert order_manager.get_orders("BTC/USD") == []
+    assert order_manager.get_executed_orders() == [buy]
+
+    order_manager.transition(sell, "canceled")
+    assert len(order_manager) == 0
+    assert [order.status for order in order_manager.get_executed_orders()] == ["filled", "canceled"]
+    with pytest.raises(ValueError):
+        order_manager.transition(sell, "open")
+
+
+def test_filled_orders_are_not_resent():
+    broker = FakeAsyncBroker()
+    order_manager = OrderManager(broker)
+    for i in range(5):
+        order_manager.place_order(f"C{i}/USD", 1.0, "buy")
+
+    first = asyncio.run(order_manager.submit_orders())
+    second = asyncio.run(order_manager.submit_orders())
+
+    assert len(first) == 5 and second == []
+    assert broker.calls["place_order"] == 5
+    assert len(order_manager) == 0
+    assert order_manager.get_positions() == {f"C{i}/USD": 1.0 for i in range(5)}
+
+
+def test_rejected_and_open_orders():
+    class Broker(FakeAsyncBroker):
+        async def place_order(self, symbol, order_type, amount, side, price=None):
+            if symbol == "BAD/USD":
+                raise RuntimeError("insufficient funds")
+            return await super().place_order(symbol, "limit", amount, side, price)
+
+    order_manager = OrderManager(Broker())
+    bad = order_manager.place_order("BAD/USD", 1.0, "buy")
+    good = order_manager.place_order("BTC/USD", 1.0, "buy", price=10.0)
+    asyncio.run(order_manager.submit_orders())
+
+    assert bad.status == "rejected"
+    assert good.status == "open"
+    assert order_manager.get_orders(status="open") == [good]
+    assert order_manager.get_positions() == {}
+
+
+def test_history_is_bounded():
+    order_manager = OrderManager(broker=None, history=100)
+    for i in range(1000):
+        order = order_manager.place_order("BTC/USD", 1.0, "buy")
+        order_manager.transition(order, "filled")
+
+    assert len(order_manager) == 0
+    assert len(order_manager.get_executed_orders()) == 100
+    assert order_manager.get_executed_orders()[-1] is order
+    assert order_manager.get_positions() == {"BTC/USD": 1000.0}
+
+
+def test_net_position_counts_working_orders():
+    order_manager = OrderManager(broker=None)
+    order_manager.positions["BTC/USD"] = 3.0
+    buy = order_manager.place_order("BTC/USD", 2.0, "buy")
+    order_manager.place_order("BTC/USD", 0.5, "sell")
+    order_manager.transition(buy, "open", filled=1.5)
+
+    assert order_manager.get_positions()["BTC/USD"] == 4.5
+    assert order_manager.net_position("BTC/USD") == 4.5 + 0.5 - 0.5
+    assert order_manager.net_position("ETH/USD") == 0
+
+
+def test_unpriced_fills_reach_listeners_without_a_price():
+    order_manager = OrderManager(broker=None)
+    fills = []
+    order_manager.fill_listeners.append(lambda order, quantity, price: fills.append((quantity, price)))
+    order = order_manager.place_order("BTC/USD", 3.0, "buy")
+    order_manager.transition(order, "open", filled=1.0, price=100.0)
+    order_manager.transition(order, "open", filled=2.0)
+    assert order.average is None  # not 100.0 for a part that may have cost anything
+    order_manager.transition(order, "filled", price=102.0)
+    assert fills == [(1.0, 100.0), (1.0, None), (1.0, 102.0)]
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from benchmarks.common import synthetic_ohlcv
+from signals.pipeline import compute_indicators, partition_by_symbol, run_pipeline
+from signals.smart_money import generate_signals
+
+
+def _shuffled(n_rows, symbols):
+    data = synthetic_ohlcv(n_rows, symbols=symbols, seed=2)
+    return data.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def test_partitions_are_sorted_per_symbol():
+    partitions = partition_by_symbol(_shuffled(600, ("BTC/USD", "ETH/USD", "SOL/USD")))
+
+    assert [p["symbol"].iloc[0] for p in partitions] == ["BTC/USD", "ETH/USD", "SOL/USD"]
+    for partition in partitions:
+        assert partition["symbol"].nunique() == 1
+        assert partition["timestamp"].is_monotonic_increasing
+
+
+def test_indicators_do_not_leak_across_symbols():
+    symbols = ("BTC/USD", "ETH/USD")
+    data = _shuffled(1200, symbols)
+    indicators, signals = run_pipeline(data, executor=None)
+
+    for symbol in symbols:
+        alone = data[data["symbol"] == symbol].sort_values("timestamp")
+        expected = compute_indicators(alone.reset_index(drop=True))
+        result = indicators[indicators["symbol"] == symbol].reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expected)
+
+        _, expected_signals = generate_signals(alone.reset_index(drop=True))
+        result_signals = signals[signals["symbol"] == symbol].reset_index(drop=True)
+        pd.testing.assert_frame_equal(result_signals, expected_signals)
+
+
+def test_executors_agree():
+    data = _shuffled(2000, tuple(f"C{i}/USD" for i in range(8)))
+    serial = run_pipeline(data, executor=None)
+
+    for executor in ("thread", "process"):
+        result = run_pipeline(data, max_workers=2, executor=executor)
+        pd.testing.assert_frame_equal(result[0], serial[0])
+        pd.testing.assert_frame_equal(result[1], serial[1])
+
+
+def test_empty_frame():
+    data = synthetic_ohlcv(10).iloc[:0]
+    indicators, signals = run_pipeline(data)
+
+    assert indicators.empty
+    assert signals.empty
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeAsyncBroker
+from execution.order_manager import OrderManager
+from execution.reconcile import OrderReconciler
+
+
+def _resting_orders(n, quantity=1.0):
+    """n limit buys submitted to a FakeAsyncBroker and resting there, one symbol each."""
+    broker = FakeAsyncBroker()
+    order_manager = OrderManager(broker)
+    for i in range(n):
+        order_manager.place_order(f"C{i}/USD", quantity, "buy", price=100.0)
+    asyncio.run(order_manager.submit_orders(order_type="limit"))
+    return broker, order_manager
+
+
+def test_partial_and_late_fills_are_applied_once():
+    broker, order_manager = _resting_orders(2)
+    fills = []
+    order_manager.fill_listeners.append(lambda order, quantity, price: fills.append((order.id, quantity, price)))
+    reconciler = OrderReconciler(order_manager, broker)
+    first, second = order_manager.get_orders()
+
+    async def run():
+        broker.fill(first.exchange_id, 0.25, price=99.0)
+        broker.fill(first.exchange_id, 0.25, price=101.0)
+        assert await reconciler.reconcile() == 1
+        assert first.status == "open" and first.filled == 0.5
+        # the same fills again in the open order and the trades are not applied twice
+        assert await reconciler.reconcile() == 0
+
+        broker.fill(first.exchange_id)
+        broker.fill(second.exchange_id, 0.4)
+        assert await reconciler.reconcile() == 2
+
+    asyncio.run(run())
+    assert fills == [(first.id, 0.5, 100.0), (first.id, 0.5, 100.0), (second.id, 0.4, 100.0)]
+    assert order_manager.get_positions() == {"C0/USD": 1.0, "C1/USD": pytest.approx(0.4)}
+    assert order_manager.get_orders() == [second]
+    assert reconciler.traded == {second.exchange_id: pytest.approx(0.4)}
+
+
+def test_thousands_of_orders_take_two_calls_per_poll():
+    n = 5000
+    broker, order_manager = _resting_orders(n)
+    reconciler = OrderReconciler(order_manager, broker, trade_limit=10_000)
+    exchange_ids = [order.exchange_id for order in order_manager.get_orders()]
+    filled, partial, canceled = exchange_ids[:500], exchange_ids[500:1000], exchange_ids[1000:1100]
+    for exchange_id in filled:
+        broker.fill(exchange_id)
+    for exchange_id in partial:
+        broker.fill(exchange_id, 0.5)
+    for exchange_id in canceled:
+        broker.fill(exchange_id, 0.25)
+        broker.orders[exchange_id]["status"] = "canceled"  # canceled on the exchange, partly filled
+    broker.calls.clear()
+
+    updated = asyncio.run(reconciler.reconcile())
+
+    assert updated == len(filled) + len(partial) + 2 * len(canceled)
+    # one lookup per order that left the book without its trades explaining why
+    assert broker.calls == {"fetch_open_orders": 1, "fetch_my_trades": 1, "get_order_status": len(canceled)}
+    assert len(order_manager) == n - len(filled) - len(canceled)
+    assert sum(order_manager.get_positions().values()) == pytest.approx(500 + 250 + 25)
+    assert {order.status for order in order_manager.get_executed_orders()} == {"filled", "canceled"}
+
+    broker.calls.clear()
+    assert asyncio.run(reconciler.reconcile()) == 0
+    assert broker.calls == {"fetch_open_orders": 1, "fetch_my_trades": 1}
+
+
+def test_trades_beyond_the_limit_come_with_later_polls():
+    broker, order_manager = _resting_orders(30)
+    reconciler = OrderReconciler(order_manager, broker, trade_limit=10)
+    start = int(time.time() * 1000) + 1000
+    for i, order in enumerate(order_manager.get_orders()):
+        # pairs of trades in the same millisecond, straddling the pages
+        broker.fill(order.exchange_id, 0.5, timestamp=start + i)
+        broker.fill(order.exchange_id, 0.25, timestamp=start + i)
+    # open orders report no fills, as some exchanges do: only the trades count
+    for order in broker.orders.values():
+        order["filled"] = 0.0
+
+    async def run():
+        while sum(order_manager.get_positions().values()) < 30 * 0.75 - 1e-9:
+            await reconciler.reconcile()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert order_manager.get_positions() == {f"C{i}/USD": 0.75 for i in range(30)}
+    assert broker.calls["fetch_my_trades"] == 8
@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtest.replay import EVENT_COLUMNS, ExecutionReplay
+from benchmarks.common import synthetic_market_events
+from broker.simulated import MatchingEngine
+
+T0 = pd.Timestamp("2024-06-25")
+
+
+def _events(rows):
+    """rows of (seconds, bid, offer, trade price)"""
+    return pd.DataFrame(
+        [
+            (T0 + pd.Timedelta(seconds=s), "BTC/USD", bid, 1.0, offer, 1.0, price, 0.1 if price == price else np.nan)
+            for s, bid, offer, price in rows
+        ],
+        columns=EVENT_COLUMNS,
+    )
+
+
+def _patient(**params):
+    # stays passive until the time limit, whatever the book does
+    return dict(
+        is_adverse_price_move=lambda trade, bookdata: False,
+        is_further_adverse_price_move=lambda trade, bookdata: False,
+        **params,
+    )
+
+
+def test_matching_engine():
+    engine = MatchingEngine(maker_fee=0.001, taker_fee=0.002)
+    engine.on_quote("BTC/USD", 0, 99.0, 1.0, 101.0, 1.0)
+
+    taker = engine.submit(1, "BTC/USD", "limit", 2.0, "buy", 102.0)
+    assert taker["status"] == "closed" and taker["average"] == 101.0
+    assert taker["fee"]["cost"] == 2.0 * 101.0 * 0.002
+    assert engine.submit(1, "BTC/USD", "market", 1.0, "sell")["average"] == 99.0
+
+    resting = engine.submit(2, "BTC/USD", "limit", 1.0, "buy", 99.5)
+    canceled = engine.submit(2, "BTC/USD", "limit", 1.0, "buy", 99.8)
+    engine.cancel(canceled["id"])
+    engine.on_trade("BTC/USD", 3, 99.7, 0.5)
+    assert resting["status"] == "open"
+    engine.on_quote("BTC/USD", 4, 99.0, 1.0, 99.5, 1.0)
+    assert resting["status"] == "closed"
+    assert resting["average"] == 99.5 and resting["liquidity"] == "maker"
+    assert resting["lastTradeTimestamp"] == 4
+    assert canceled["status"] == "canceled" and canceled["filled"] == 0
+
+
+def test_time_limits_run_on_the_simulated_clock():
+    # offer drifts away and nothing trades: the passive order never fills
+    rows = [(s, 100.0 + s / 100, 100.1 + s / 100, np.nan) for s in range(0, 900, 5)]
+    replay = ExecutionReplay(_events(rows), **_patient())
+
+    start = time.perf_counter()
+    report = replay.execute(T0 + pd.Timedelta(seconds=1), "BTC/USD", 2.0)
+    assert time.perf_counter() - start < 0.5
+
+    # total_time_limit is 10 minutes of simulated time
+    assert 600 <= replay.clock.time() - (T0.value / 1e9 + 1) <= 602
+    assert report["filled"] == 0
+    assert [order["status"] for order in replay.engine.orders.values()] == ["canceled"]
+
+
+def test_passive_order_fills_as_maker():
+    rows = [(0, 100.0, 100.2, np.nan), (30, 100.0, 100.2, 100.3), (60, 100.0, 100.2, 99.9)]
+    replay = ExecutionReplay(_events(rows), **_patient())
+
+    report = replay.execute(T0, "BTC/USD", 1.0)
+    assert report["filled"] == 1.0
+    assert report["average_price"] == 100.0
+    assert report["maker_fills"] == 1
+    assert report["time_to_fill"] == 60
+    assert np.isclose(report["slippage_bps"], (100.0 - 100.1) / 100.1 * 1e4)
+
+
+def test_default_algo_takes_the_offer():
+    rows = [(0, 100.0, 100.2, np.nan), (600, 100.0, 100.2, np.nan)]
+    replay = ExecutionReplay(_events(rows))
+
+    report = replay.execute(T0, "BTC/USD", -1.0)
+    assert report["filled"] == -1.0
+    assert report["average_price"] == 100.0  # sell crosses to the bid
+    assert report["maker_fills"] == 0
+
+
+def test_many_orders_never_overfill():
+    events = synthetic_market_events(20_000, symbols=("BTC/USD", "ETH/USD"), seed=1)
+    rng = np.random.default_rng(0)
+    timestamps = events["timestamp"].unique()
+    orders = pd.DataFrame(
+        {
+            "timestamp": rng.choice(timestamps[: len(timestamps) // 2], 100),
+            "symbol": rng.choice(["BTC/USD", "ETH/USD"], 100),
+            "trade": rng.choice([-1, 1], 100) * rng.uniform(0.1, 2, 100),
+        }
+    )
+
+    reports, summary = ExecutionReplay(events).run(orders)
+    assert summary["orders"] == 100
+    assert summary["fill_rate"] == 1.0
+    np.testing.assert_allclose(reports["filled"], orders["trade"])
+
+    # a passive order may expire, but never fills more than the trade
+    reports, summary = ExecutionReplay(events, **_patient()).run(orders)
+    assert 0 < summary["fill_rate"] <= 1.0
+    filled = reports["filled"] != 0
+    np.testing.assert_allclose(reports.loc[filled, "filled"], orders.loc[filled, "trade"])
+
+
+def test_order_before_the_first_quote_waits_for_it():
+    rows = [(30, 100.0, 100.2, np.nan), (60, 100.0, 100.2, 99.9)]
+    replay = ExecutionReplay(_events(rows), **_patient())
+
+    report = replay.execute(T0, "BTC/USD", 1.0)
+    assert report["filled"] == 1.0
+    assert report["average_price"] == 100.0
+    (order,) = replay.engine.orders.values()
+    assert order["timestamp"] >= T0.value / 1e9 + 30
+
+
+def test_order_status_is_a_copy():
+    replay = ExecutionReplay(_events([(0, 100.0, 100.2, np.nan)]))
+    replay.engine.on_quote("BTC/USD", 0, 100.0, 1.0, 100.2, 1.0)
+    order_id = replay.broker.place_order("BTC/USD", "limit", 1.0, "buy", 99.0)["id"]
+
+    status = replay.broker.get_order_status(order_id)
+    status["status"] = "closed"
+    assert replay.engine.orders[order_id]["status"] == "open"
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.common import synthetic_ohlcv
+from data.candle_store import FIELDS
+from data.resample import TimeframeResampler, resample_ohlcv
+
+SYMBOLS = ("BTC/USD", "ETH/USD")
+
+
+def _expected(data, timeframe):
+    # pandas resample as the reference, only buckets with all their 5m bars
+    rules = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    freq = pd.Timedelta(timeframe.replace("m", "min"))
+    frames = []
+    for symbol, frame in data.groupby("symbol"):
+        grouped = frame.set_index("timestamp").resample(freq)
+        bars = grouped.agg(rules)[grouped.size() == freq // pd.Timedelta("5min")]
+        frames.append(bars.reset_index().assign(symbol=symbol))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize("timeframe", ["15m", "1h", "4h", "1d"])
+def test_incremental_matches_batch(timeframe):
+    data = synthetic_ohlcv(2 * 600, symbols=SYMBOLS, seed=1)
+    resampler = TimeframeResampler(timeframes=(timeframe,))
+
+    closed = []
+    for _, chunk in data.groupby(np.arange(len(data)) // 37):
+        bars = resampler.append(chunk)[timeframe]
+        if not bars.empty:
+            closed.append(bars)
+    closed = pd.concat(closed, ignore_index=True).sort_values(["symbol", "timestamp"], ignore_index=True)
+
+    expected = _expected(data, timeframe)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(closed[expected.columns], expected, check_dtype=False)
+    stored = resampler.to_frame(timeframe)
+    pd.testing.assert_frame_equal(stored[expected.columns], expected, check_dtype=False)
+
+    # the batch version keeps the forming bucket too
+    batch = resample_ohlcv(data, timeframe)
+    assert len(batch) >= len(expected)
+    pd.testing.assert_frame_equal(
+        batch.merge(expected[["timestamp", "symbol"]])[expected.columns], expected, check_dtype=False
+    )
+
+
+def test_bar_closes_with_its_last_base_bar_or_after_a_gap():
+    resampler = TimeframeResampler(timeframes=("15m",))
+    start = pd.Timestamp("2024-06-25")
+
+    def bars(*minutes):
+        return pd.DataFrame({
+            "timestamp": [start + pd.Timedelta(minutes=m) for m in minutes],
+            **{field: [float(m) for m in minutes] for field in FIELDS},
+            "symbol": "BTC/USD",
+        })
+
+    assert resampler.append(bars(0, 5))["15m"].empty
+    closed = resampler.append(bars(10))["15m"]
+    assert closed[["timestamp", "open", "high", "low", "close", "volume"]].values.tolist() == [
+        [start, 0.0, 10.0, 0.0, 10.0, 15.0]
+    ]
+    assert resampler.append(bars(10))["15m"].empty  # already seen
+
+    assert resampler.append(bars(15))["15m"].empty
+    closed = resampler.append(bars(35))["15m"]  # 20 and 25 never arrived
+    assert closed["timestamp"].tolist() == [start + pd.Timedelta(minutes=15)]
+    assert len(resampler.store("15m").get("BTC/USD")) == 2
+
+
+def test_timeframes_must_divide():
+    with pytest.raises(ValueError):
+        TimeframeResampler(base="1h", timeframes=("15m",))
+
+
+def test_closed_only_drops_the_forming_bucket():
+    data = synthetic_ohlcv(2 * 24, symbols=SYMBOLS, seed=2)  # 00:00 to 01:55
+    every = resample_ohlcv(data, "1h")
+    assert resample_ohlcv(data, "1h", closed_only=True).equals(every)
+
+    # the 01:55 bar not stored yet, whatever the time is
+    forming = data[data["timestamp"] < pd.Timestamp("2024-06-25 01:55")]
+    closed = resample_ohlcv(forming, "1h", closed_only=True)
+    assert closed["timestamp"].tolist() == [pd.Timestamp("2024-06-25")] * len(SYMBOLS)
+    pd.testing.assert_frame_equal(closed, every.merge(closed[["timestamp", "symbol"]])[closed.columns])
+
+
+def test_partial_bars_survive_a_restart():
+    data = synthetic_ohlcv(2 * 30, symbols=SYMBOLS, seed=3)
+    cutoff = pd.Timestamp("2024-06-25 00:25")  # inside the first hour
+    before, after = data[data["timestamp"] <= cutoff], data[data["timestamp"] > cutoff]
+
+    uninterrupted = TimeframeResampler(timeframes=("1h",))
+    uninterrupted.append(before)
+    expected = uninterrupted.append(after)["1h"]
+    assert len(expected) == 2 * len(SYMBOLS)
+
+    resampler = TimeframeResampler(timeframes=("1h",))
+    assert resampler.append(before)["1h"].empty
+    restored = TimeframeResampler(timeframes=("1h",))
+    restored.set_state(resampler.get_state())
+    pd.testing.assert_frame_equal(restored.append(data)["1h"], expected)  # old bars are not folded twice
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from execution.order_manager import OrderManager
+from execution.risk import RiskEngine
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_pnl_and_exposure_follow_fills_and_marks():
+    risk = RiskEngine(max_loss=None)
+    risk.on_fill("BTC/USD", 2.0, 100.0)
+    risk.on_fill("BTC/USD", 2.0, 110.0)
+    assert risk.position("BTC/USD") == 4.0
+    assert risk.unrealized_pnl == 4.0 * (110.0 - 105.0)
+
+    risk.on_mark("BTC/USD", 120.0)
+    risk.on_fill("ETH/USD", -1.0, 50.0)
+    assert risk.gross_exposure == 4.0 * 120.0 + 50.0
+
+    risk.on_fill("BTC/USD", -3.0, 120.0)
+    assert risk.realized_pnl == 3.0 * 15.0
+    risk.on_fill("BTC/USD", -2.0, 120.0)  # through flat to short 1 at 120
+    assert risk.realized_pnl == 4.0 * 15.0
+    assert risk.position("BTC/USD") == -1.0
+    risk.on_mark("BTC/USD", 130.0)
+    assert risk.unrealized_pnl == -10.0 + 0.0
+    assert risk.gross_exposure == 130.0 + 50.0
+
+
+def test_running_totals_match_a_full_recount():
+    rng = np.random.default_rng(0)
+    risk = RiskEngine(max_loss=None)
+    symbols = [f"C{i}/USD" for i in range(5)]
+    for _ in range(5000):
+        symbol = symbols[rng.integers(5)]
+        if rng.random() < 0.5:
+            risk.on_mark(symbol, float(rng.uniform(90, 110)))
+        else:
+            risk.on_fill(symbol, float(rng.normal(0, 2)), float(rng.uniform(90, 110)))
+
+    states = risk.symbols.values()
+    assert np.isclose(risk.gross_exposure, sum(abs(s.quantity) * s.mark for s in states))
+    assert np.isclose(risk.unrealized_pnl, sum(s.quantity * (s.mark - s.average_cost) for s in states))
+
+
+def test_order_checks():
+    clock = Clock()
+    risk = RiskEngine(max_loss=100, max_symbol_exposure=1000, max_gross_exposure=1500,
+                      max_orders_per_minute=3, clock=clock)
+    risk.on_fill("BTC/USD", 8.0, 100.0)
+
+    assert risk.check_order("BTC/USD", 3.0, "buy", 100.0) == "symbol_exposure"
+    assert risk.check_order("BTC/USD", 3.0, "sell") is None  # reduces exposure
+    assert risk.check_order("ETH/USD", 8.0, "buy", 100.0) == "gross_exposure"
+    assert risk.check_order("ETH/USD", 5.0, "buy", 100.0) is None
+    assert risk.check_order("ETH/USD", 1.0, "buy", 100.0) is None
+    assert risk.check_order("ETH/USD", 1.0, "buy", 100.0) == "order_rate"
+    clock.now = 61
+    assert risk.check_order("ETH/USD", 1.0, "buy", 100.0) is None
+
+    risk.on_mark("BTC/USD", 87.0)
+    assert risk.current_loss == 104.0
+    assert risk.should_stop()
+    assert risk.check_order("ETH/USD", 1.0, "sell", 100.0) == "max_loss"
+    assert risk.summary()["rejected"] == {
+        "symbol_exposure": 1, "gross_exposure": 1, "order_rate": 1, "max_loss": 1,
+    }
+
+
+def test_fills_from_order_manager():
+    risk = RiskEngine(max_loss=None)
+    order_manager = OrderManager(broker=None)
+    order_manager.fill_listeners.append(
+        lambda order, quantity, price: risk.on_fill(
+            order.symbol, quantity if order.side == "buy" else -quantity, price
+        )
+    )
+    order = order_manager.place_order("BTC/USD", 2.0, "buy")
+    order_manager.process_orders()
+    order_manager.apply_exchange_order(order, {"id": "a", "status": "open", "filled": 0.5, "average": 100.0})
+    order_manager.apply_exchange_order(order, {"id": "a", "status": "closed", "filled": 2.0, "average": 101.0})
+
+    assert risk.position("BTC/USD") == 2.0
+    assert order_manager.get_positions() == {"BTC/USD": 2.0}
+    # the listener gets the price of each part, not the running average
+    assert risk.symbols["BTC/USD"].average_cost == 101.0
+    assert order.average == 101.0
+
+
+def test_orders_reducing_a_position_pass_the_loss_limit():
+    clock = Clock()
+    risk = RiskEngine(max_loss=100, max_orders_per_minute=1, clock=clock)
+    risk.on_fill("BTC/USD", 4.0, 100.0)
+    risk.on_mark("BTC/USD", 70.0)
+    assert risk.should_stop()
+
+    assert risk.check_order("BTC/USD", 1.0, "buy") == "max_loss"
+    assert risk.check_order("BTC/USD", 5.0, "sell") == "max_loss"  # would go short
+    assert risk.check_order("BTC/USD", 1.0, "sell") is None
+    assert risk.check_order("BTC/USD", 3.0, "sell") is None  # past the order rate too
+
+
+def test_fill_needs_a_price():
+    risk = RiskEngine(max_loss=None)
+    with pytest.raises(ValueError):
+        risk.on_fill("BTC/USD", 1.0)
+    assert risk.position("BTC/USD") == 0.0
+    risk.on_mark("BTC/USD", 100.0)
+    risk.on_fill("BTC/USD", 1.0)
+    assert risk.symbols["BTC/USD"].average_cost == 100.0
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from benchmarks.common import synthetic_days
+from benchmarks.fakes import FakeAsyncBroker
+from data.bar_events import BarQueue
+from data.candle_store import CandleStore
+from execution.order_manager import OrderManager
+from execution.reconcile import OrderReconciler
+from runtime import (
+    BrokerGateway, GatewayBroker, SharedCandleStore, Supervisor, WorkerSpec, plan_workers, shard_symbols,
+)
+from runtime.supervisor import _read_connection
+
+
+@pytest.fixture
+def shared_store():
+    stores = []
+
+    def create(*args, **kwargs):
+        stores.append(SharedCandleStore(*args, **kwargs))
+        return stores[-1]
+
+    yield create
+    for store in stores:
+        store.close()
+        store.unlink()
+
+
+def test_shared_store_matches_candle_store(shared_store):
+    data = synthetic_days(3, 1)
+    symbols = sorted(data["symbol"].unique())
+    shared = shared_store(symbols + ["OTHER/USD"], retention=100)
+    local = CandleStore(retention=100)
+    # in chunks, so the rings wrap
+    data = data.sort_values("timestamp")
+    for start in range(0, len(data), 120):
+        chunk = data.iloc[start:start + 120]
+        assert shared.append(chunk) == local.append(chunk)
+    assert shared.append(data.iloc[:10]) == 0
+
+    since = {symbols[0]: data["timestamp"].iloc[-5], symbols[1]: None}
+    pd.testing.assert_frame_equal(shared.to_frame(symbols, since=since), local.to_frame(symbols, since=since))
+    pd.testing.assert_frame_equal(shared.to_frame(), local.to_frame(symbols))
+    assert shared.last_timestamp(symbols[2]) == local.last_timestamp(symbols[2])
+    assert shared.last_timestamp("OTHER/USD") is None
+    assert shared.append(data.assign(symbol="UNKNOWN/USD")) == 0
+    assert shared.get_state() is None
+
+
+def test_unpickled_store_attaches_to_the_same_memory(shared_store):
+    data = synthetic_days(2, 1)
+    store = shared_store(sorted(data["symbol"].unique()))
+    attached = pickle.loads(pickle.dumps(store))
+    assert not attached.owner and attached.to_frame().empty
+
+    store.append(data)
+    pd.testing.assert_frame_equal(attached.to_frame(), store.to_frame())
+    attached.close()
+
+
+def test_shards_cover_every_symbol_once():
+    symbols = [f"C{i}/USD" for i in range(10)]
+    shards = shard_symbols(symbols, 3)
+    assert sorted(sum(shards, [])) == sorted(symbols)
+    assert [len(shard) for shard in shards] == [4, 3, 3]
+    assert shard_symbols(symbols[:2], 3) == [["C0/USD"], ["C1/USD"]]
+
+    specs = plan_workers(symbols, {"fast": {"risk_target": 0.5, "account": "b"}, "slow": {}}, 2)
+    assert [spec.name for spec in specs] == ["fast-0", "fast-1", "slow-0", "slow-1"]
+    assert specs[0].params == {"risk_target": 0.5} and specs[0].account == "b"
+    assert specs[2].account == "default"
+
+
+def test_gateway_coalesces_shared_calls_and_raises_broker_errors():
+    async def run():
+        broker = FakeAsyncBroker(latency=0.05)
+        gateway = BrokerGateway(broker)
+        books = await asyncio.gather(*(gateway.call("get_orderbook_data", ("BTC/USD",)) for _ in range(3)))
+        assert books == [broker.bookdata] * 3
+        assert broker.calls["get_orderbook_data"] == 1
+
+        orders = await asyncio.gather(*(gateway.call("place_order", ("BTC/USD", "market", 1, "buy")) for _ in range(2)))
+        assert {order["id"] for order in orders} == {"1", "2"}
+        with pytest.raises(KeyError):
+            await gateway.call("get_order_status", ("missing",))
+        with pytest.raises(AttributeError):
+            await gateway.call("close", ())
+
+    asyncio.run(run())
+
+
+def test_gateway_broker_calls_over_its_connection():
+    async def run():
+        loop = asyncio.get_running_loop()
+        local, remote = multiprocessing.Pipe()
+        broker = GatewayBroker(local, timeout=5)
+        bar_events = BarQueue()
+        polls = asyncio.Queue()
+        stopped = asyncio.Event()
+        threading.Thread(
+            target=_read_connection, args=(local, loop, broker, bar_events, stopped.set, polls), daemon=True
+        ).start()
+
+        order = asyncio.create_task(broker.place_order("BTC/USD", "market", 1, "buy"))
+        assert await loop.run_in_executor(None, remote.recv) == (
+            "call", 1, "place_order", ("BTC/USD", "market", 1, "buy", None)
+        )
+        remote.send(("reply", 1, {"id": "7"}, None))
+        assert await order == {"id": "7"}
+
+        remote.send(("bars", ["BTC/USD"], 1000, 1.0))
+        assert (await bar_events.get()).symbols == {"BTC/USD"}
+        remote.send(("orders", [{"id": "7"}], [], 1.0))
+        assert await asyncio.wait_for(polls.get(), 5) == ([{"id": "7"}], [], 1.0)
+        # the worker stops when the supervisor goes away
+        remote.close()
+        await asyncio.wait_for(stopped.wait(), 5)
+
+    asyncio.run(run())
+
+
+def test_one_poll_per_account_reaches_every_worker_trading_it(tmp_path, shared_store):
+    broker, other = FakeAsyncBroker(), FakeAsyncBroker()
+    specs = [WorkerSpec("a", ["BTC/USD"]), WorkerSpec("b", ["ETH/USD"]), WorkerSpec("c", ["BTC/USD"], "other")]
+    supervisor = Supervisor(
+        specs, shared_store(["BTC/USD", "ETH/USD"]), {"default": broker, "other": other}, directory=str(tmp_path)
+    )
+    workers = {}
+    for name, worker in supervisor.workers.items():
+        worker.connection, workers[name] = multiprocessing.Pipe()
+
+    async def run():
+        # each worker's book, with one resting order of worker "b"
+        books = {name: OrderManager(broker) for name in ("a", "b")}
+        books["b"].place_order("ETH/USD", 1.0, "buy", price=100.0)
+        await books["b"].submit_orders(order_type="limit")
+        broker.fill("1", 0.4)
+
+        assert await supervisor.reconcilers["default"].reconcile() == 0
+        assert broker.calls["fetch_open_orders"] == broker.calls["fetch_my_trades"] == 1
+        assert not workers["c"].poll()
+        for name, book in books.items():
+            message = workers[name].recv()
+            assert message[0] == "orders"
+            await OrderReconciler(book, broker).apply(*message[1:])
+        assert books["a"].get_positions() == {}
+        assert books["b"].get_positions() == {"ETH/USD": 0.4}
+        assert broker.calls.get("get_order_status", 0) == 0
+
+    asyncio.run(run())
+    assert set(supervisor.reconcilers) == {"default", "other"}
+
+
+def test_supervisor_trades_and_restarts_crashed_and_stalled_workers(tmp_path, shared_store):
+    data = synthetic_days(4, 3)
+    symbols = sorted(data["symbol"].unique())
+    store = shared_store(symbols)
+    timestamps = data["timestamp"].drop_duplicates().sort_values()
+    store.append(data[data["timestamp"] < timestamps.iloc[-1]])
+    broker = FakeAsyncBroker()
+    supervisor = Supervisor(
+        plan_workers(symbols, {"s": {"max_loss": 1e9}}, 2), store, {"default": broker},
+        directory=str(tmp_path), check_interval=0.05, restart_backoff=0.0,
+    )
+    first, second = supervisor.workers.values()
+
+    async def wait_for(condition, timeout=60):
+        deadline = time.time() + timeout
+        while not condition():
+            assert time.time() < deadline
+            await asyncio.sleep(0.05)
+
+    def cycles(worker):
+        with open(tmp_path / f"{worker.spec.name}.metrics.json") as file:
+            return json.load(file)["timers"]["cycle"]["count"]
+
+    async def run():
+        running = asyncio.create_task(supervisor.run())
+        await wait_for(lambda: all((tmp_path / f"{name}.snapshot").exists() for name in supervisor.workers))
+
+        # a bar close reaches the workers trading the symbols
+        last_bar = data[data["timestamp"] == timestamps.iloc[-1]]
+        store.append(last_bar)
+        supervisor.publish(last_bar)
+        await wait_for(lambda: all(cycles(worker) == 2 for worker in supervisor.workers.values()))
+
+        pid = first.process.pid
+        os.kill(pid, signal.SIGKILL)
+        await wait_for(lambda: first.process is not None and first.process.pid != pid)
+
+        # every heartbeat is older than a negative timeout: both event loops count as stuck.
+        # The run loop's next check is an hour away, so only this one sees the timeout
+        supervisor.check_interval = 3600
+        await asyncio.sleep(0.2)
+        pids = [worker.process.pid for worker in (first, second)]
+        supervisor.heartbeat_timeout = -1
+        await supervisor.check()
+        supervisor.heartbeat_timeout = 30
+        await supervisor.check()  # restarts them, there is no backoff
+        await wait_for(lambda: all(
+            worker.process is not None and worker.process.pid != pid for worker, pid in zip((first, second), pids)
+        ))
+        assert first.restarts == 2 and second.restarts == 1
+
+        supervisor.stop()
+        await running
+
+    asyncio.run(run())
+    assert all(worker.process is None and not worker.finished for worker in supervisor.workers.values())
+    assert broker.calls["place_order"] > 0
@@ -0,0 +1,194 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeAsyncBroker
+from execution.scheduler import ExecutionScheduler, TimerWheel
+
+
+def test_timer_wheel_orders_and_wraps():
+    wheel = TimerWheel(resolution=1.0, size=4)
+    assert wheel.advance(0.0) == []
+    wheel.schedule("a", 1.5)
+    wheel.schedule("b", 6.2)  # more than one lap ahead
+    wheel.schedule("c", 0.0)  # already due, runs on the next tick
+
+    assert wheel.advance(1.0) == ["c"]
+    assert wheel.advance(1.9) == []
+    assert wheel.advance(2.0) == ["a"]
+    assert wheel.advance(6.9) == []
+    assert wheel.advance(7.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def _scheduler(broker):
+    scheduler = ExecutionScheduler(broker, tick=0.01)
+    for symbol in list(scheduler.algos) + [f"C{i}/USD" for i in range(5)]:
+        algo = scheduler.get_algo(symbol)
+        algo.passive_time_limit = 0.03
+        algo.total_time_limit = 0.08
+    return scheduler
+
+
+async def _work(scheduler, trades):
+    runner = asyncio.create_task(scheduler.run())
+    tasks = [scheduler.submit(symbol, trade) for symbol, trade in trades]
+    await asyncio.gather(*(task.done for task in tasks))
+    scheduler.stop()
+    await runner
+    return tasks
+
+
+def test_many_orders_share_book_fetches():
+    broker = FakeAsyncBroker()
+    # always aggressive: adverse move check is true whenever offer > bid
+    broker.bookdata["best_offer"] = broker.bookdata["best_bid"]
+    scheduler = _scheduler(broker)
+    trades = [(f"C{i % 5}/USD", 1.0 if i % 2 else -1.0) for i in range(100)]
+
+    tasks = asyncio.run(_work(scheduler, trades))
+
+    assert all(task.status == "expired" for task in tasks)
+    ticks = broker.calls["get_orderbook_data"] / 5
+    # one book request per symbol per tick, not per order
+    assert broker.calls["get_orderbook_data"] < len(trades) * ticks / 10
+    metrics = scheduler.metrics()
+    assert metrics["completed"] == {"expired": 100}
+    assert metrics["order_latency"]["count"] == 100
+    assert metrics["active"] == 0
+
+
+def test_fills_are_timed():
+    broker = FakeAsyncBroker(fill_after=0.02)
+    broker.bookdata["best_offer"] = broker.bookdata["best_bid"]
+    scheduler = _scheduler(broker)
+
+    tasks = asyncio.run(_work(scheduler, [("C1/USD", 2.0), ("C2/USD", -2.0)]))
+
+    assert [task.status for task in tasks] == ["filled", "filled"]
+    assert all(task.orders_placed == 1 for task in tasks)
+    fill_time = scheduler.metrics()["fill_time"]
+    assert fill_time["count"] == 2
+    assert 0.02 <= fill_time["p50"] < 0.08
+
+
+def test_latency_history_is_bounded():
+    broker = FakeAsyncBroker(fill_after=0.0)
+    broker.bookdata["best_offer"] = broker.bookdata["best_bid"]
+    scheduler = ExecutionScheduler(broker, tick=0.01, history=3)
+
+    asyncio.run(_work(scheduler, [(f"C{i}/USD", 1.0) for i in range(5)]))
+
+    metrics = scheduler.metrics()
+    assert metrics["completed"] == {"filled": 5}
+    assert metrics["order_latency"]["count"] == metrics["fill_time"]["count"] == 3
+
+
+class FlakyBroker(FakeAsyncBroker):
+    """Raises on the first `failures[method]` calls of a method."""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = dict(failures)
+
+    async def _call(self, name):
+        await super()._call(name)
+        if self.failures.get(name, 0) > 0:
+            self.failures[name] -= 1
+            raise ConnectionError(f"{name} failed")
+
+
+def test_broker_errors_are_retried():
+    broker = FlakyBroker({"get_orderbook_data": 2, "place_order": 1, "get_order_status": 1}, fill_after=0.02)
+    broker.bookdata["best_offer"] = broker.bookdata["best_bid"]
+    scheduler = _scheduler(broker)
+    for algo in scheduler.algos.values():
+        algo.total_time_limit = 1.0
+
+    tasks = asyncio.run(_work(scheduler, [("C1/USD", 1.0)]))
+
+    assert tasks[0].status == "filled" and tasks[0].filled == 1.0
+    assert tasks[0].errors == 0
+
+
+def test_tasks_finish_as_error_when_the_broker_keeps_failing():
+    broker = FlakyBroker({"place_order": 100})
+    broker.bookdata["best_offer"] = broker.bookdata["best_bid"]
+    scheduler = _scheduler(broker)
+    scheduler.max_retries = 2
+    for algo in scheduler.algos.values():
+        algo.passive_time_limit = algo.total_time_limit = 10.0
+
+    tasks = asyncio.run(asyncio.wait_for(_work(scheduler, [("C1/USD", 1.0), ("C2/USD", -1.0)]), 5))
+
+    assert [task.status for task in tasks] == ["error", "error"]
+    assert all(isinstance(task.error, ConnectionError) for task in tasks)
+    assert broker.calls["place_order"] == 2 * 3
+    assert scheduler.metrics()["active"] == 0
+
+
+class PartialFillBroker(FakeAsyncBroker):
+    """Fills 40% of every limit order as soon as it is placed."""
+
+    async def place_order(self, symbol, order_type, amount, side, price=None):
+        order = await super().place_order(symbol, order_type, amount, side, price)
+        self.fill(order["id"], 0.4 * amount)
+        return order
+
+
+def test_partial_fills_are_kept_and_replacements_sized_to_the_rest():
+    broker = PartialFillBroker()  # offer > bid: aggressive, an order replaced every tick
+    scheduler = _scheduler(broker)
+
+    (task,) = asyncio.run(_work(scheduler, [("C1/USD", -1.0)]))
+
+    amounts = [order["amount"] for order in broker.orders.values()]
+    assert len(amounts) > 2
+    assert amounts == pytest.approx([0.6 ** i for i in range(len(amounts))])
+    assert task.status == "expired"
+    assert task.filled == pytest.approx(1 - 0.6 ** len(amounts))
+    assert 100.0 <= task.average <= 100.1
+
+
+def test_stop_cancels_working_orders():
+    broker = FakeAsyncBroker()
+    broker.bookdata["best_offer"] = broker.bookdata["best_bid"]
+    scheduler = ExecutionScheduler(broker, tick=0.01)
+    updates = []
+
+    async def run():
+        runner = asyncio.create_task(scheduler.run())
+        task = scheduler.submit("C1/USD", 1.0, on_update=lambda task: updates.append((task.order_id, task.filled)))
+        while task.order_id is None:
+            await asyncio.sleep(0.01)
+        order_id = task.order_id
+        broker.fill(order_id, 0.25)
+        scheduler.stop()
+        await runner
+        return task, order_id
+
+    task, order_id = asyncio.run(run())
+    assert task.done.done() and task.status == "expired"
+    assert broker.cancelled == [order_id]
+    assert task.filled == 0.25
+    assert updates == [(order_id, 0.0), (order_id, 0.25)]
+
+
+class UnpricedBroker(FakeAsyncBroker):
+    """Order statuses without a price or an average, like some exchanges' fills."""
+
+    async def get_order_status(self, order_id):
+        order = await super().get_order_status(order_id)
+        order.pop("price")
+        return order
+
+
+def test_fills_without_a_price_are_not_booked_at_zero():
+    broker = UnpricedBroker(fill_after=0.02)
+    broker.bookdata["best_offer"] = broker.bookdata["best_bid"]
+    scheduler = _scheduler(broker)
+
+    (task,) = asyncio.run(_work(scheduler, [("C1/USD", 1.0)]))
+
+    assert task.status == "filled" and task.filled == 1.0
+    assert task.notional == 0.0 and task.average is None
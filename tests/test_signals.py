@@ -0,0 +1,43 @@
+import os
+import warnings
+
+import pandas as pd
+
+from benchmarks.bench_signals import legacy_generate_signals
+from benchmarks.common import synthetic_ohlcv
+from signals.smart_money import generate_signals
+
+
+def test_generate_signals_matches_legacy_loop():
+    data = synthetic_ohlcv(3000, seed=1)
+    data["timestamp"] = data["timestamp"].astype(str)  # as read back from the csv
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected_data, expected = legacy_generate_signals(data.copy())
+    result_data, result = generate_signals(data.copy())
+
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(result_data, expected_data)
+
+
+def test_generate_signals_on_stored_csv():
+    data = pd.read_csv(
+        os.path.join(os.path.dirname(__file__), "..", "data", "ohlcv_2024-06-25.csv")
+    )
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        _, expected = legacy_generate_signals(data.copy())
+    _, result = generate_signals(data.copy())
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_generate_signals_without_signals():
+    data = synthetic_ohlcv(50)  # too short for SMA100, every phase is neutral
+    _, result = generate_signals(data)
+
+    assert list(result.columns) == ["timestamp", "symbol", "signal", "price"]
+    assert result.empty
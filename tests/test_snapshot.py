@@ -0,0 +1,91 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.common import synthetic_ohlcv
+from data.candle_store import CandleStore
+from execution.order_manager import OrderManager
+from execution.risk import RiskEngine
+from signals.incremental import IncrementalSignalEngine
+from utils.snapshot import read_snapshot, write_snapshot
+
+
+def test_arrays_are_mapped_copy_on_write(tmp_path):
+    path = tmp_path / "state.snapshot"
+    values = np.arange(1000.0).reshape(200, 5)
+    write_snapshot(path, {"values": values, "strided": values[:, 1], "meta": {"n": 3}})
+
+    state = read_snapshot(path)
+    np.testing.assert_array_equal(state["values"], values)
+    np.testing.assert_array_equal(state["strided"], values[:, 1])
+    assert state["meta"] == {"n": 3}
+    state["values"][0, 0] = -1.0
+    assert read_snapshot(path)["values"][0, 0] == 0.0
+
+    (tmp_path / "other").write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError):
+        read_snapshot(tmp_path / "other")
+
+
+def test_restart_resumes_where_it_stopped(tmp_path):
+    data = synthetic_ohlcv(3000, symbols=("BTC/USD", "ETH/USD"), seed=6)
+    cutoff = data["timestamp"].quantile(0.7)
+    before, after = data[data["timestamp"] <= cutoff], data[data["timestamp"] > cutoff]
+
+    uninterrupted = IncrementalSignalEngine()
+    uninterrupted.update(before)
+    expected = uninterrupted.update(after)
+
+    store = CandleStore(retention=500)
+    store.append(before)
+    engine = IncrementalSignalEngine()
+    engine.update(before)
+    order_manager = OrderManager(broker=None)
+    order_manager.positions["BTC/USD"] = 1.5
+    working = order_manager.place_order("ETH/USD", 2.0, "sell", price=101.0)
+    order_manager.transition(working, "open", exchange_id="x1", filled=0.5)
+    risk = RiskEngine()
+    risk.on_fill("BTC/USD", 1.5, 100.0)
+
+    path = tmp_path / "state.snapshot"
+    write_snapshot(path, {
+        "candles": store.get_state(), "engine": engine.get_state(),
+        "orders": order_manager.get_state(), "risk": risk.get_state(),
+    })
+    state = read_snapshot(path)
+
+    restored_store = CandleStore(retention=500)
+    restored_store.set_state(state["candles"])
+    pd.testing.assert_frame_equal(restored_store.to_frame(), store.to_frame())
+    restored_store.append(after)
+    assert len(restored_store.get("BTC/USD")) == 500
+
+    restored = IncrementalSignalEngine()
+    restored.set_state(state["engine"])
+    pd.testing.assert_frame_equal(restored.update(after), expected)
+    assert restored.latest.get("BTC/USD", "atr") == uninterrupted.latest.get("BTC/USD", "atr")
+
+    restored_orders = OrderManager(broker=None)
+    restored_orders.set_state(state["orders"])
+    order = restored_orders.get_by_exchange_id("x1")
+    assert order.id == working.id and order.status == "open" and order.filled == 0.5
+    assert restored_orders.get_orders("ETH/USD", status="open") == [order]
+    assert restored_orders.place_order("BTC/USD", 1.0, "buy").id == working.id + 1
+    assert restored_orders.net_position("BTC/USD") == 2.5
+
+    restored_risk = RiskEngine()
+    restored_risk.set_state(state["risk"])
+    assert restored_risk.position("BTC/USD") == 1.5
+    assert restored_risk.check_order("BTC/USD", 1.0, "buy", 100.0) is None
+
+
+def test_exchange_clients_are_imported_lazily():
+    code = "import sys, broker, data, execution, signals; print('ccxt' in sys.modules or 'aiohttp' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=Path(__file__).parents[1], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+from benchmarks.common import synthetic_ohlcv
+from data.storage import CsvStorage, NpyStorage
+from signals.smart_money import load_data
+
+
+def _two_days():
+    # 576 5m bars per symbol: 2024-06-25 and 2024-06-26
+    return synthetic_ohlcv(2 * 576, seed=10)
+
+
+def test_npy_range_query_across_midnight(tmp_path):
+    data = _two_days()
+    storage = NpyStorage(str(tmp_path))
+    storage.write(data)
+
+    start, end = pd.Timestamp("2024-06-25 22:00"), pd.Timestamp("2024-06-26 02:00")
+    result = storage.load(["ETH/USD"], start, end)
+
+    mask = (data["symbol"] == "ETH/USD") & data["timestamp"].between(start, end)
+    pd.testing.assert_frame_equal(result, data[mask].reset_index(drop=True))
+    assert sorted(p.name for p in (tmp_path / "ohlcv" / "ETH-USD").iterdir() if p.is_dir()) == [
+        "2024-06-25", "2024-06-26"
+    ]
+
+
+def test_npy_appends_and_dedupes(tmp_path):
+    data = _two_days()
+    storage = NpyStorage(str(tmp_path))
+    for start in range(0, len(data), 100):
+        storage.write(data.iloc[start:start + 150])  # overlapping batches
+
+    result = storage.load(start="2024-06-25", end="2024-06-27")
+    expected = data.sort_values(["symbol", "timestamp"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected)
+    assert storage.list_symbols() == ["BTC/USD", "ETH/USD"]
+
+
+@pytest.mark.parametrize("backend", ["csv", "npy"])
+def test_load_data_backends_agree(tmp_path, backend):
+    data = synthetic_ohlcv(400, seed=11)
+    storage = CsvStorage(str(tmp_path)) if backend == "csv" else NpyStorage(str(tmp_path))
+    storage.write(data)
+
+    result = load_data(str(tmp_path), ["BTC/USD"], "2024-06-25", "2024-06-25 12:00", backend=backend)
+
+    mask = (data["symbol"] == "BTC/USD") & (data["timestamp"] <= "2024-06-25 12:00")
+    pd.testing.assert_frame_equal(
+        result.reset_index(drop=True), data[mask].reset_index(drop=True), check_dtype=False
+    )
+
+
+def test_csv_files_rows_by_bar_date(tmp_path):
+    data = _two_days()
+    storage = CsvStorage(str(tmp_path))
+    storage.write(data)
+
+    assert sorted(p.name for p in tmp_path.glob("*.csv")) == ["ohlcv_2024-06-25.csv", "ohlcv_2024-06-26.csv"]
+    result = storage.load(start="2024-06-26", end="2024-06-26 23:59")
+    expected = data[data["timestamp"] >= "2024-06-26"].reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_npy_symbols_with_dashes_round_trip(tmp_path):
+    data = synthetic_ohlcv(10, symbols=("BTC-PERP/USD", "ETH/USD", "X%2D/USD"), seed=12)
+    storage = NpyStorage(str(tmp_path))
+    storage.write(data)
+
+    assert storage.list_symbols() == ["BTC-PERP/USD", "ETH/USD", "X%2D/USD"]
+    assert (tmp_path / "ohlcv" / "ETH-USD").is_dir()  # plain symbols keep their directory name
+    result = storage.load(["BTC-PERP/USD"], start="2024-06-25", end="2024-06-26")
+    assert len(result) and set(result["symbol"]) == {"BTC-PERP/USD"}
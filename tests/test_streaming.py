@@ -0,0 +1,124 @@
+import asyncio
+
+from aiohttp import web
+
+from broker.coinbase import CoinbaseBroker
+from data.candle_store import CandleStore
+from data.streaming import CandleBuilder, LocalOrderBook, StreamingMarketData
+
+MINUTE = 60_000
+
+
+def test_order_book_top_follows_updates():
+    book = LocalOrderBook()
+    for price, size in ((100.0, 1.0), (101.0, 2.0), (99.0, 3.0)):
+        book.update("bid", price, size)
+    book.update("offer", 102.0, 4.0)
+    assert book.get_top() == {
+        "best_bid": 101.0, "best_bid_size": 2.0, "best_offer": 102.0, "best_offer_size": 4.0
+    }
+
+    book.update("bid", 101.0, 0.0)
+    book.update("offer", 101.5, 1.0)
+    assert book.get_top()["best_bid"] == 100.0
+    assert book.get_top()["best_offer"] == 101.5
+
+
+def test_candles_from_trades():
+    builder = CandleBuilder("BTC/USD", MINUTE)
+    assert builder.add_trade(10_000, 100.0, 1.0) is None
+    assert builder.add_trade(20_000, 103.0, 1.0) is None
+    assert builder.add_trade(30_000, 99.0, 2.0) is None
+    assert builder.add_trade(MINUTE + 1, 101.0, 1.0) == [0, 100.0, 103.0, 99.0, 99.0, 4.0]
+    assert builder.flush(2 * MINUTE - 1) is None
+    assert builder.flush(2 * MINUTE) == [MINUTE, 101.0, 101.0, 101.0, 101.0, 1.0]
+
+
+def test_late_trades_after_flush_are_dropped():
+    builder = CandleBuilder("BTC/USD", MINUTE)
+    builder.add_trade(10_000, 100.0, 1.0)
+    assert builder.flush(MINUTE) == [0, 100.0, 100.0, 100.0, 100.0, 1.0]
+    # a late trade for the closed bucket must not reopen it and close it a second time
+    assert builder.add_trade(50_000, 90.0, 5.0) is None
+    assert builder.add_trade(MINUTE + 1, 101.0, 1.0) is None
+    assert builder.add_trade(2 * MINUTE, 102.0, 1.0) == [MINUTE, 101.0, 101.0, 101.0, 101.0, 1.0]
+
+
+def _messages():
+    l2 = [
+        {"type": "snapshot", "product_id": "BTC-USD", "updates": [
+            {"side": "bid", "price_level": "100.0", "new_quantity": "1.5"},
+            {"side": "bid", "price_level": "99.5", "new_quantity": "2"},
+            {"side": "offer", "price_level": "100.5", "new_quantity": "0.7"},
+        ]},
+    ]
+    update = [{"type": "update", "product_id": "BTC-USD", "updates": [
+        {"side": "bid", "price_level": "100.0", "new_quantity": "0"},
+    ]}]
+    trades = [{"type": "update", "trades": [
+        {"product_id": "BTC-USD", "price": str(p), "size": "1", "time": t}
+        for p, t in ((100.2, "2024-06-25T00:00:05Z"), (100.4, "2024-06-25T00:00:50Z"),
+                     (100.1, "2024-06-25T00:01:10.123456789Z"))
+    ]}]
+    return [
+        {"channel": "l2_data", "sequence_num": 0, "events": l2},
+        {"channel": "market_trades", "sequence_num": 1, "events": trades},
+        {"channel": "l2_data", "sequence_num": 2, "events": update},
+    ]
+
+
+async def _serve(subscriptions):
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        for _ in range(3):
+            subscriptions.append((await ws.receive_json())["channel"])
+        # malformed messages are skipped without ending the stream
+        await ws.send_str("{not json")
+        await ws.send_json({"channel": "l2_data", "events": [{"product_id": "BTC-USD"}]})
+        for message in _messages():
+            await ws.send_json(message)
+        await asyncio.sleep(0.5)
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"ws://127.0.0.1:{port}/"
+
+
+def test_stream_against_local_websocket():
+    subscriptions = []
+    store = CandleStore()
+
+    async def run():
+        runner, url = await _serve(subscriptions)
+        stream = StreamingMarketData(["BTC/USD"], url=url, candle_store=store, clock=lambda: 0)
+        broker = CoinbaseBroker("key", "secret", market_data=stream)
+        task = asyncio.create_task(stream.start())
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            top = stream.get_orderbook_data("BTC/USD")
+            if top and top["best_bid"] == 99.5:
+                break
+        bookdata = broker.get_orderbook_data("BTC/USD")
+        stream.stop()
+        await task
+        await runner.cleanup()
+        return bookdata
+
+    bookdata = asyncio.run(run())
+    assert sorted(subscriptions) == ["heartbeats", "level2", "market_trades"]
+    assert bookdata == {
+        "best_bid": 99.5, "best_bid_size": 2.0, "best_offer": 100.5, "best_offer_size": 0.7
+    }
+    candles = store.get("BTC/USD")
+    assert len(candles) == 1
+    assert candles.iloc[0][["open", "high", "low", "close", "volume"]].tolist() == [
+        100.2, 100.4, 100.2, 100.4, 2.0
+    ]
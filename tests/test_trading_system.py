@@ -0,0 +1,190 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.common import synthetic_ohlcv
+from benchmarks.fakes import FakeAsyncBroker, FakeExchange
+from data.candle_store import CandleStore
+from data.market_data_feed import MarketDataFeed
+from data.resample import TimeframeResampler
+from execution.order_manager import OrderManager
+from execution.reconcile import OrderReconciler
+from execution.risk import RiskEngine
+from execution.scheduler import ExecutionScheduler
+from main import TradingSystem
+from signals.incremental import IncrementalSignalEngine
+from utils.snapshot import read_snapshot, write_snapshot
+
+
+def _system(tmp_path, broker=None, market_data_feed=None, **kwargs):
+    broker = broker or FakeAsyncBroker()
+    return TradingSystem(
+        broker, OrderManager(broker), market_data_feed, ["BTC/USD"], log_file=str(tmp_path / "trading_system.log"),
+        metrics_file="", state_file="", **kwargs,
+    )
+
+
+async def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_restore_drops_only_orders_that_never_reached_the_exchange(tmp_path):
+    broker = FakeAsyncBroker()
+    system = _system(tmp_path, broker)
+    manager = system.order_manager
+    manager.positions["BTC/USD"] = 0.0
+    unsent = manager.place_order("BTC/USD", 1.0, "buy")
+    manager.process_orders()
+    resting = manager.place_order("BTC/USD", 2.0, "sell", price=101.0)
+    manager.transition(resting, "open", exchange_id="x1", filled=0.5)
+    # worked by the scheduler: 0.5 filled by a first order, 0.25 so far by its replacement
+    worked = manager.place_order("BTC/USD", 2.0, "buy")
+    manager.process_orders()
+    for amount in (2.0, 1.5):
+        asyncio.run(broker.place_order("BTC/USD", "limit", amount, "buy", 100.0))
+    broker.fill("1", 0.5)
+    broker.fill("2", 0.25)
+    worked.filled_before = 0.5
+    manager.transition(worked, "open", exchange_id="2", filled=0.75, price=100.0)
+    path = str(tmp_path / "state.snapshot")
+    system.save_state(path)
+    broker.fill("2", 0.5)  # while the system was down
+
+    restored = _system(tmp_path, broker)
+    assert restored.restore_state(path)
+    orders = restored.order_manager
+    assert orders.get_order(unsent.id) is None
+    assert [order.id for order in orders.get_orders()] == [resting.id, worked.id]
+    assert orders.get_by_exchange_id("x1").filled == 0.5
+    assert orders.net_position("BTC/USD") == 0.0  # 0.5 sold and 1.5 to sell, 0.75 bought and 1.25 to buy
+
+    reconciler = OrderReconciler(orders, broker)
+    assert asyncio.run(reconciler.cancel_worked()) == 1
+    assert broker.cancelled == ["2"]
+    restored_worked = orders.get_executed_orders()[-1]
+    assert restored_worked.id == worked.id and restored_worked.status == "canceled"
+    assert restored_worked.filled == 1.25 and restored_worked.average == 100.0
+    assert orders.positions["BTC/USD"] == 0.75  # 1.25 bought, 0.5 sold
+    assert [order.id for order in orders.get_orders()] == [resting.id]
+
+
+def test_restore_keeps_the_forming_higher_timeframe_bar(tmp_path):
+    data = synthetic_ohlcv(24, symbols=("BTC/USD",), seed=4)  # 00:00 to 01:55
+    cutoff = pd.Timestamp("2024-06-25 01:25")
+    before, after = data[data["timestamp"] <= cutoff], data[data["timestamp"] > cutoff]
+
+    def system():
+        resampler = TimeframeResampler(timeframes=("1h",))
+        feed = MarketDataFeed(
+            "key", "secret", str(tmp_path / "data"), candle_store=CandleStore(), storage="npy",
+            on_candles=resampler.append,
+        )
+        return _system(tmp_path, candle_store=resampler.store("1h"), resampler=resampler, market_data_feed=feed)
+
+    running = system()
+    running.market_data_feed.store_data(before, "ohlcv")
+    running.resampler.append(before)
+    path = str(tmp_path / "state.snapshot")
+    running.save_state(path)
+
+    restored = system()
+    assert restored.restore_state(path)
+    pd.testing.assert_frame_equal(restored.market_data_feed.candle_store.to_frame(), before, check_like=True)
+    closed = restored.resampler.append(after)["1h"]
+    assert closed["timestamp"].tolist() == [pd.Timestamp("2024-06-25 01:00")]
+    assert closed["open"].iloc[0] == before["open"].iloc[12]
+    assert closed["volume"].iloc[0] == pytest.approx(data["volume"].iloc[12:].sum())
+
+
+def test_scheduler_fills_reach_positions_and_risk_as_they_happen(tmp_path):
+    broker = FakeAsyncBroker()
+
+    async def run():
+        scheduler = ExecutionScheduler(broker, tick=0.01)
+        algo = scheduler.get_algo("BTC/USD")
+        algo.passive_time_limit = algo.total_time_limit = 10
+        system = _system(
+            tmp_path, broker, candle_store=CandleStore(), execution_scheduler=scheduler,
+            risk_engine=RiskEngine(max_loss=None),
+        )
+        manager = system.order_manager
+        running = asyncio.create_task(scheduler.run())
+
+        order = manager.place_order("BTC/USD", 2.0, "buy")
+        await system.generate_and_execute_signals()  # main's path: submitted to the scheduler
+        assert order.status == "submitted"
+        await _wait_for(lambda: order.exchange_id == "1")  # follows the exchange order worked
+        limit_price = broker.orders["1"]["price"]
+
+        broker.fill("1", 0.5)
+        await _wait_for(lambda: order.filled == 0.5)
+        assert order.status == "open" and order.average == limit_price
+        assert manager.positions["BTC/USD"] == 0.5
+        assert system.risk_engine.position("BTC/USD") == 0.5
+        assert manager.net_position("BTC/USD") == 2.0
+
+        # the rest, on whichever order the scheduler is working now
+        await _wait_for(lambda: any(placed["status"] == "open" for placed in broker.orders.values()))
+        broker.fill(next(key for key, placed in broker.orders.items() if placed["status"] == "open"))
+        await _wait_for(lambda: order.status == "filled")
+        assert manager.get_executed_orders() == [order]
+        assert manager.positions["BTC/USD"] == 2.0
+        assert system.risk_engine.position("BTC/USD") == 2.0
+        scheduler.stop()
+        await running
+
+    asyncio.run(run())
+
+
+def test_indicators_restart_after_a_data_gap(tmp_path, monkeypatch):
+    day = pd.Timestamp("2024-06-25").value // 1_000_000
+    five_min = 5 * 60_000
+    now = day + 200 * five_min + 1000
+    monkeypatch.setattr("data.market_data_feed.now_ms", lambda: now)
+    store = CandleStore()
+    feed = MarketDataFeed(
+        "key", "secret", str(tmp_path / "data"), candle_store=store, storage="npy",
+        exchange_factory=lambda: FakeExchange(now, missing=[day + 100 * five_min]), rate_limit=1000,
+    )
+    system = _system(tmp_path, candle_store=store, market_data_feed=feed)
+    feed.on_gap = system.on_data_gap
+    feed.high_water_marks.update("BTC/USD", day - five_min)
+
+    async def run():
+        await feed.backfill(["BTC/USD"])
+        await system.generate_and_execute_signals()
+
+    asyncio.run(run())
+    engine = system.signal_engine
+    assert engine.last_timestamps()["BTC/USD"] == pd.Timestamp(day + 199 * five_min, unit="ms")
+    # only the 99 bars after the hole: too few for SMA100, the one before it is gone
+    assert np.isnan(engine.latest.get("BTC/USD", "SMA100"))
+    after_gap = IncrementalSignalEngine()
+    after_gap.update(store.get("BTC/USD").iloc[100:])
+    assert engine.latest.get("BTC/USD", "atr") == after_gap.latest.get("BTC/USD", "atr")
+
+
+def test_restore_resets_indicators_the_candles_cannot_continue(tmp_path):
+    data = synthetic_ohlcv(2 * 200, symbols=("BTC/USD", "ETH/USD"), seed=7)
+    system = _system(tmp_path, candle_store=CandleStore())
+    system.signal_engine.update(data)
+    path = str(tmp_path / "state.snapshot")
+    system.save_state(path)
+
+    # the stored candles resume an hour after the engine's last bar, and ETH/USD is no longer traded
+    later = data[data["symbol"] == "BTC/USD"].tail(6).copy()
+    later["timestamp"] += pd.Timedelta(hours=1)
+    store = CandleStore()
+    store.append(later)
+    write_snapshot(path, {**read_snapshot(path), "candle_store": store.get_state()})
+    restored = _system(tmp_path, candle_store=CandleStore())
+    restored.symbols = ["BTC/USD"]
+    assert restored.restore_state(path)
+    assert restored.signal_engine.last_timestamps() == {}
+    assert np.isnan(restored.signal_engine.latest.get("BTC/USD", "atr"))
@@ -1,3 +1,4 @@
 from .logger import setup_logger
+from .metrics import Metrics, SamplingProfiler, metrics
 
-__all__ = ["setup_logger"]
+__all__ = ["setup_logger", "Metrics", "SamplingProfiler", "metrics"]
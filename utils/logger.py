@@ -1,14 +1,227 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
 
+from .metrics import metrics
 
-def setup_logger(name, log_file, level=logging.INFO):
-    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+# Logging off the trading thread: handlers only put the record on a queue, a
+# writer thread per file formats the records (so "%s" arguments such as
+# DataFrames are rendered there, not by the caller), writes them in batches
+# and rotates the file by size. A full queue drops the record instead of
+# blocking and counts it as "log.dropped".
+#
+# The caller may change an argument before the writer gets to it, so the
+# handler takes a snapshot: immutable values are kept, objects with a copy()
+# method (DataFrames, arrays, dicts, lists) are copied and still rendered on
+# the writer thread, anything else is rendered on the spot.
 
-    handler = logging.FileHandler(log_file)
-    handler.setFormatter(formatter)
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+IMMUTABLE = (str, bytes, int, float, complex, bool, type(None), tuple, frozenset)
 
+_writers = {}
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra={...}` fields."""
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self.RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LogWriter:
+    """
+    Background thread writing the records of one file.
+
+    :param log_file: path, rotated to log_file.1 .. log_file.<backup_count>
+    :param max_bytes: rotate once the file would grow past this, 0 never rotates
+    :param batch_size: most records formatted and written per write call
+    :param queue_size: records waiting before new ones are dropped
+    """
+
+    def __init__(self, log_file, formatter, max_bytes=50 << 20, backup_count=5,
+                 batch_size=512, queue_size=100_000):
+        self.log_file = log_file
+        self.formatter = formatter
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.queue = queue.Queue(queue_size)
+        self.stream = open(log_file, "a", encoding="utf-8")
+        self.size = self.stream.tell()
+        self.thread = threading.Thread(target=self._run, name=f"log-writer {log_file}", daemon=True)
+        self.thread.start()
+
+    def put(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.count("log.dropped")
+
+    def _format(self, record):
+        try:
+            return self.formatter.format(record) + "\n"
+        except Exception:
+            return f"{record.levelname} unformattable record: {record.msg!r}\n"
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            waiters = []
+            for item in batch:
+                if isinstance(item, logging.LogRecord):
+                    lines.append(self._format(item))
+                elif item is None:
+                    running = False
+                else:
+                    waiters.append(item)
+            if lines:
+                self._write("".join(lines))
+            for waiter in waiters:
+                waiter.set()
+        self.stream.close()
+
+    def _write(self, data):
+        size = len(data.encode("utf-8"))
+        if self.max_bytes and self.size and self.size + size > self.max_bytes:
+            self._rotate()
+        self.stream.write(data)
+        self.stream.flush()
+        self.size += size
+
+    def _rotate(self):
+        self.stream.close()
+        if self.backup_count:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.log_file}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.log_file}.{i + 1}")
+            os.replace(self.log_file, f"{self.log_file}.1")
+        self.stream = open(self.log_file, "w", encoding="utf-8")
+        self.size = 0
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is written."""
+        if not self.thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+class Rendered:
+    """str() and repr() of a log argument, taken when the record was made."""
+
+    __slots__ = ("text", "representation")
+
+    def __init__(self, value):
+        self.text = str(value)
+        self.representation = repr(value)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return self.representation
+
+
+def snapshot(value):
+    if isinstance(value, IMMUTABLE):
+        return value
+    copy = getattr(value, "copy", None)
+    if callable(copy):
+        try:
+            return copy()
+        except Exception:
+            pass
+    return Rendered(value)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """Hands the record to a LogWriter with its arguments snapshotted; formatting is left to the writer."""
+
+    def __init__(self, writer):
+        super().__init__(writer.queue)
+        self.writer = writer
+
+    def prepare(self, record):
+        if isinstance(record.args, dict):
+            record.args = {key: snapshot(value) for key, value in record.args.items()}
+        elif record.args:
+            record.args = tuple(snapshot(arg) for arg in record.args)
+        if not isinstance(record.msg, str):
+            record.msg = snapshot(record.msg)
+        return record
+
+    def enqueue(self, record):
+        self.writer.put(record)
+
+
+def setup_logger(name, log_file, level=logging.INFO, json_format=False, **writer_options):
+    """
+    Logger writing to `log_file` from a background thread. Calling it again
+    for the same name and file returns the same logger without adding a
+    handler. Pass arguments instead of f-strings, logger.info("%s", frame),
+    so they are only rendered on the writer thread and only when enabled.
+
+    :param json_format: JSON lines with `extra` fields instead of plain text
+    :param writer_options: max_bytes, backup_count, batch_size, queue_size of the LogWriter
+    """
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    logger.addHandler(handler)
-
+    # handlers on the root logger would format the record on the caller's thread again
+    logger.propagate = False
+    path = os.path.abspath(log_file)
+    with _lock:
+        writer = _writers.get(path)
+        if writer is None:
+            formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+            writer = _writers[path] = LogWriter(path, formatter, **writer_options)
+        if not any(getattr(handler, "writer", None) is writer for handler in logger.handlers):
+            logger.addHandler(QueueHandler(writer))
     return logger
+
+
+def flush_logs(timeout=None):
+    for writer in list(_writers.values()):
+        writer.flush(timeout)
+
+
+@atexit.register
+def shutdown_logging():
+    """Write out everything still queued and stop the writer threads."""
+    with _lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
@@ -0,0 +1,189 @@
+import asyncio
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+# In-process metrics cheap enough to leave on: a span is two perf_counter
+# calls and a list store, percentiles are only computed on export.
+
+
+class Histogram:
+    """Count, sum and max of every observation, plus the last `size` for percentiles."""
+
+    __slots__ = ("samples", "size", "index", "count", "total", "max")
+
+    def __init__(self, size=4096):
+        self.samples = []
+        self.size = size
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            self.samples[self.index] = value
+            self.index = (self.index + 1) % self.size
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        p50, p99 = np.percentile(self.samples, [50, 99])
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "p50": float(p50),
+            "p99": float(p99),
+            "max": self.max,
+        }
+
+
+class _Span:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Named timers (seconds) and counters.
+
+    with metrics.timer("signals"): ...
+    metrics.count("orders", len(orders))
+    """
+
+    def __init__(self, samples=4096):
+        self.samples = samples
+        self.timers = {}
+        self.counters = Counter()
+        self.started = time.time()
+
+    def histogram(self, name):
+        histogram = self.timers.get(name)
+        if histogram is None:
+            histogram = self.timers[name] = Histogram(self.samples)
+        return histogram
+
+    def timer(self, name):
+        return _Span(self.histogram(name))
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def timed(self, name=None):
+        """Decorator timing every call of a function or coroutine function."""
+
+        def decorate(func):
+            label = name or func.__qualname__
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(label):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(label):
+                    return func(*args, **kwargs)
+            return wrapper
+
+        return decorate
+
+    def snapshot(self):
+        return {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "timers": {name: histogram.summary() for name, histogram in sorted(self.timers.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def export(self, path):
+        """Write the snapshot as JSON, replacing the file atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.snapshot(), file, indent=1)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        self.timers.clear()
+        self.counters.clear()
+
+
+metrics = Metrics()
+
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler: a daemon thread records the stack of one
+    thread every `interval` seconds. Writes collapsed stacks
+    ("outer;inner count" per line), the input format of flamegraph tools.
+    """
+
+    def __init__(self, interval=0.01, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        self.stacks = Counter()
+        self.running = False
+        self.thread = None
+
+    def _sample(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def top(self, n=20):
+        """Functions seen most often at the top of the stack."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(n)
+
+    def export(self, path):
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
@@ -0,0 +1,68 @@
+import mmap
+import os
+import pickle
+import struct
+
+# One file per snapshot: a header, the pickled state and then every numpy
+# array in it as raw bytes (pickle protocol 5 out-of-band buffers). Reading
+# maps the file copy-on-write, so the arrays point into the mapping instead
+# of being parsed or copied, and stay writable in memory only.
+
+MAGIC = b"TSSNAP01"
+_COUNTS = struct.Struct("<QQ")  # pickle length, number of buffers
+_BUFFER = struct.Struct("<QQ")  # offset, length
+ALIGN = 64
+
+
+def _align(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def write_snapshot(path, state):
+    """
+    Write a picklable state atomically.
+
+    :return: size of the file in bytes
+    """
+    buffers = []
+    payload = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+
+    offset = _align(len(MAGIC) + _COUNTS.size + _BUFFER.size * len(raws) + len(payload))
+    table = []
+    for raw in raws:
+        table.append((offset, raw.nbytes))
+        offset = _align(offset + raw.nbytes)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(_COUNTS.pack(len(payload), len(raws)))
+        for entry in table:
+            file.write(_BUFFER.pack(*entry))
+        file.write(payload)
+        for (start, _), raw in zip(table, raws):
+            file.seek(start)
+            file.write(raw)
+        file.truncate(offset)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    return offset
+
+
+def read_snapshot(path):
+    """The state written by write_snapshot, its arrays backed by the mapped file."""
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a state snapshot")
+    view = memoryview(mapped)
+    payload_size, n_buffers = _COUNTS.unpack_from(view, len(MAGIC))
+    table_start = len(MAGIC) + _COUNTS.size
+    buffers = []
+    for i in range(n_buffers):
+        start, size = _BUFFER.unpack_from(view, table_start + i * _BUFFER.size)
+        buffers.append(view[start:start + size])
+    payload_start = table_start + n_buffers * _BUFFER.size
+    return pickle.loads(view[payload_start:payload_start + payload_size], buffers=buffers)